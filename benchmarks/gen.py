@@ -0,0 +1,105 @@
+# ========================= benchmarks/gen.py =========================
+"""合成规则树配置与样本生成器（供基准测试使用，结果可复现）。"""
+
+from __future__ import annotations
+
+import random
+from typing import Any, Dict, List, Literal, Optional, Sequence
+
+import numpy as np
+
+from src.utils._metrics_kit import MetricsKit
+
+__all__ = ["AGGS", "CMPS", "METRICS", "make_rule", "make_samples", "make_columns"]
+
+AGGS: List[str] = sorted(MetricsKit.all()) + ["none"]
+CMPS: List[str] = ["[]", "[)", "(]", "()"]
+METRICS: List[str] = ["speed", "angle", "temp", "load"]
+
+WindowKind = Literal["count", "time", "mixed"]
+WindowMode = Literal["sliding", "hopping", "tumbling"]
+
+
+def make_rule(
+    *,
+    depth: int = 3,
+    fanout: int = 3,
+    units: int = 2,
+    window: WindowKind = "count",
+    size: int = 10,
+    sec: int = 1,
+    mode: WindowMode = "sliding",
+    hop: Optional[int] = None,
+    resolution: Optional[int] = None,
+    aggs: Optional[Sequence[str]] = None,
+    metrics: Sequence[str] = METRICS,
+    else_branch: bool = True,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """生成一棵完整的 ``fanout`` 叉、``depth`` 层规则树（dict，可直接交给 RuleTree）。
+
+    每个条件节点 ``units`` 个 Unit；``aggs`` 为空时在全部聚合中轮换。
+    ``mode`` / ``hop`` 原样写入每个窗口（``"hopping"`` 时 ``hop`` 对计数窗口为
+    点数、对时间窗口为毫秒）；``resolution`` 只写入时间窗口（分桶宽度，毫秒）。
+    ``else_branch`` 为真时每层额外挂一个 ``"else"`` 兜底子节点。
+    区间取 [-2, 2] 附近，使各分支在随机数据上都有机会命中。
+    """
+    rnd = random.Random(seed)
+    agg_cycle = list(aggs or AGGS)
+    counter = [0]
+
+    def unit() -> Dict[str, Any]:
+        kind = window if window != "mixed" else rnd.choice(["count", "time"])
+        agg = agg_cycle[counter[0] % len(agg_cycle)]
+        counter[0] += 1
+        lo = rnd.uniform(-2.0, 0.5)
+        win: Dict[str, Any] = {"type": kind, "size": size, "sec": sec}
+        if mode != "sliding":
+            win["mode"] = mode
+        if mode == "hopping":
+            win["hop"] = hop
+        if resolution is not None and kind == "time":
+            win["resolution"] = resolution
+        return {
+            "metric": rnd.choice(list(metrics)),
+            "window": win,
+            "agg": agg,
+            "cmp": {"type": rnd.choice(CMPS), "value": [lo, lo + rnd.uniform(1.0, 4.0)]},
+        }
+
+    def node(level: int, path: str) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"id": path, "units": [unit() for _ in range(units)]}
+        if level < depth:
+            out["sub"] = [node(level + 1, f"{path}.{i}") for i in range(fanout)]
+            if else_branch:
+                out["sub"].append({"id": f"{path}.else", "units": "else"})
+        return out
+
+    return {
+        "id": "root",
+        "units": "root",
+        "sub": [node(1, f"n{i}") for i in range(fanout)],
+    }
+
+
+def make_samples(
+    n: int, *, pps: int = 100, metrics: Sequence[str] = METRICS, seed: int = 0
+) -> List[Dict[str, float]]:
+    """``n`` 条逐行样本：按 ``pps`` 等间隔的毫秒时间戳 + 随机游走指标。"""
+    cols = make_columns(n, pps=pps, metrics=metrics, seed=seed)
+    ts = cols.pop("ts").tolist()
+    names = list(cols)
+    rows = zip(ts, *(cols[m].tolist() for m in names))
+    return [{"ts": t, **dict(zip(names, vals))} for t, *vals in rows]
+
+
+def make_columns(
+    n: int, *, pps: int = 100, metrics: Sequence[str] = METRICS, seed: int = 0
+) -> Dict[str, np.ndarray]:
+    """列式版本的 ``make_samples``（含 ``ts`` 列）。"""
+    rng = np.random.default_rng(seed)
+    out: Dict[str, np.ndarray] = {"ts": (np.arange(n) * (1000 // pps)).astype(np.int64)}
+    for m in metrics:
+        walk = np.cumsum(rng.normal(0.0, 0.3, n))
+        out[m] = np.round(np.clip(walk - np.mean(walk), -5.0, 5.0), 2)
+    return out
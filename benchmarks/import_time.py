@@ -0,0 +1,159 @@
+# ====================== benchmarks/import_time.py ====================
+"""冷启动基准：包导入 / 配置校验 / 命中编译缓存后求值的耗时，及各阶段加载的重依赖。
+
+每个场景在全新的解释器中重复运行，计时只覆盖场景语句本身（不含解释器启动）。
+除耗时外还检查场景结束时 numpy / pydantic / loguru 是否已被真正加载：
+场景声明为不应加载的依赖一旦出现即视为回退（退出码非零）。
+
+用法（在仓库根目录）::
+
+    python -m benchmarks.import_time                          # 结果写入 import_results.json
+    python -m benchmarks.import_time -r 20 --compare old.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .gen import make_rule, make_samples
+from .rule_tree import PPS, _meta
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 依赖名 → 只有真正执行过导入才会出现的子模块（延迟模块本身会提前登记在 sys.modules 中）
+HEAVY: Dict[str, str] = {
+    "numpy": "numpy._core",
+    "pydantic": "pydantic.main",
+    "loguru": "loguru._logger",
+}
+
+
+# ───────────────────────── 场景定义 ─────────────────────────
+@dataclass
+class Scenario:
+    name: str
+    stmt: str                                   # 计时的语句
+    setup: str = ""                             # 不计时的准备语句
+    forbid: List[str] = field(default_factory=list)   # 场景结束时不应加载的依赖
+
+
+def build_scenarios(cfg: Path, cache_dir: Path, sample: Dict[str, Any]) -> List[Scenario]:
+    return [
+        Scenario("import/package", "import src.rules", forbid=["numpy", "pydantic", "loguru"]),
+        Scenario("import/tree", "from src.rules import RuleTree", forbid=["numpy", "pydantic", "loguru"]),
+        Scenario("import/dto", "from src.rules import RuleDTO", forbid=["numpy", "loguru"]),
+        # 命令行校验：解析 + 校验 + 编译一棵树，不求值
+        Scenario("validate/cold",
+                 f"from src.rules import RuleTree; RuleTree({str(cfg)!r}, pps={PPS})",
+                 forbid=["numpy", "loguru"]),
+        # 预编译树：命中磁盘缓存构造，逐样本写入（不经 pydantic）
+        Scenario("eval/cached",
+                 f"from src.rules import RuleTree\n"
+                 f"t = RuleTree({str(cfg)!r}, pps={PPS}, cache_dir={str(cache_dir)!r})\n"
+                 f"for _ in range(200): t.push_trusted({sample!r})",
+                 forbid=["pydantic", "loguru"]),
+        # 参照：各依赖本身的导入耗时
+        Scenario("ref/numpy", "import numpy"),
+        Scenario("ref/pydantic", "import pydantic; from pydantic import BaseModel"),
+        Scenario("ref/loguru", "from loguru import logger"),
+    ]
+
+
+# ───────────────────────── 测量 ─────────────────────────
+_RUNNER = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+{setup}
+t0 = time.perf_counter()
+{stmt}
+ms = (time.perf_counter() - t0) * 1e3
+print(json.dumps({{"ms": ms, "loaded": [k for k, m in {heavy!r}.items() if m in sys.modules]}}))
+"""
+
+
+def run_once(sc: Scenario) -> Dict[str, Any]:
+    code = _RUNNER.format(root=str(ROOT), setup=sc.setup, stmt=sc.stmt, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", textwrap.dedent(code)], capture_output=True,
+                         text=True, check=True, cwd=ROOT)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_scenario(sc: Scenario, *, repeat: int) -> Dict[str, Any]:
+    runs = [run_once(sc) for _ in range(repeat)]
+    ms = [r["ms"] for r in runs]
+    loaded = sorted({dep for r in runs for dep in r["loaded"]})
+    return {
+        "name": sc.name,
+        "ms": {"median": statistics.median(ms), "min": min(ms), "max": max(ms)},
+        "loaded": loaded,
+        "violations": [dep for dep in sc.forbid if dep in loaded],
+    }
+
+
+# ───────────────────────── 输出 / 对比 ─────────────────────────
+def compare(new: Dict[str, Any], old: Dict[str, Any], tolerance: float) -> int:
+    """打印与基线的对比（中位耗时），返回超出容差的回退数量。"""
+    base = {c["name"]: c for c in old["scenarios"]}
+    worse = 0
+    print(f"\n{'scenario':20s} {'median ms':>22s}")
+    for c in new["scenarios"]:
+        b = base.get(c["name"])
+        if b is None or c["name"].startswith("ref/"):
+            continue
+        m_new, m_old = c["ms"]["median"], b["ms"]["median"]
+        flag = ""
+        if m_new > m_old * (1 + tolerance):
+            flag = "  <-- regression"
+            worse += 1
+        print(f"{c['name']:20s} {m_old:9.2f} -> {m_new:9.2f}{flag}")
+    return worse
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-r", "--repeat", type=int, default=10, help="每个场景的进程数")
+    ap.add_argument("-k", "--filter", default="", help="只运行名称包含该子串的场景")
+    ap.add_argument("--out", default="import_results.json", help="结果 JSON 路径")
+    ap.add_argument("--compare", help="基线结果 JSON，打印对比并在回退时返回非零")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="对比容差（相对值）")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg = Path(tmp) / "rule.json"
+        cfg.write_text(json.dumps(make_rule(depth=3, fanout=3, units=2, window="mixed", size=100)))
+        cache_dir = Path(tmp) / "cache"
+        sample = {k: float(v) if k != "ts" else int(v) for k, v in make_samples(1, pps=PPS)[0].items()}
+        scenarios = build_scenarios(cfg, cache_dir, sample)
+        run_once(next(sc for sc in scenarios if sc.name == "eval/cached"))   # 预热：写入磁盘编译缓存
+
+        results = []
+        for sc in scenarios:
+            if args.filter and args.filter not in sc.name:
+                continue
+            r = run_scenario(sc, repeat=args.repeat)
+            flag = f"  <-- loads {', '.join(r['violations'])}" if r["violations"] else ""
+            print(f"{sc.name:20s} {r['ms']['median']:8.2f} ms (min {r['ms']['min']:7.2f}) | "
+                  f"loaded: {', '.join(r['loaded']) or '-'}{flag}")
+            results.append(r)
+
+    report = {"meta": _meta(), "repeat": args.repeat, "scenarios": results}
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"\nresults written to {args.out}")
+
+    bad = sum(1 for r in results if r["violations"])
+    if args.compare:
+        bad += compare(report, json.loads(Path(args.compare).read_text()), args.tolerance)
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
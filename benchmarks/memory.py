@@ -0,0 +1,128 @@
+# ======================= benchmarks/memory.py ========================
+"""常驻内存基准：同一配置常驻大量 RuleTree 时每棵树占用的字节数。
+
+每个用例先构造一棵树预热编译缓存，再用 tracemalloc 统计另外 ``--trees``
+棵树的分配量：
+
+* ``empty``  —— 刚构造完（节点 / Unit / 窗口对象本身，窗口为空）
+* ``filled`` —— 每棵树写满窗口之后（对象 + 窗口数据 + 流式聚合状态）
+
+用法（在仓库根目录）::
+
+    python -m benchmarks.memory                         # 结果写入 memory_results.json
+    python -m benchmarks.memory --trees 200 --compare old.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.rules import RuleTree
+from src.rules._bucket import BUCKET_AGGS
+from .gen import make_samples
+from .rule_tree import PPS, Case, _case, _meta
+
+
+_BUCKET = sorted(BUCKET_AGGS)
+
+
+# ───────────────────────── 用例定义 ─────────────────────────
+def build_cases() -> List[Case]:
+    return [
+        _case("d2-f2-u1/count-10", depth=2, fanout=2, units=1, window="count", size=10),
+        _case("d3-f3-u2/count-10", depth=3, fanout=3, units=2, window="count", size=10),
+        _case("d3-f3-u2/count-100", depth=3, fanout=3, units=2, window="count", size=100),
+        _case("d3-f3-u2/mixed", depth=3, fanout=3, units=2, window="mixed", size=100, sec=1),
+        _case("d4-f3-u2/count-10", depth=4, fanout=3, units=2, window="count", size=10),
+        # 分桶时间窗口：与同样聚合的原始样本窗口对比（--fill 应覆盖 3 s）
+        _case("d3-f3-u2/time-3s", depth=3, fanout=3, units=2, window="time", sec=3, aggs=_BUCKET),
+        _case("d3-f3-u2/time-3s-r100ms", depth=3, fanout=3, units=2, window="time", sec=3,
+              resolution=100, aggs=_BUCKET),
+    ]
+
+
+# ───────────────────────── 测量 ─────────────────────────
+def run_case(case: Case, *, trees: int, fill: int) -> Dict[str, Any]:
+    samples = make_samples(fill, pps=PPS)
+    proto = RuleTree(case.rule, pps=PPS)            # 预热编译缓存（模板共享，不计入）
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    held = [RuleTree(case.rule, pps=PPS) for _ in range(trees)]
+    gc.collect()
+    empty = tracemalloc.get_traced_memory()[0] - base
+    for t in held:
+        for s in samples:
+            t.push_trusted(s)
+    gc.collect()
+    filled = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    return {
+        "name": case.name,
+        "params": case.params,
+        "n_nodes": len(proto._order),
+        "n_units": sum(len(nd.units) for nd in proto._order),
+        "n_windows": len(proto._graph),
+        "bytes_per_tree": {"empty": empty / trees, "filled": filled / trees},
+    }
+
+
+# ───────────────────────── 输出 / 对比 ─────────────────────────
+def compare(new: Dict[str, Any], old: Dict[str, Any], tolerance: float) -> int:
+    """打印与基线的对比（每棵树字节数），返回超出容差的回退数量。"""
+    base = {c["name"]: c for c in old["cases"]}
+    worse = 0
+    print(f"\n{'case':24s} {'empty B/tree':>22s} {'filled B/tree':>22s}")
+    for c in new["cases"]:
+        b = base.get(c["name"])
+        if b is None:
+            continue
+        e_new, e_old = c["bytes_per_tree"]["empty"], b["bytes_per_tree"]["empty"]
+        f_new, f_old = c["bytes_per_tree"]["filled"], b["bytes_per_tree"]["filled"]
+        flag = ""
+        if e_new > e_old * (1 + tolerance) or f_new > f_old * (1 + tolerance):
+            flag = "  <-- regression"
+            worse += 1
+        print(f"{c['name']:24s} {e_old:9.0f} -> {e_new:9.0f} {f_old:9.0f} -> {f_new:9.0f}{flag}")
+    return worse
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--trees", type=int, default=500, help="每个用例常驻的树数量")
+    ap.add_argument("--fill", type=int, default=300, help="写入每棵树的样本数（应覆盖最大窗口）")
+    ap.add_argument("-k", "--filter", default="", help="只运行名称包含该子串的用例")
+    ap.add_argument("--out", default="memory_results.json", help="结果 JSON 路径")
+    ap.add_argument("--compare", help="基线结果 JSON，打印对比并在回退时返回非零")
+    ap.add_argument("--tolerance", type=float, default=0.05, help="对比容差（相对值）")
+    args = ap.parse_args(argv)
+
+    results = []
+    for case in build_cases():
+        if args.filter and args.filter not in case.name:
+            continue
+        r = run_case(case, trees=args.trees, fill=args.fill)
+        per = r["bytes_per_tree"]
+        print(f"{case.name:24s} nodes {r['n_nodes']:3d} units {r['n_units']:3d} windows {r['n_windows']:3d} | "
+              f"empty {per['empty'] / 1024:8.1f} KiB/tree | filled {per['filled'] / 1024:8.1f} KiB/tree")
+        results.append(r)
+
+    report = {"meta": _meta(), "trees": args.trees, "fill": args.fill, "cases": results}
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"\nresults written to {args.out}")
+
+    if args.compare:
+        return 1 if compare(report, json.loads(Path(args.compare).read_text()), args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
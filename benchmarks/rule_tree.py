@@ -0,0 +1,246 @@
+# ======================= benchmarks/rule_tree.py =====================
+"""RuleTree 基准测试：构造耗时、逐样本延迟分位数、吞吐量与峰值内存。
+
+用法（在仓库根目录）::
+
+    python -m benchmarks.rule_tree                       # 全部用例，结果写入 bench_results.json
+    python -m benchmarks.rule_tree --quick -k agg/       # 只跑名称含 "agg/" 的用例（小样本）
+    python -m benchmarks.rule_tree --out new.json --compare old.json
+    python -m benchmarks.rule_tree -k window/ --workers 4 # 批量写入启用线程池（RuleTree.parallel）
+
+结果 JSON 含运行环境（git 提交、Python / numpy 版本），可在提交之间对比。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.rules import FrameSchema, RuleTree
+from src.rules._bucket import BUCKET_AGGS
+from .gen import AGGS, make_columns, make_rule, make_samples
+
+PPS = 100
+
+
+# ───────────────────────── 用例定义 ─────────────────────────
+@dataclass
+class Case:
+    name: str
+    rule: Dict[str, Any] = field(default_factory=dict)
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+def _case(name: str, **params: Any) -> Case:
+    return Case(name, make_rule(**params), params)
+
+
+def build_cases() -> List[Case]:
+    cases: List[Case] = []
+    # 树形：深度 / 扇出 / 每节点 Unit 数
+    for d, f, u in [(2, 2, 1), (3, 3, 2), (4, 3, 2), (2, 8, 3)]:
+        cases.append(_case(f"shape/d{d}-f{f}-u{u}", depth=d, fanout=f, units=u, window="count", size=10))
+    # 窗口类型与大小
+    for size in (10, 100, 1000):
+        cases.append(_case(f"window/count-{size}", depth=3, fanout=3, units=2, window="count", size=size))
+    for sec in (1, 10):
+        cases.append(_case(f"window/time-{sec}s", depth=3, fanout=3, units=2, window="time", sec=sec))
+    cases.append(_case("window/mixed", depth=3, fanout=3, units=2, window="mixed", size=100, sec=1))
+    # 求值步长：hopping / tumbling（与 window/count-100、window/time-1s 对比）
+    for hop in (10, 50):
+        cases.append(_case(f"hop/count-100-h{hop}", depth=3, fanout=3, units=2, window="count", size=100,
+                           mode="hopping", hop=hop))
+    cases.append(_case("hop/count-100-tumbling", depth=3, fanout=3, units=2, window="count", size=100,
+                       mode="tumbling"))
+    cases.append(_case("hop/time-1s-h100ms", depth=3, fanout=3, units=2, window="time", sec=1,
+                       mode="hopping", hop=100))
+    # 分桶时间窗口（与同样聚合的原始样本窗口对比）
+    bucket = sorted(BUCKET_AGGS)
+    cases.append(_case("bucket/time-10s-raw", depth=3, fanout=3, units=2, window="time", sec=10, aggs=bucket))
+    for res in (100, 1000):
+        cases.append(_case(f"bucket/time-10s-r{res}ms", depth=3, fanout=3, units=2, window="time", sec=10,
+                           resolution=res, aggs=bucket))
+    # 每种聚合单独一棵树
+    for agg in AGGS:
+        cases.append(_case(f"agg/{agg}", depth=3, fanout=3, units=2, window="count", size=100, aggs=[agg]))
+    return cases
+
+
+# ───────────────────────── 测量 ─────────────────────────
+def _percentiles(ns: np.ndarray) -> Dict[str, float]:
+    us = ns / 1e3
+    return {
+        "mean": float(us.mean()),
+        "p50": float(np.percentile(us, 50)),
+        "p90": float(np.percentile(us, 90)),
+        "p99": float(np.percentile(us, 99)),
+        "p999": float(np.percentile(us, 99.9)),
+        "max": float(us.max()),
+    }
+
+
+def run_case(case: Case, *, n: int, builds: int, workers: int = 0) -> Dict[str, Any]:
+    rule = case.rule
+    samples = make_samples(n, pps=PPS)
+    cols = make_columns(n, pps=PPS)
+    ts = cols.pop("ts")
+    warm = min(n // 5, 2000)
+
+    # ① 构造耗时
+    build_ms = []
+    for _ in range(builds):
+        t0 = time.perf_counter()
+        RuleTree(rule, pps=PPS)
+        build_ms.append((time.perf_counter() - t0) * 1e3)
+
+    # ② 逐样本延迟（push，含 pydantic 校验）
+    tree = RuleTree(rule, pps=PPS)
+    for s in samples[:warm]:
+        tree.push(s)
+    lat = np.empty(n - warm, dtype=np.int64)
+    clock = time.perf_counter_ns
+    for i, s in enumerate(samples[warm:]):
+        t0 = clock()
+        tree.push(s)
+        lat[i] = clock() - t0
+
+    # ③ 吞吐量：push / push_trusted / push_batch / push_frames
+    def rate(fn: Any) -> float:
+        t0 = time.perf_counter()
+        fn()
+        return n / (time.perf_counter() - t0)
+
+    def loop(method: str) -> Any:
+        t = RuleTree(rule, pps=PPS)
+        push = getattr(t, method)
+        return lambda: [push(s) for s in samples]
+
+    batch_tree = RuleTree(rule, pps=PPS)
+    frame_tree = RuleTree(rule, pps=PPS)
+    if workers:
+        batch_tree.parallel(workers)
+        frame_tree.parallel(workers)
+    chunk = 4096
+    schema = FrameSchema([("ts", "<i8")] + [(m, "<f8") for m in cols])
+    packed = np.zeros(n, dtype=schema.dtype)
+    packed["ts"] = ts
+    for m, c in cols.items():
+        packed[m] = c
+    frames = memoryview(packed.tobytes())
+    rec = schema.itemsize
+    throughput = {
+        "push": rate(loop("push")),
+        "push_trusted": rate(loop("push_trusted")),
+        "push_batch": rate(lambda: [
+            batch_tree.push_batch({m: c[i:i + chunk] for m, c in cols.items()}, ts[i:i + chunk])
+            for i in range(0, n, chunk)
+        ]),
+        "push_frames": rate(lambda: [
+            frame_tree.push_frames(frames[i * rec:(i + chunk) * rec], schema) for i in range(0, n, chunk)
+        ]),
+    }
+
+    # ④ 峰值内存：构造 + 填满窗口
+    tracemalloc.start()
+    t = RuleTree(rule, pps=PPS)
+    for s in samples[:warm]:
+        t.push_trusted(s)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": case.name,
+        "params": case.params,
+        "n_nodes": len(t._order),
+        "n_units": sum(len(nd.units) for nd in t._order),
+        "n_windows": len(t._graph),
+        "construct_ms": {"median": float(np.median(build_ms)), "min": float(min(build_ms))},
+        "latency_us": _percentiles(lat),
+        "throughput_sps": throughput,
+        "peak_kib": peak / 1024,
+    }
+
+
+# ───────────────────────── 输出 / 对比 ─────────────────────────
+def _meta() -> Dict[str, Any]:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        rev = None
+    return {
+        "git": rev,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "pps": PPS,
+    }
+
+
+def compare(new: Dict[str, Any], old: Dict[str, Any], tolerance: float) -> int:
+    """打印与基线的对比（p50 延迟 / push 吞吐），返回超出容差的回退数量。"""
+    base = {c["name"]: c for c in old["cases"]}
+    worse = 0
+    print(f"\n{'case':32s} {'p50 us':>18s} {'push sps':>22s}")
+    for c in new["cases"]:
+        b = base.get(c["name"])
+        if b is None:
+            continue
+        p_new, p_old = c["latency_us"]["p50"], b["latency_us"]["p50"]
+        t_new, t_old = c["throughput_sps"]["push"], b["throughput_sps"]["push"]
+        flag = ""
+        if p_new > p_old * (1 + tolerance) or t_new < t_old * (1 - tolerance):
+            flag = "  <-- regression"
+            worse += 1
+        print(f"{c['name']:32s} {p_old:8.1f} -> {p_new:7.1f} {t_old:10.0f} -> {t_new:9.0f}{flag}")
+    return worse
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", "--samples", type=int, default=10_000, help="每个用例的样本数")
+    ap.add_argument("--quick", action="store_true", help="小样本快速模式（n=1000）")
+    ap.add_argument("-k", "--filter", default="", help="只运行名称包含该子串的用例")
+    ap.add_argument("--builds", type=int, default=5, help="构造耗时的重复次数")
+    ap.add_argument("--workers", type=int, default=0, help="push_batch / push_frames 的并行线程数（0 为串行）")
+    ap.add_argument("--out", default="bench_results.json", help="结果 JSON 路径")
+    ap.add_argument("--compare", help="基线结果 JSON，打印对比并在回退时返回非零")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="对比容差（相对值）")
+    args = ap.parse_args(argv)
+
+    n = 1000 if args.quick else args.samples
+    results = []
+    for case in build_cases():
+        if args.filter and args.filter not in case.name:
+            continue
+        r = run_case(case, n=n, builds=args.builds, workers=args.workers)
+        lat, thr = r["latency_us"], r["throughput_sps"]
+        print(f"{case.name:32s} build {r['construct_ms']['median']:7.2f} ms | "
+              f"p50 {lat['p50']:7.1f} p99 {lat['p99']:7.1f} us | "
+              f"push {thr['push']:8.0f} trusted {thr['push_trusted']:8.0f} batch {thr['push_batch']:9.0f} "
+              f"frames {thr['push_frames']:9.0f} sps | "
+              f"peak {r['peak_kib']:8.1f} KiB")
+        results.append(r)
+
+    report = {"meta": _meta(), "samples": n, "workers": args.workers, "cases": results}
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"\nresults written to {args.out}")
+
+    if args.compare:
+        return 1 if compare(report, json.loads(Path(args.compare).read_text()), args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
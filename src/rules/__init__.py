@@ -1,31 +1,110 @@
 # ========================== rules/__init__.py ==========================
 """Minimal‑Stable‑Surface (MSS)
 
-包级仅导出 3 个公开对象：
+包级仅导出以下公开对象：
     * RuleTree   —— 规则树默认实现（Impl）
+    * RuleForest —— 多棵规则树共享同一数据流（窗口 / 聚合去重）
+    * RuleTreePool —— 同一规则树并行评估多路独立数据流（列式状态）
+    * ShardedRuleTreePool —— RuleTreePool 的多进程分片版本（共享内存状态）
+    * Transition —— 活跃路径变化记录（``RuleTree.last_transition``）
+    * PathEvent  —— ``RuleTree.astream`` 产出的活跃路径变化事件
+    * FrameSchema —— ``RuleTree.push_frames`` 的定长二进制记录布局
+    * TreeStats  —— ``RuleTree.stats()`` 返回的逐节点 / 逐 Unit 运行统计
+    * backtest / BacktestResult —— 历史录制数据的向量化离线回放
     * RuleDTO    —— 规则树配置 DTO（Pydantic）
     * SampleDTO  —— 单条监控数据 DTO
-其它全部为私有实现 (_window, _unit, _node 等)。
+其它全部为私有实现 (_window, _unit, _node, _signal 等)。
+
+以上对象均在首次访问时才导入其所在模块（PEP 562）：``import src.rules`` 本身
+不加载 numpy / pydantic / loguru。numpy 在首次真正用到时加载；pydantic 只在
+校验配置 / 样本时加载——命中编译缓存的树配合 ``push_trusted`` / ``push_batch``
+全程不需要它。
 """
 
 from __future__ import annotations
 
-from .tree import RuleTree                # 默认实现
-from ._dto import RuleDTO, SampleDTO    # 数据契约
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .tree import RuleTree, Transition    # 默认实现
+    from .forest import RuleForest            # 多树共享
+    from .pool import RuleTreePool            # 多流并行
+    from .shard import ShardedRuleTreePool    # 多进程分片
+    from ._dto import RuleDTO, SampleDTO    # 数据契约
+    from ._stream import PathEvent            # 异步流事件
+    from ._frame import FrameSchema           # 二进制帧布局
+    from ._stats import TreeStats             # 运行统计
+    from .backtest import BacktestResult, backtest  # 离线回放
+
+# 公开名 → 所在模块（首次访问时导入）
+_EXPORTS: dict[str, str] = {
+    "RuleTree": ".tree",
+    "Transition": ".tree",
+    "RuleForest": ".forest",
+    "RuleTreePool": ".pool",
+    "ShardedRuleTreePool": ".shard",
+    "PathEvent": "._stream",
+    "FrameSchema": "._frame",
+    "TreeStats": "._stats",
+    "backtest": ".backtest",
+    "BacktestResult": ".backtest",
+    "RuleDTO": "._dto",
+    "SampleDTO": "._dto",
+}
 
 __all__: list[str] = [
     "RuleTree",
+    "Transition",
+    "RuleForest",
+    "RuleTreePool",
+    "ShardedRuleTreePool",
+    "PathEvent",
+    "FrameSchema",
+    "TreeStats",
+    "backtest",
+    "BacktestResult",
     "RuleDTO",
     "SampleDTO",
 ]
 
+
+
+def __getattr__(name: str) -> object:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    mod = importlib.import_module(module, __name__)
+    # 之后的访问不再经过 __getattr__；同模块的导出一并绑定——导入子模块时
+    # 包属性会被设为子模块本身（如 ``backtest`` 模块遮住同名函数），须覆盖回来
+    for other, where in _EXPORTS.items():
+        if where == module:
+            globals()[other] = getattr(mod, other)
+    return globals()[name]
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
 # 可选工厂：如团队不需要可删除
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Literal
+
+
+def build_rule_tree(
+    cfg: str | Dict[str, Any] | RuleDTO,
+    *,
+    pps: int,
+    backend: Literal["deque", "ring"] = "deque",
+    cache_dir: str | Path | None = None,
+) -> "RuleTree":
+    """统一构造：接受 JSON 路径/JSON 字符串/dict/Pydantic 实例。
 
+    ``backend`` 选择窗口存储："deque"（默认）或 "ring"（numpy 环形缓冲区，零拷贝聚合）。
+    相同配置 + pps 只校验 / 编译一次（进程内缓存）；给出 ``cache_dir`` 时编译结果
+    另存磁盘，进程重启后同样免编译。
+    """
+    from .tree import RuleTree
 
-def build_rule_tree(cfg: str | Dict[str, Any] | RuleDTO, *, pps: int) -> "RuleTree":
-    """统一构造：接受 JSON 路径/JSON 字符串/dict/Pydantic 实例。"""
-    if isinstance(cfg, str) and Path(cfg).is_file():
-        cfg = Path(cfg).read_text()
-    return RuleTree(cfg, pps=pps)
\ No newline at end of file
+    return RuleTree(cfg, pps=pps, backend=backend, cache_dir=cache_dir)
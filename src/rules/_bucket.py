@@ -0,0 +1,601 @@
+# ========================= rules/_bucket.py ==========================
+"""分桶时间窗口：长时间窗口只保存逐桶统计量，不保存原始样本。
+
+* 样本按 ``ts // resolution`` 落入固定宽度的桶，每桶只存 点数 / NaN 数 / Σ / Σ² /
+  最小 / 最大 / 最早样本的 ts 与值（Σ / Σ² 以首个有限值为偏移量，降低大偏置下的
+  抵消误差；最早样本决定 max / min 是否为 NaN，与内置 max / min 一致）
+* 窗口 = 区间内全部桶：最新端精确到样本（正在写入的桶随样本更新），最旧端
+  按整桶淘汰 —— 桶的任一部分仍在 ``[最新ts - sec, 最新ts]`` 内就保留，
+  实际覆盖 ``sec`` 秒到 ``sec`` 秒 + 一个桶宽。这是近似：与保存原始样本的
+  同长窗口相比，聚合可能多包含最旧端至多一个桶宽的样本（全部聚合均如此）
+* 窗口合计量随写入 / 淘汰增量维护（最旧桶 id 每跨过一圈由逐桶量重算一次，
+  抵消浮点漂移），极值用桶级单调队列（每桶至多一项），读取 O(1)
+* 内存 ≈ 64 B × (sec * 1000 / resolution + 2)，与 pps 无关：1 小时窗口按 1 s
+  分桶约 230 KB，按 10 s 约 23 KB（原始样本在 1 kHz 下为数十 MB）
+* 分位数：每桶另存一份稀疏草图计数（草图位置 → 点数，每项 8 B），全窗草图
+  （``QuantileSketch`` 的 Fenwick 树）为各桶计数之和，淘汰桶时整桶减去。每桶
+  项数不超过「桶内点数」与「草图位置数」（α = 1% 时约 3.5k）中的较小者，
+  与原始样本数无关；结果与只对窗口内各桶样本建草图完全一致
+* 只支持可由上述统计量合成的聚合（``BUCKET_AGGS`` 与分位数）。迟到样本直接
+  并入其所属的桶
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..utils._lazy import lazy_import
+from ..utils._metrics_kit import MetricsKit, QuantileSketch, _rank
+from ._window import TS_PER_SEC, Window, WindowBatch, _Reader
+
+np = lazy_import("numpy")
+
+__all__ = ["BucketWindow", "BUCKET_AGGS"]
+
+# 聚合名 → 读取方法名
+_READ: Dict[str, str] = {
+    "mean": "_mean", "avg": "_mean",
+    "sum": "_sum",
+    "var": "_var",
+    "std": "_std",
+    "rms": "_rms",
+    "max": "_vmax", "vmax": "_vmax",
+    "min": "_vmin", "vmin": "_vmin",
+    "ptp": "_ptp",
+    "rel_var": "_rel_var",
+    "none": "last",
+}
+BUCKET_AGGS = frozenset(_READ)    # 另加分位数（见 ``MetricsKit.quantile_spec``）
+_FIELDS = 8                       # 快照中每桶的字段数：点数, NaN 数, Σ, Σ², 最小, 最大, 最早 ts, 最早值
+
+
+class _BucketSketch:
+    """分桶窗口上一种精度的分位数草图：全窗 Fenwick 树 + 逐桶稀疏计数。
+
+    正在写入的桶用 dict 计数，开启下一个桶时冻结为 ``array('i')``（位置、点数
+    交替排列，按位置升序）；迟到样本落入已冻结的桶时就地修改（慢路径）。
+    ``_from`` 之前的桶在挂载草图时已有数据、无法补录：最旧桶 id 未达到
+    ``_from`` 前读数为 NaN。
+    """
+
+    __slots__ = ("_sk", "_rows", "_cur", "_slot", "_from")
+
+    def __init__(self, kind: type, nb: int) -> None:
+        self._sk: QuantileSketch = kind()
+        self._rows: List[Optional[array]] = [None] * nb
+        self._cur: Dict[int, int] = {}
+        self._slot = -1
+        self._from = 0
+
+    def add(self, i: int, v: float) -> None:
+        p = self._sk._pos(v)
+        self._sk._add(p, 1)
+        self._sk._n += 1
+        if i == self._slot:
+            self._cur[p] = self._cur.get(p, 0) + 1
+            return
+        row = self._rows[i]
+        if row is None:
+            self._rows[i] = array("i", (p, 1))
+            return
+        for j in range(0, len(row), 2):
+            if row[j] == p:
+                row[j + 1] += 1
+                return
+        pairs = self._pairs(i) + [(p, 1)]
+        self._rows[i] = array("i", [x for pc in sorted(pairs) for x in pc])
+
+    def open(self, i: int) -> None:
+        """开启槽位 ``i`` 上的新桶：冻结上一个正在写入的桶。"""
+        if self._slot >= 0 and self._cur:
+            self._rows[self._slot] = array("i", [x for pc in sorted(self._cur.items()) for x in pc])
+        self._cur = {}
+        self._slot = i
+
+    def drop(self, i: int) -> None:
+        """从全窗草图中减去槽位 ``i`` 的计数并清空。"""
+        sk = self._sk
+        for p, c in self._pairs(i):
+            sk._add(p, -c)
+            sk._n -= c
+        self._rows[i] = None
+        if i == self._slot:
+            self._cur = {}
+
+    def _pairs(self, i: int) -> List[Tuple[int, int]]:
+        if i == self._slot:
+            return sorted(self._cur.items())
+        row = self._rows[i]
+        return [] if row is None else list(zip(row[0::2], row[1::2]))
+
+    def quantile(self, q: float, win: "BucketWindow") -> float:
+        sk = self._sk
+        if win._nan > 0 or sk._n == 0 or win._first < self._from:
+            return MetricsKit._NAN
+        return round(sk._VALUES[sk._select(_rank(q, sk._n))], 2)
+
+
+class _BucketBatch(WindowBatch):
+    """分桶窗口的批量视图：逐样本聚合值在写入时已算好。"""
+
+    __slots__ = ()
+
+    def __init__(self, ready: np.ndarray, cols: Dict[str, np.ndarray]) -> None:
+        super().__init__(np.empty(0), np.empty(0, np.intp), np.empty(0, np.intp), ready, 1)
+        self._cache = cols
+
+    def agg(self, name: str) -> np.ndarray:
+        return self._cache[name]
+
+
+@dataclass(slots=True)
+class BucketWindow(Window):
+    """按 ``resolution`` 毫秒分桶的时间窗口（``Window.from_cfg`` 按配置创建）。
+
+    环形槽位 ``_nb`` 个，桶 ``j`` 存于槽位 ``j % _nb``；在窗的桶 id 为
+    ``[_first, _cur]``。``_n`` / ``_nan`` / ``_s1`` / ``_s2`` 为全窗合计，
+    ``_hi`` / ``_lo`` 为 ``(桶 id, 值)`` 单调队列，``_head`` 为最旧的非空桶 id
+    （-1：无）。最旧端按整桶淘汰，聚合可能多含至多一个桶宽的旧样本。
+    """
+
+    _res: int = 1
+    _nb: int = 1
+    _cnt: array = field(default_factory=lambda: array("q"))
+    _nans: array = field(default_factory=lambda: array("q"))
+    _sum1: array = field(default_factory=lambda: array("d"))
+    _sum2: array = field(default_factory=lambda: array("d"))
+    _bmin: array = field(default_factory=lambda: array("d"))
+    _bmax: array = field(default_factory=lambda: array("d"))
+    _hts: array = field(default_factory=lambda: array("q"))     # 各桶最早样本的 ts
+    _hval: array = field(default_factory=lambda: array("d"))    # 各桶最早样本的值（可为 NaN）
+    _first: int = 0
+    _cur: int = -1                         # 正在写入的桶 id（-1：窗口为空）
+    _head: int = -1
+    _k: Optional[float] = None             # Σ / Σ² 的偏移量
+    _n: int = 0
+    _nan: int = 0
+    _s1: float = 0.0
+    _s2: float = 0.0
+    _hi: deque = field(default_factory=deque)
+    _lo: deque = field(default_factory=deque)
+    _last: float = math.nan
+    _last_ts: int = 0
+    _sketches: Dict[type, _BucketSketch] = field(default_factory=dict)
+
+    @classmethod
+    def bucketed(cls, cfg: Window.Config) -> "BucketWindow":
+        assert cfg.resolution is not None
+        span = cfg.sec * TS_PER_SEC
+        nb = -(-span // cfg.resolution) + 2
+        win = cls(deque(), cfg, _span=span, _res=cfg.resolution, _nb=nb)
+        win._cnt = array("q", bytes(8 * nb))
+        win._nans = array("q", bytes(8 * nb))
+        win._sum1 = array("d", bytes(8 * nb))
+        win._sum2 = array("d", bytes(8 * nb))
+        win._bmin = array("d", bytes(8 * nb))
+        win._bmax = array("d", bytes(8 * nb))
+        win._hts = array("q", bytes(8 * nb))
+        win._hval = array("d", bytes(8 * nb))
+        return win
+
+    # ───────────────── 写入 ─────────────────
+    def push(self, value: float, ts: Optional[int] = None) -> bool:
+        """写入一个样本（必须给出 ``ts``）；早于最新时间戳的样本并入其所属的桶。"""
+        if ts is None:
+            raise ValueError("time window requires a sample ts")
+        v = float(value)
+        self._tick += 1
+        if self._cur >= 0 and ts < self._last_ts:
+            self._insert_late(v, ts)
+            return True
+        if self._t0 is None:
+            self._t0 = ts
+        b = ts // self._res
+        lo_id = (ts - self._span) // self._res
+        if lo_id > self._first and self._cur >= 0:
+            self._evict(lo_id)                   # 先淘汰：新桶可能复用仍在窗的槽位
+        if b != self._cur:
+            self._open(b)
+        self._last = v
+        self._last_ts = ts
+        self._add(b % self._nb, b, v, ts)
+        return True
+
+    def _add(self, i: int, b: int, v: float, ts: int) -> None:
+        if not (self._cnt[i] or self._nans[i]) or ts < self._hts[i]:
+            self._hts[i], self._hval[i] = ts, v  # 同 ts 的后来者排在其后（同原始窗口的插入位置）
+            if self._head < 0 or b < self._head:
+                self._head = b
+        if v != v:
+            self._nans[i] += 1
+            self._nan += 1
+            return
+        if self._k is None:
+            self._k = v
+        d = v - self._k
+        c = self._cnt[i]
+        if c:
+            if v < self._bmin[i]:
+                self._bmin[i] = v
+            if v > self._bmax[i]:
+                self._bmax[i] = v
+        else:
+            self._bmin[i] = self._bmax[i] = v
+        self._cnt[i] = c + 1
+        self._sum1[i] += d
+        self._sum2[i] += d * d
+        for qs in self._sketches.values():
+            qs.add(i, v)
+        self._n += 1
+        self._s1 += d
+        self._s2 += d * d
+        hi, lo = self._hi, self._lo
+        while hi and hi[-1][1] <= v:
+            hi.pop()
+        if not hi or hi[-1][0] != b:           # 同一桶中较小的后来者永远不会成为队首
+            hi.append((b, v))
+        while lo and lo[-1][1] >= v:
+            lo.pop()
+        if not lo or lo[-1][0] != b:
+            lo.append((b, v))
+
+    def _open(self, b: int) -> None:
+        """开启桶 ``b``（清空 ``_cur`` 与 ``b`` 之间复用的槽位）。"""
+        if self._cur < 0 or b - self._cur >= self._nb:
+            self._clear()
+            self._first = b
+        else:
+            for j in range(self._cur + 1, b + 1):
+                self._zero(j % self._nb)
+        self._cur = b
+        for qs in self._sketches.values():
+            qs.open(b % self._nb)
+
+    def _evict(self, lo_id: int) -> None:
+        """淘汰 id 小于 ``lo_id`` 的桶。"""
+        nb = self._nb
+        lap = self._first // nb
+        for j in range(self._first, min(lo_id, self._cur + 1)):
+            i = j % nb
+            c = self._cnt[i]
+            if c:
+                self._n -= c
+                self._s1 -= self._sum1[i]
+                self._s2 -= self._sum2[i]
+            self._nan -= self._nans[i]
+            self._zero(i)
+        self._first = lo_id
+        if self._head < lo_id:
+            self._head = self._scan(lo_id)       # 每个桶 id 至多被扫描一次：均摊 O(1)
+        hi, lo = self._hi, self._lo
+        while hi and hi[0][0] < self._first:
+            hi.popleft()
+        while lo and lo[0][0] < self._first:
+            lo.popleft()
+        if lo_id // nb != lap:
+            self._recount()                      # 最旧桶 id 每跨过一圈重算一次：只取决于桶 id，快照恢复后节奏不变
+
+    def _insert_late(self, v: float, ts: int) -> None:
+        b = ts // self._res
+        if b < self._first:
+            return                               # 所属桶已滑出窗口
+        self._t0 = ts if self._t0 is None else min(self._t0, ts)
+        self._add(b % self._nb, b, v, ts)
+        self._rebuild_extremes()                 # 乱序插入破坏了单调队列（慢路径）
+
+    def _zero(self, i: int) -> None:
+        self._cnt[i] = self._nans[i] = 0
+        self._sum1[i] = self._sum2[i] = 0.0
+        for qs in self._sketches.values():
+            qs.drop(i)
+
+    def _clear(self) -> None:
+        for i in range(self._nb):
+            self._zero(i)
+        self._n = self._nan = 0
+        self._s1 = self._s2 = 0.0
+        self._head = -1
+        self._hi.clear()
+        self._lo.clear()
+        for qs in self._sketches.values():
+            qs._from = 0                         # 窗口已空：此后的计数完整
+
+    def _scan(self, start: int) -> int:
+        """``start`` 起最旧的非空桶 id（-1：无）。"""
+        nb = self._nb
+        for j in range(start, self._cur + 1):
+            if self._cnt[j % nb] or self._nans[j % nb]:
+                return j
+        return -1
+
+    def _ids(self) -> range:
+        return range(self._first, self._cur + 1) if self._cur >= 0 else range(0)
+
+    def _recount(self, *, recenter: bool = True) -> None:
+        """由逐桶量重算合计；``recenter`` 时先把偏移量移到当前均值（逐桶 Σ / Σ² 精确换算）。"""
+        nb = self._nb
+        live = [j % nb for j in self._ids()]
+        n = sum(self._cnt[i] for i in live)
+        if recenter and n and self._k is not None:
+            delta = self._k - (self._k + sum(self._sum1[i] for i in live) / n)
+            if delta:
+                for i in live:
+                    c, s1 = self._cnt[i], self._sum1[i]
+                    self._sum2[i] += 2.0 * delta * s1 + c * delta * delta
+                    self._sum1[i] = s1 + c * delta
+                self._k -= delta
+        self._n = n
+        self._nan = sum(self._nans[i] for i in live)
+        self._s1 = math.fsum(self._sum1[i] for i in live)
+        self._s2 = math.fsum(self._sum2[i] for i in live)
+
+    def _rebuild_extremes(self) -> None:
+        hi, lo = self._hi, self._lo
+        hi.clear()
+        lo.clear()
+        nb = self._nb
+        for j in self._ids():
+            i = j % nb
+            if not self._cnt[i]:
+                continue
+            x = self._bmax[i]
+            while hi and hi[-1][1] <= x:
+                hi.pop()
+            hi.append((j, x))
+            x = self._bmin[i]
+            while lo and lo[-1][1] >= x:
+                lo.pop()
+            lo.append((j, x))
+
+    def push_batch(self, values: np.ndarray, ts: Optional[np.ndarray] = None) -> WindowBatch:
+        """逐条写入并记录每个样本之后各读取器的值（不保存原始样本，无法事后按区间聚合）。"""
+        if ts is None:
+            raise ValueError("time window requires sample ts")
+        n = len(values)
+        readers = [(a, r._fn) for a, r in self._readers.items()]
+        cols = {a: np.full(n, math.nan) for a, _ in readers}
+        ready = np.zeros(n, dtype=bool)
+        for j, (v, t) in enumerate(zip(np.asarray(values, dtype=np.float64).tolist(), np.asarray(ts).tolist())):
+            self.push(v, t)
+            if self._filled():
+                ready[j] = True
+                for a, fn in readers:
+                    cols[a][j] = fn()
+        return _BucketBatch(ready, cols)
+
+    # ───────────────── 读取 ─────────────────
+    def reader(self, agg: str) -> Callable[[], float]:
+        r = self._readers.get(agg)
+        if r is not None:
+            return r
+        name = _READ.get(agg)
+        spec = None if name is not None else MetricsKit.quantile_spec(agg)
+        if spec is not None:
+            qs = self._sketch(QuantileSketch.configure(spec[1]))
+            q = spec[0]
+            fn: Callable[[], float] = lambda: qs.quantile(q, self)  # noqa: E731
+        elif name is None:
+            raise ValueError(f"aggregation {agg!r} is not available on a bucketed window")
+        else:
+            fn = getattr(self, name)
+        r = self._readers[agg] = _Reader(self, fn)
+        return r
+
+    def _sketch(self, kind: type) -> _BucketSketch:
+        """挂载（或复用）精度为 ``kind`` 的分位数草图；窗口已有数据时从下一个桶起计数完整。"""
+        qs = self._sketches.get(kind)
+        if qs is None:
+            qs = self._sketches[kind] = _BucketSketch(kind, self._nb)
+            if self._cur >= 0:
+                qs._from = self._cur + 1
+                qs.open(-1)
+        return qs
+
+    def _empty(self) -> bool:
+        return self._nan > 0 or self._n == 0
+
+    def _raw_mean(self) -> float:
+        assert self._k is not None
+        return self._k + self._s1 / self._n
+
+    def _raw_var(self) -> float:
+        m1 = self._s1 / self._n
+        return max(self._s2 / self._n - m1 * m1, 0.0)
+
+    def _mean(self) -> float:
+        return MetricsKit._NAN if self._empty() else round(self._raw_mean(), 2)
+
+    def _sum(self) -> float:
+        if self._empty():
+            return MetricsKit._NAN
+        assert self._k is not None
+        return round(self._n * self._k + self._s1, 2)
+
+    def _var(self) -> float:
+        return MetricsKit._NAN if self._empty() else round(self._raw_var(), 2)
+
+    def _std(self) -> float:
+        return MetricsKit._NAN if self._empty() else round(math.sqrt(self._raw_var()), 2)
+
+    def _rms(self) -> float:
+        if self._empty():
+            return MetricsKit._NAN
+        m = self._raw_mean()
+        return round(math.sqrt(self._raw_var() + m * m), 2)
+
+    def _oldest_nan(self) -> bool:
+        """窗口为空或最旧样本为 NaN（内置 max / min 只在此时返回 NaN）。"""
+        h = self._head
+        return h < 0 or self._hval[h % self._nb] != self._hval[h % self._nb]
+
+    def _vmax(self) -> float:
+        return MetricsKit._NAN if self._oldest_nan() else self._hi[0][1]
+
+    def _vmin(self) -> float:
+        return MetricsKit._NAN if self._oldest_nan() else self._lo[0][1]
+
+    def _ptp(self) -> float:
+        return MetricsKit._NAN if self._empty() else round(self._hi[0][1] - self._lo[0][1], 2)
+
+    def _rel_var(self) -> float:
+        if self._empty():
+            return MetricsKit._NAN
+        m = self._raw_mean()
+        return 0.0 if math.isclose(m, 0.0) else round((self._hi[0][1] - self._lo[0][1]) / m, 2)
+
+    def _filled(self) -> bool:
+        return self._t0 is not None and self._cur >= 0 and self._last_ts - self._t0 >= self._span
+
+    def capacity(self) -> Optional[int]:
+        return None
+
+    def length(self) -> int:
+        """窗口内的样本数（含 NaN）。"""
+        return self._n + self._nan
+
+    def values(self) -> List[float]:
+        raise ValueError("a bucketed window keeps no raw samples")
+
+    def last(self) -> float:
+        return self._last if self._cur >= 0 else math.nan
+
+    # ───────────────── 状态 ─────────────────
+    def load(self, vals: np.ndarray, ts: Optional[np.ndarray] = None) -> None:
+        """以原始样本（``ts`` 单调）重新填充窗口：等价于 ``reset()`` 后逐个 ``push``。"""
+        if ts is None:
+            raise ValueError("time window requires sample ts")
+        self.reset()
+        for v, t in zip(np.asarray(vals, dtype=np.float64).tolist(), np.asarray(ts).tolist()):
+            self.push(v, t)
+
+    def state(self) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[int]]:
+        """导出 ``(values, ts, t0)``：``values`` = [偏移量, 最新值] + 每桶 8 个字段
+        + 各分位数草图（按精度升序：[完整起始桶 id] + 每桶 [项数 m, m 对 (位置, 点数)]），
+        ``ts`` = 各桶 id + 最新时间戳（空窗口时两者皆空）。"""
+        ids = self._ids()
+        if not len(ids):
+            return np.empty(0), np.empty(0, dtype=np.int64), self._t0
+        nb = self._nb
+        rows = [
+            (self._cnt[i], self._nans[i], self._sum1[i], self._sum2[i], self._bmin[i], self._bmax[i],
+             self._hts[i], self._hval[i])
+            for i in (j % nb for j in ids)
+        ]
+        out: List[float] = [math.nan if self._k is None else self._k, self._last]
+        out += [x for row in rows for x in row]
+        for qs in self._sorted_sketches():
+            out.append(qs._from)
+            for j in ids:
+                pairs = qs._pairs(j % nb)
+                out.append(len(pairs))
+                out += [x for pc in pairs for x in pc]
+        return np.array(out, dtype=np.float64), np.array([*ids, self._last_ts], dtype=np.int64), self._t0
+
+    def _sorted_sketches(self) -> List[_BucketSketch]:
+        return [self._sketches[k] for k in sorted(self._sketches, key=lambda k: k.ALPHA)]
+
+    def state_error(self, npts: int, nts: int, t0: int) -> Optional[str]:
+        if nts == 0:
+            return None if npts == 0 else "does not match the window type"
+        base = 2 + _FIELDS * (nts - 1)
+        if npts < base + len(self._sketches) * nts or (npts != base and not self._sketches):
+            return "does not match the window type"
+        if nts - 1 > self._nb:
+            return f"holds {nts - 1} buckets, capacity is {self._nb}"
+        return None
+
+    def data_error(self, vals: np.ndarray, ts: Optional[np.ndarray]) -> Optional[str]:
+        return None if ts is None or self._parse_sketches(vals, ts) is not None else "has a malformed quantile sketch"
+
+    def _parse_sketches(self, vals: np.ndarray, ts: np.ndarray) -> Optional[List[Tuple[int, List[List[Tuple[int, int]]]]]]:
+        """解析快照中各草图的 (完整起始桶 id, 逐桶计数)；格式不符时返回 ``None``。"""
+        nbk = ts.size - 1
+        if nbk <= 0:
+            return []
+        x = vals.tolist()
+        counts = x[2:2 + _FIELDS * nbk:_FIELDS]
+        pos, out = 2 + _FIELDS * nbk, []
+        for qs in self._sorted_sketches():
+            size = len(qs._sk._VALUES)
+            if pos >= len(x) or x[pos] != int(x[pos]):
+                return None
+            start, pos, buckets = int(x[pos]), pos + 1, []
+            for c in counts:
+                m = x[pos] if pos < len(x) else -1.0
+                if m < 0 or m != int(m) or pos + 1 + 2 * int(m) > len(x):
+                    return None
+                flat = x[pos + 1:pos + 1 + 2 * int(m)]
+                if any(f != int(f) for f in flat):
+                    return None
+                pairs = [(int(p), int(k)) for p, k in zip(flat[0::2], flat[1::2])]
+                prev = -1
+                for p, k in pairs:                 # 位置严格升序、点数为正
+                    if not prev < p < size or k <= 0:
+                        return None
+                    prev = p
+                if sum(k for _, k in pairs) > c:
+                    return None
+                buckets.append(pairs)
+                pos += 1 + 2 * int(m)
+            out.append((start, buckets))
+        return out if pos == len(x) else None
+
+    def set_state(self, vals: np.ndarray, ts: Optional[np.ndarray], t0: Optional[int]) -> None:
+        if ts is None:
+            raise ValueError("window state does not match the window type")
+        err = self.state_error(vals.size, ts.size, -1 if t0 is None else t0)
+        if err is not None:
+            raise ValueError(f"window state {err}")
+        parsed = self._parse_sketches(vals, ts)
+        if parsed is None:
+            raise ValueError("window state has a malformed quantile sketch")
+        self.reset()
+        self._t0 = t0
+        if not ts.size:
+            return
+        ids = ts[:-1].tolist()
+        k, self._last = float(vals[0]), float(vals[1])
+        self._k = None if k != k else k
+        self._last_ts = int(ts[-1])
+        self._first, self._cur = ids[0], ids[-1]
+        rows = np.asarray(vals[2:2 + _FIELDS * len(ids)], dtype=np.float64).reshape(-1, _FIELDS).tolist()
+        for j, (c, nn, s1, s2, mn, mx, hts, hv) in zip(ids, rows):
+            i = j % self._nb
+            self._cnt[i], self._nans[i] = int(c), int(nn)
+            self._sum1[i], self._sum2[i] = s1, s2
+            self._bmin[i], self._bmax[i] = mn, mx
+            self._hts[i], self._hval[i] = int(hts), hv
+        self._head = self._scan(self._first)
+        self._recount(recenter=False)            # 保持导出时的偏移量：再次导出逐字节一致
+        self._rebuild_extremes()
+        for qs, (start, buckets) in zip(self._sorted_sketches(), parsed):
+            qs._from = start
+            qs.open(self._cur % self._nb)
+            for j, pairs in zip(ids, buckets):
+                i = j % self._nb
+                for p, c in pairs:
+                    qs._sk._add(p, c)
+                    qs._sk._n += c
+                if j == self._cur:
+                    qs._cur = dict(pairs)
+                elif pairs:
+                    qs._rows[i] = array("i", [x for pc in pairs for x in pc])
+
+    def reset(self) -> None:
+        self._clear()
+        self._first, self._cur = 0, -1
+        self._k = None
+        self._t0 = None
+        self._last = math.nan
+        self._last_ts = 0
+        self._tick += 1
+
+    def retain(self, aggs: Iterable[str]) -> None:
+        keep = set(aggs)
+        self._readers = {a: r for a, r in self._readers.items() if a in keep}
+        kinds = {QuantileSketch.configure(s[1]) for s in map(MetricsKit.quantile_spec, keep) if s}
+        self._sketches = {k: qs for k, qs in self._sketches.items() if k in kinds}
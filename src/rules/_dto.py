@@ -7,8 +7,15 @@
 """
 
 from __future__ import annotations
-from typing import Literal, Tuple, List
-from pydantic import BaseModel, Field, ConfigDict
+from typing import Any, Dict, Literal, Tuple, List
+from pydantic import (
+    BaseModel, Field, ConfigDict, SerializerFunctionWrapHandler,
+    field_validator, model_serializer, model_validator,
+)
+
+from ..utils._metrics_kit import MetricsKit
+from ._bucket import BUCKET_AGGS
+from ._window import TS_PER_SEC
 
 __all__: list[str] = [
     "RuleDTO",
@@ -25,16 +32,37 @@ class UnitDTO(BaseModel):
     单个规则单元的配置结构：
     - metric: 指标名称，如 "angle"
     - window: 滑动窗口配置
-    - agg: 聚合方法，如 avg, min, max, sum, none
+    - agg: 聚合方法，如 avg, min, max, sum, std, p95, none（取值与 MetricsKit 对齐；
+      分位数可带精度，如 "p99~0.001"）
+        * 分位数由滑动草图近似，但草图淘汰旧值时需要该值本身，窗口仍逐点保存
+          原始样本：ring 后端镜像双写每点 16 B，deque 后端每点约 32 B（时间窗口
+          另存时间戳），再加每种精度一个草图（α = 1% 时约 14 KB）—— 例如 100 万
+          点窗口上的 p99 至少需 16 MB（ring 计数窗口），其余组合为数十 MB
+        * 分桶窗口（``window.resolution``）不保存原始样本：草图按桶计数、整桶淘汰，
+          内存与 pps 无关（见 ``WindowDTO.resolution``），需要固定内存时改用分桶
     - cmp: 区间比较配置（区间类型和范围）
     """
     metric: str
     window: WindowDTO
-    agg: Literal["avg", "min", "max", "sum", "none"]
+    agg: str
     cmp: CmpDTO
 
     model_config = ConfigDict(extra="forbid")  # 禁止出现未定义字段
 
+    @field_validator("agg")
+    @classmethod
+    def _known_agg(cls, v: str) -> str:
+        if v != "none" and not MetricsKit.has(v):
+            raise ValueError(f"unknown aggregation {v!r}")
+        return v
+
+    @model_validator(mode="after")
+    def _bucket_agg(self) -> "UnitDTO":
+        if (self.window.resolution is not None and self.agg not in BUCKET_AGGS
+                and MetricsKit.quantile_spec(self.agg) is None):
+            raise ValueError(f"aggregation {self.agg!r} is not available on a bucketed window")
+        return self
+
 
 # ---------------- 规则树结构 -------------------------------------------
 class RuleDTO(BaseModel):
@@ -55,7 +83,7 @@ class RuleDTO(BaseModel):
 class SampleDTO(BaseModel):
     """
     单条输入样本：
-    - ts: 时间戳（必须字段）
+    - ts: 时间戳，单位毫秒（必须字段；时间窗口据此淘汰样本）
     - 其他字段表示任意指标数据（动态扩展）
     """
     ts: int = Field(..., ge=0)
@@ -70,13 +98,64 @@ class WindowDTO(BaseModel):
     - type: "time" 表示时间窗口（单位秒），"count" 表示固定点数
     - sec: 若为时间窗口，表示持续秒数（最小为 1）
     - size: 若为点数窗口，表示数据点数量（最小为 1）
+    - mode: 求值节奏
+        * "sliding"（默认）—— 每条样本都重新聚合 / 比较
+        * "hopping" —— 每 ``hop`` 求值一次，两次求值之间沿用上次结果
+        * "tumbling" —— ``hop`` 等于窗口长度的 hopping（相邻求值窗口互不重叠）
+    - hop: 仅 "hopping" 使用（且必须给出）；计数窗口单位为点数，时间窗口单位为
+      毫秒（与 ts 一致），不得超过窗口长度
+    - resolution: 精度取舍，仅滑动时间窗口可用
+        * 不给出（默认）—— 保存原始样本，窗口边界与聚合均精确
+        * 毫秒数 —— 按该宽度分桶，只存每桶 点数 / Σ / Σ² / 最小 / 最大 / 最早
+          样本：内存与 pps 无关（约 64 B × sec * 1000 / resolution），但窗口最旧端
+          按整桶淘汰（多覆盖至多一个桶宽），且只支持 mean / avg / sum / var / std /
+          rms / max / min / vmax / vmin / ptp / rel_var / none 与分位数（每桶另存
+          稀疏草图计数，每项 8 B，项数不超过桶内点数与草图位置数中的较小者）
     """
     type: Literal["time", "count"]
     sec: int = Field(1, ge=1)
     size: int = Field(1, ge=1)
+    mode: Literal["sliding", "hopping", "tumbling"] = "sliding"
+    hop: int | None = Field(None, ge=1)
+    resolution: int | None = Field(None, ge=1)
 
     model_config = ConfigDict(extra="forbid")
 
+    @model_validator(mode="after")
+    def _check_resolution(self) -> "WindowDTO":
+        if self.resolution is None:
+            return self
+        if self.type != "time" or self.mode != "sliding":
+            raise ValueError("resolution only applies to sliding time windows")
+        if self.resolution > self.sec * TS_PER_SEC:
+            raise ValueError(f"resolution {self.resolution} exceeds the window length {self.sec * TS_PER_SEC}")
+        return self
+
+    @model_validator(mode="after")
+    def _check_hop(self) -> "WindowDTO":
+        if self.mode != "hopping":
+            if self.hop is not None:
+                raise ValueError(f"hop only applies to hopping windows, not {self.mode!r}")
+            return self
+        if self.hop is None:
+            raise ValueError("hopping window requires hop")
+        span = self.size if self.type == "count" else self.sec * TS_PER_SEC
+        if self.hop > span:
+            raise ValueError(f"hop {self.hop} exceeds the window length {span}")
+        return self
+
+    @model_serializer(mode="wrap")
+    def _drop_sliding(self, handler: SerializerFunctionWrapHandler) -> Dict[str, Any]:
+        # 滑动窗口不输出 mode / hop，未分桶不输出 resolution：既有配置的规范 JSON
+        # （及 config_hash）保持不变
+        data = handler(self)
+        if self.mode == "sliding":
+            data.pop("mode", None)
+            data.pop("hop", None)
+        if self.resolution is None:
+            data.pop("resolution", None)
+        return data
+
 
 # ---------------- 区间配置结构体 ---------------------------------------
 class CmpDTO(BaseModel):
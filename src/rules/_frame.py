@@ -0,0 +1,129 @@
+# ========================= rules/_frame.py ===========================
+"""定长二进制帧的零拷贝写入：按声明的记录布局直接读取 ts 与各指标列。
+
+* ``FrameSchema`` 声明一条记录的字段顺序与 dtype（含字节序），必须包含整型 ts
+* 按树的 ``metrics`` 绑定一次（``bind``，按指标列表缓存）：只保留用到的字段，
+  得到一个「偏移量固定、itemsize 与记录一致」的视图 dtype；之后每帧只做一次
+  ``np.frombuffer``，各列是同一缓冲区上的跨步视图，不产生逐样本的 dict / float
+* 各列随后走 ``push_batch``：每列只整体转换一次 float64（向量化）
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+from ..utils._lazy import lazy_import
+
+np = lazy_import("numpy")
+
+__all__ = ["FrameSchema", "frame_columns"]
+
+Frames = Any                 # bytes | bytearray | memoryview | np.ndarray（结构化）
+
+
+class FrameSchema:
+    """一条二进制记录的布局。
+
+    Parameters
+    ----------
+    fields : [(name, dtype), ...] | {name: dtype} | np.dtype
+        按记录内顺序给出字段名与 dtype（如 ``"<i8"``、``">f4"``）；也可直接给出
+        结构化 ``np.dtype``（可带显式偏移 / 填充）。
+    ts : str, default ``"ts"``
+        时间戳字段名（须为整型，毫秒）。
+    align : bool, default ``False``
+        按 C 结构体对齐插入填充；默认紧凑排列。
+
+    未出现在布局中的指标按 NaN 处理（同 ``push``），布局中多余的字段不会被读取。
+    """
+
+    __slots__ = ("dtype", "ts", "_bound")
+
+    def __init__(
+        self,
+        fields: Sequence[Tuple[str, Any]] | Mapping[str, Any] | np.dtype,
+        *,
+        ts: str = "ts",
+        align: bool = False,
+    ) -> None:
+        if isinstance(fields, np.dtype):
+            dtype = fields
+        else:
+            items = list(fields.items()) if isinstance(fields, Mapping) else list(fields)
+            dtype = np.dtype(items, align=align)
+        if dtype.names is None:
+            raise ValueError("frame schema needs named fields")
+        if ts not in dtype.names:
+            raise ValueError(f"frame schema has no {ts!r} field")
+        for name in dtype.names:
+            ft = dtype.fields[name][0]
+            kinds = "iu" if name == ts else "biuf"
+            if ft.shape or ft.kind not in kinds:
+                what = "an integer" if name == ts else "a numeric"
+                raise ValueError(f"frame field {name!r} must be {what} scalar, got {ft}")
+        self.dtype: np.dtype = dtype
+        self.ts = ts
+        self._bound: Dict[Tuple[str, ...], np.dtype] = {}
+
+    @property
+    def itemsize(self) -> int:
+        """一条记录的字节数。"""
+        return self.dtype.itemsize
+
+    def bind(self, metrics: Sequence[str]) -> np.dtype:
+        """只含 ts 与 ``metrics`` 中已声明字段的视图 dtype（偏移量 / itemsize 不变）。"""
+        key = tuple(metrics)
+        view = self._bound.get(key)
+        if view is None:
+            fields = self.dtype.fields
+            names = [self.ts, *(m for m in key if m in fields and m != self.ts)]
+            view = np.dtype({
+                "names": names,
+                "formats": [fields[n][0] for n in names],
+                "offsets": [fields[n][1] for n in names],
+                "itemsize": self.dtype.itemsize,
+            })
+            self._bound[key] = view
+        return view
+
+    def __repr__(self) -> str:
+        return f"FrameSchema({self.dtype!r}, ts={self.ts!r})"
+
+
+@lru_cache(maxsize=32)
+def _schema_of(dtype: np.dtype) -> FrameSchema:
+    return FrameSchema(dtype)
+
+
+def frame_columns(
+    frames: Frames, schema: Optional[FrameSchema], metrics: Sequence[str]
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """把一帧（多条记录）拆成 ``push_batch`` 的 ``(columns, ts)``，全部为零拷贝视图。
+
+    结构化数组可省略 ``schema``（按其自身 dtype 推断，ts 字段名为 ``"ts"``）；
+    给出时两者的 dtype 必须一致。
+    """
+    if isinstance(frames, np.ndarray):
+        if schema is None:
+            if frames.dtype.names is None:
+                raise ValueError("frames array must be structured (or pass a FrameSchema)")
+            schema = _schema_of(frames.dtype)
+        elif frames.dtype != schema.dtype:
+            raise ValueError(f"frames dtype {frames.dtype} does not match the schema {schema.dtype}")
+        if frames.ndim != 1:
+            raise ValueError("frames array must be 1-D")
+        if not frames.flags.c_contiguous:
+            frames = np.ascontiguousarray(frames)
+        arr = frames.view(schema.bind(metrics))
+    else:
+        if schema is None:
+            raise ValueError("binary frames need a FrameSchema")
+        nbytes = memoryview(frames).nbytes
+        if nbytes % schema.itemsize:
+            raise ValueError(
+                f"frame buffer of {nbytes} bytes is not a whole number of {schema.itemsize}-byte records"
+            )
+        arr = np.frombuffer(frames, dtype=schema.bind(metrics))
+    names = arr.dtype.names
+    return {m: arr[m] for m in names[1:]}, arr[names[0]]
@@ -2,12 +2,18 @@
 
 from __future__ import annotations
 
-import math
-from dataclasses import dataclass, field
-from typing import Dict, List
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
 
+from ..utils._lazy import lazy_import
 from ._unit import Unit
-from ._dto import RuleDTO  
+from ._window import Backend, WindowBatch
+
+if TYPE_CHECKING:
+    from ._dto import RuleDTO
+    from ._signal import SignalGraph
+
+np = lazy_import("numpy")
 
 __all__ = ["Node"]
 
@@ -15,84 +21,104 @@ __all__ = ["Node"]
 # --------------------------------------------------------------------
 #                           数 据 结 构
 # --------------------------------------------------------------------
-@dataclass
+@dataclass(slots=True)
 class Node:
-    """规则树节点：持有 Unit 判定与递归子节点"""
+    """规则树节点：持有 Unit 判定与递归子节点
+
+    写入与判定分离：``push`` / 信号图只负责把样本写进窗口；聚合与区间
+    判断在 ``is_active`` / ``units_results`` 被访问时才按需计算
+    （聚合结果按窗口写入 tick 缓存，重复访问不重复计算）。
+
+    实例只持有下列四个字段（``__slots__``，无实例字典）；``is_leaf`` /
+    ``sub_ids`` / ``units_metrics`` / ``units_info`` 均在访问时由字段推出，
+    大量常驻树时不为这些展示用信息付出内存。
+    """
 
-    # —— 基础字段（由 dataclass 直接持有） ——
     node_id: str
     is_unconditional: bool
     units: List[Unit]
     subs: List["Node"]
-    is_leaf: bool
-
-    # —— 派生字段（init=False，构造结束后由工厂补全） ——
-    sub_ids: List[str] = field(init=False)
-    units_metrics: List[str] = field(init=False)           # 仅保存 metric 字符串
-    units_info: List[Dict[str, object]] = field(init=False)
-
-    # —— 运行期缓存 ——
-    _eval_cache: List[bool] = field(init=False)
-    _match_cache: List[Dict[str, bool]] = field(init=False)
 
     # ----------------------------------------------------------------
     #                        构  造  工  厂
     # ----------------------------------------------------------------
     @classmethod
-    def from_cfg(cls, cfg: RuleDTO, *, pps: int) -> "Node":
-        """根据 RuleDTO + pps 递归构建 Node"""
+    def from_cfg(
+        cls,
+        cfg: RuleDTO,
+        *,
+        pps: int,
+        backend: Backend = "deque",
+        graph: Optional["SignalGraph"] = None,
+    ) -> "Node":
+        """根据 RuleDTO + pps 递归构建 Node（``backend`` 为窗口存储后端）
+
+        给定 ``graph`` 时所有 Unit 的窗口取自共享信号图，此时样本应经由
+        ``graph.push`` 写入，而不是 ``push``。
+        """
         is_always = cfg.units in ("else", "root")
 
         # Units
         units: List[Unit] = []
         if not is_always:
             # cfg.units 在严格模式下已是 List[UnitDTO]
-            units = [Unit.from_cfg(u, pps) for u in cfg.units]  # type: ignore[arg-type]
+            units = [
+                Unit.from_cfg(u, pps, backend=backend, graph=graph)
+                for u in cfg.units  # type: ignore[union-attr]
+            ]
 
         # 子节点
-        subs = [cls.from_cfg(c, pps=pps) for c in (cfg.sub or [])]
+        subs = [cls.from_cfg(c, pps=pps, backend=backend, graph=graph) for c in (cfg.sub or [])]
 
         # 实例
-        node = cls(
+        return cls(
             node_id = cfg.id,
             is_unconditional = is_always,
             units = units,
             subs = subs,
-            is_leaf = not subs,
         )
 
-        # —— 派生属性 ——  
-        node.sub_ids = [s.node_id for s in subs]
-        node.units_metrics = [u.get_info().metric for u in units]
-        node.units_info = [u.get_info().__dict__ for u in units]
+    @classmethod
+    def assemble(cls, node_id: str, is_unconditional: bool, units: List[Unit], subs: List["Node"]) -> "Node":
+        """由已构建的 Unit / 子节点直接组装（编译模板实例化时使用，不做校验）。"""
+        return cls(node_id, is_unconditional, units, subs)
+
+    # ----------------------------------------------------------------
+    #                        派  生  信  息（按需）
+    # ----------------------------------------------------------------
+    @property
+    def is_leaf(self) -> bool:
+        return not self.subs
+
+    @property
+    def sub_ids(self) -> List[str]:
+        return [s.node_id for s in self.subs]
+
+    @property
+    def units_metrics(self) -> List[str]:
+        return [u.metric for u in self.units]
 
-        return node
+    @property
+    def units_info(self) -> List[Dict[str, object]]:
+        return [asdict(u.get_info()) for u in self.units]
 
     # ----------------------------------------------------------------
     #                        运  行  时  接  口
     # ----------------------------------------------------------------
-    def push(self, sample: Dict[str, float]) -> None:
+    def check_batch(self, batches: Dict[int, WindowBatch], out: np.ndarray, i: int = 0) -> int:
         """
-        将一条样本同时推送给本节点与所有子节点。
-        `sample` 形如 {"speed": 12.3, "angle": 2.1}
+        批量判定：窗口已由 ``SignalGraph.push_batch`` 写入，``batches`` 为
+        ``id(window) -> WindowBatch``。``out`` 为预分配的 ``(节点数, 样本数)`` bool
+        矩阵（初值全 True），按先序把逐样本激活结果就地写入第 ``i`` 行起的各行，
+        返回下一行下标。
         """
-        if not self.is_unconditional:
-            # 将样本映射到各 Unit 所需的 metric
-            for u, metric in zip(self.units, self.units_metrics):
-                value = sample.get(metric, math.nan)
-                u.push(value)
-            self._refresh_cache()
-
-        # 向子树传播
+        row = out[i]
+        for u in self.units:
+            row &= u.check_batch(batches[id(u._win)])
+        i += 1
         for sub in self.subs:
-            sub.push(sample)
-
-    def _refresh_cache(self) -> None:
-        """刷新本节点判定缓存"""
-        self._eval_cache = [u.check() for u in self.units]
-        self._match_cache = [
-            {metric: res} for metric, res in zip(self.units_metrics, self._eval_cache)
-        ]
+            i = sub.check_batch(batches, out, i)
+        return i
 
     # ----------------------------------------------------------------
     #                        状  态  查  询
@@ -101,13 +127,19 @@ class Node:
     def is_active(self) -> bool:
         """
         如果节点为 always_true → True；否则所有 Unit.check() 均为 True 方返回 True。
+        按需计算，遇到第一个不满足的 Unit 即停止。
         """
-        return True if self.is_unconditional else all(self._eval_cache)
+        if self.is_unconditional:
+            return True
+        for u in self.units:
+            if not u.check():
+                return False
+        return True
 
     @property
     def units_results(self) -> List[Dict[str, bool]]:
-        """返回形如 [{'speed': True}, {'angle': False}] 的 Unit 判定结果列表"""
-        return self._match_cache
+        """返回形如 [{'speed': True}, {'angle': False}] 的 Unit 判定结果列表（按需计算）"""
+        return [{u.metric: u.check()} for u in self.units]
 
     # ----------------------------------------------------------------
     #                        维  护  接  口
@@ -118,5 +150,3 @@ class Node:
             u.reset()
         for s in self.subs:
             s.reset()
-        self._eval_cache.clear()
-        self._match_cache.clear()
@@ -0,0 +1,155 @@
+# ========================= rules/_parallel.py ========================
+"""批量写入的并行执行：按窗口划分工作块 + 常驻线程池 + 代价模型。
+
+* 工作单元为一个窗口：写入本批（``push_batch``）并算出挂在它上面的全部聚合。
+  同一窗口上的聚合共享 ``RangeStats`` 等中间量，不拆到不同线程；共享窗口的
+  全部 Unit 随之落在同一块，合并后各 Unit 的区间比较只剩逐行布尔运算
+* 代价模型按行数与聚合种类估算每个窗口的耗时（纳秒），区分 numpy 部分（释放
+  GIL，可并行）与 Python 部分（逐行循环，只在 free-threaded 构建上可并行）；
+  估算总量低于 ``min_cost_ns``、只有一个窗口、或预计收益抵不过派发开销时
+  留在调用线程串行执行
+* 工作块按估算代价做最长处理时间优先（LPT）分配；调用线程自己执行其中
+  一块，其余提交到常驻线程池，全部完成后合并结果再计算活跃路径
+* 逐样本 ``push`` 不并行：求值沿活跃路径惰性读取 O(1) 的流式聚合，派发开销
+  远大于收益
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from ..utils._lazy import lazy_import
+from ..utils._metrics_kit import MetricsKit
+
+if TYPE_CHECKING:
+    from ._window import Window, WindowBatch
+
+np = lazy_import("numpy")
+
+__all__ = ["Runner", "MIN_COST_NS"]
+
+# ───────────────────────── 代价模型（纳秒，按实测量级取整） ─────────────────────────
+MIN_COST_NS = 2_000_000          # 估算总耗时低于此值的批次不并行
+_WINDOW_NS = 20_000              # 每窗口固定开销（Python）
+_WRITE_NS = 40                   # 每行写入 / 区间定位（numpy）
+_SLIDE_NS = 250                  # 每行每个向量化区间聚合（numpy）
+_SKETCH_NS = 9_000               # 每行每个草图分位数（Python 逐行循环）
+_BUCKET_NS = 2_000               # 分桶窗口每行写入（Python 逐行循环）
+_BUCKET_READ_NS = 600            # 分桶窗口每行每个读取器
+_DISPATCH_NS = 60_000            # 每个提交到线程池的工作块
+
+Work = Tuple["Window", "np.ndarray"]
+
+
+def _free_threaded() -> bool:
+    check = getattr(sys, "_is_gil_enabled", None)
+    return check is not None and not check()
+
+
+def window_cost(win: "Window", n: int) -> Tuple[int, int]:
+    """估算 ``n`` 行写入 ``win`` 并算出其全部聚合的耗时：``(Python 部分, numpy 部分)``。"""
+    if win._cfg.resolution is not None:
+        return _WINDOW_NS + n * (_BUCKET_NS + _BUCKET_READ_NS * len(win._readers)), 0
+    py, vec = _WINDOW_NS, _WRITE_NS * n
+    for agg in win._readers:
+        if agg == "none":
+            continue
+        if MetricsKit.quantile_spec(agg) is not None:
+            py += _SKETCH_NS * n
+        else:
+            vec += _SLIDE_NS * n
+    return py, vec
+
+
+def _partition(costs: Sequence[int], k: int) -> List[List[int]]:
+    """LPT：按代价从大到小依次放入当前最轻的块，返回各块的下标列表（最重的块在前）。"""
+    heap = [(0, i) for i in range(k)]
+    chunks: List[List[int]] = [[] for _ in range(k)]
+    loads = [0] * k
+    for j in sorted(range(len(costs)), key=costs.__getitem__, reverse=True):
+        load, i = heapq.heappop(heap)
+        chunks[i].append(j)
+        loads[i] = load + costs[j]
+        heapq.heappush(heap, (loads[i], i))
+    order = sorted(range(k), key=loads.__getitem__, reverse=True)
+    return [chunks[i] for i in order if chunks[i]]
+
+
+def _run(work: Sequence[Work], ts: np.ndarray) -> List[Tuple[int, "WindowBatch"]]:
+    out = []
+    for win, col in work:
+        batch = win.push_batch(col, ts)
+        for agg in win._readers:
+            batch.agg(agg)
+        out.append((id(win), batch))
+    return out
+
+
+class Runner:
+    """SignalGraph 批量写入的并行执行器（见模块说明）。
+
+    Parameters
+    ----------
+    workers : int
+        并行度（含调用线程，线程池大小为 ``workers - 1``），至少为 2。
+    min_cost_ns : int
+        估算总耗时的并行门槛。
+    """
+
+    __slots__ = ("workers", "min_cost_ns", "_free", "_pool")
+
+    def __init__(self, workers: int, *, min_cost_ns: int = MIN_COST_NS) -> None:
+        if workers < 2:
+            raise ValueError(f"parallel evaluation needs workers >= 2, got {workers}")
+        self.workers = workers
+        self.min_cost_ns = min_cost_ns
+        self._free = _free_threaded()
+        self._pool = ThreadPoolExecutor(max_workers=workers - 1, thread_name_prefix="rules-eval")
+
+    @classmethod
+    def resolve(cls, workers: Optional[int], *, min_cost_ns: int = MIN_COST_NS) -> Optional["Runner"]:
+        """``workers=None`` 取 CPU 数；解析后不足 2 时返回 ``None``（串行）。"""
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 0:
+            raise ValueError(f"workers must be >= 0, got {workers}")
+        return cls(workers, min_cost_ns=min_cost_ns) if workers >= 2 else None
+
+    def plan(self, work: Sequence[Work], n: int) -> Optional[List[List[int]]]:
+        """按代价模型划分工作块；不值得并行时返回 ``None``。"""
+        if len(work) < 2:
+            return None
+        parts = [window_cost(win, n) for win, _ in work]
+        py = sum(p for p, _ in parts)
+        vec = sum(v for _, v in parts)
+        total = py + vec
+        if total < self.min_cost_ns:
+            return None
+        k = min(self.workers, len(work))
+        spread = total if self._free else vec        # 可被多线程分摊的部分
+        if spread - spread / k <= _DISPATCH_NS * (k - 1):
+            return None
+        chunks = _partition([p + v for p, v in parts], k)
+        return chunks if len(chunks) > 1 else None
+
+    def push_batch(self, work: Sequence[Work], ts: np.ndarray) -> Optional[Dict[int, "WindowBatch"]]:
+        """并行写入并预先算出全部聚合；不值得并行时返回 ``None``（由调用方串行执行）。"""
+        chunks = self.plan(work, ts.size)
+        if chunks is None:
+            return None
+        futures = [self._pool.submit(_run, [work[j] for j in c], ts) for c in chunks[1:]]
+        try:
+            out = dict(_run([work[j] for j in chunks[0]], ts))
+        finally:
+            wait(futures)                          # 出错时也不让工作线程在锁外继续写窗口
+        for f in futures:
+            out.update(f.result())
+        return out
+
+    def close(self) -> None:
+        """关闭线程池（不等待空闲线程退出）。"""
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,217 @@
+# ========================= rules/_plan.py ============================
+"""扁平执行计划：把已构建的 Node 树降为整数下标 + 连续数组。
+
+* 节点按先序编号（与 ``_template.index`` 一致），子节点以 CSR 偏移表示
+* Unit 按节点顺序连续排列：就绪判断 / 聚合读取器 / 区间类型 / 上下界均为元组
+* ``descend()`` 返回贪心下降到达的最深节点下标；逐样本不分配路径列表
+* ``codegen=True`` 时为该树生成专用 Python 源码（内联区间比较与上下界常量的
+  if 链），过深的树自动退回通用循环；每个实例只为就绪判断 / 读取器建一份名字表
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ._node import Node
+
+__all__ = ["Plan"]
+
+# 区间类型 → 内联比较模板（与 CmpKit 的 4 个比较函数一致）
+_CMP_SRC: Dict[str, str] = {
+    "[]": "{lo} <= v <= {hi}",
+    "[)": "{lo} <= v < {hi}",
+    "(]": "{lo} < v <= {hi}",
+    "()": "{lo} < v < {hi}",
+}
+_MAX_CODEGEN_DEPTH = 60          # 生成源码的嵌套层数上限（解释器缩进限制为 100）
+
+
+@lru_cache(maxsize=None)
+def _names(prefix: str, n: int) -> Tuple[str, ...]:
+    """生成代码中的全局名（各实例共享同一批字符串）。"""
+    return tuple(f"{prefix}{u}" for u in range(n))
+
+
+def _literal(x: float) -> Optional[str]:
+    """可以直接写进源码的上下界（有限浮点数 repr 可精确往返）。"""
+    return repr(x) if math.isfinite(x) else None
+
+
+def _collect(order: List[Node]) -> Tuple[tuple, tuple, tuple]:
+    """按 Plan 顺序收集每个 Unit 的就绪判断 / 读取器 / 比较函数。
+
+    同一窗口上的各 Unit 共用一个 ``is_ready`` 绑定方法。
+    """
+    ready, read, cmp = [], [], []
+    bound: Dict[int, Callable[[], bool]] = {}
+    for node in order:
+        if not node.is_unconditional:
+            for u in node.units:
+                win = u._win
+                fn = bound.get(id(win))
+                if fn is None:
+                    fn = bound[id(win)] = win.is_ready
+                ready.append(fn)
+                read.append(u._read_fn)
+                cmp.append(u._cmp_fn)
+    return tuple(ready), tuple(read), tuple(cmp)
+
+
+@dataclass
+class Plan:
+    """编译后的规则树（只读）。
+
+    Attributes
+    ----------
+    node_ids / is_leaf / paths : tuple
+        按节点下标索引；``paths[i]`` 为根到节点 i 的 id 元组。
+    child_off, child_idx : tuple[int]
+        节点 i 的子节点为 ``child_idx[child_off[i]:child_off[i + 1]]``（"else" 已排在最后）。
+    unit_off : tuple[int]
+        节点 i 的 Unit 为 ``unit_off[i]:unit_off[i + 1]``；无条件节点区间为空。
+    ready, read, cmp, lo, hi : tuple
+        每个 Unit 的窗口就绪判断、聚合读取器、比较函数与上下界。
+    """
+
+    node_ids: Tuple[str, ...]
+    is_leaf: Tuple[bool, ...]
+    paths: Tuple[Tuple[str, ...], ...]
+    child_off: Tuple[int, ...]
+    child_idx: Tuple[int, ...]
+    unit_off: Tuple[int, ...]
+    ready: Tuple[Callable[[], bool], ...]
+    read: Tuple[Callable[[], float], ...]
+    cmp_types: Tuple[str, ...]
+    cmp: Tuple[Callable[[float, float, float], bool], ...]
+    lo: Tuple[float, ...]
+    hi: Tuple[float, ...]
+    source: str = ""                                   # 生成的源码（codegen 时）
+    code: Optional[CodeType] = field(default=None, repr=False)   # 其编译结果（``rebind`` 复用）
+    descend: Callable[[], int] = field(init=False, repr=False)
+
+    # ---------------- 构造 ----------------
+    @classmethod
+    def compile(cls, order: List[Node], parents: List[int], children: List[List[int]],
+                *, codegen: bool = True) -> "Plan":
+        """由先序节点表及父 / 子下标构建计划（同结构的新实例见 ``rebind``）。"""
+        child_off, child_idx, unit_off = [0], [], [0]
+        cmp_types, lo, hi = [], [], []
+        for node, kids in zip(order, children):
+            child_idx.extend(kids)
+            child_off.append(len(child_idx))
+            if not node.is_unconditional:
+                for u in node.units:
+                    cmp_types.append(u._info.cmp_type)
+                    lo.append(float(u._cmp_bounds[0]))
+                    hi.append(float(u._cmp_bounds[1]))
+            unit_off.append(len(lo))
+        ready, read, cmp = _collect(order)
+
+        paths: List[Tuple[str, ...]] = []
+        for i, node in enumerate(order):
+            paths.append((node.node_id,) if i == 0 else paths[parents[i]] + (node.node_id,))
+
+        plan = cls(
+            tuple(n.node_id for n in order), tuple(n.is_leaf for n in order), tuple(paths),
+            tuple(child_off), tuple(child_idx), tuple(unit_off),
+            ready, read, tuple(cmp_types), cmp, tuple(lo), tuple(hi),
+        )
+        plan.descend = plan._descend_loop
+        if codegen and plan._depth() <= _MAX_CODEGEN_DEPTH:
+            plan.source = plan._generate()
+            plan.code = compile(plan.source, "<rule-plan>", "exec")
+            ns: Dict[str, Any] = plan._namespace()
+            exec(plan.code, ns)
+            plan.descend = ns["descend"]
+        return plan
+
+    def skeleton(self) -> "Plan":
+        """去掉实例相关的可调用对象，只保留结构与生成的代码（可跨实例共享 / 序列化）。"""
+        return replace(self, ready=(), read=(), cmp=())
+
+    def rebind(self, order: List[Node]) -> "Plan":
+        """以同结构的另一棵节点树实例化本计划：只收集其读取器 / 比较函数并重新绑定代码。"""
+        ready, read, cmp = _collect(order)
+        plan = replace(self, ready=ready, read=read, cmp=cmp)
+        plan.descend = plan._descend_loop
+        if plan.code is not None:
+            ns: Dict[str, Any] = plan._namespace()
+            exec(plan.code, ns)
+            plan.descend = ns["descend"]
+        return plan
+
+    # ---------------- 通用执行循环 ----------------
+    def _active(self, i: int) -> bool:
+        ready, read, cmp, lo, hi = self.ready, self.read, self.cmp, self.lo, self.hi
+        for u in range(self.unit_off[i], self.unit_off[i + 1]):
+            if not ready[u]():
+                return False
+            v = read[u]()
+            if not v or not cmp[u](v, lo[u], hi[u]):
+                return False
+        return True
+
+    def _descend_loop(self) -> int:
+        off, idx, active = self.child_off, self.child_idx, self._active
+        i = 0
+        while True:
+            for c in range(off[i], off[i + 1]):
+                j = idx[c]
+                if active(j):
+                    i = j
+                    break
+            else:
+                return i
+
+    # ---------------- 代码生成 ----------------
+    def _depth(self) -> int:
+        depth = [0] * len(self.node_ids)
+        for i in range(len(self.node_ids)):
+            for c in self.child_idx[self.child_off[i]:self.child_off[i + 1]]:
+                depth[c] = depth[i] + 1
+        return max(depth)
+
+    def _namespace(self) -> Dict[str, Any]:
+        """生成代码的全局名字表：只含源码实际引用的名字（见 ``_cond``）。"""
+        n = len(self.read)
+        ns: Dict[str, Any] = {"__builtins__": {}}
+        ns.update(zip(_names("r", n), self.ready))
+        ns.update(zip(_names("g", n), self.read))
+        for u in range(n):
+            if self.cmp_types[u] not in _CMP_SRC:
+                ns[f"c{u}"] = self.cmp[u]
+            if _literal(self.lo[u]) is None or _literal(self.hi[u]) is None:
+                ns[f"lo{u}"], ns[f"hi{u}"] = self.lo[u], self.hi[u]
+        return ns
+
+    def _cond(self, i: int) -> str:
+        """节点 i 的激活条件表达式（无条件节点返回空串）。"""
+        terms = []
+        for u in range(self.unit_off[i], self.unit_off[i + 1]):
+            tpl = _CMP_SRC.get(self.cmp_types[u])
+            lo, hi = _literal(self.lo[u]), _literal(self.hi[u])
+            if lo is None or hi is None:                 # ±inf / nan 以全局名引用
+                lo, hi = f"lo{u}", f"hi{u}"
+            test = tpl.format(lo=lo, hi=hi) if tpl else f"c{u}(v, {lo}, {hi})"
+            terms.append(f"r{u}() and (v := g{u}()) and {test}")
+        return " and ".join(f"({t})" for t in terms)
+
+    def _generate(self) -> str:
+        lines = ["def descend():"]
+
+        def emit(i: int, pad: str) -> None:
+            for c in self.child_idx[self.child_off[i]:self.child_off[i + 1]]:
+                cond = self._cond(c)
+                if not cond:                      # 无条件子节点：必然进入，其后兄弟不可达
+                    emit(c, pad)
+                    return
+                lines.append(f"{pad}if {cond}:")
+                emit(c, pad + "    ")
+            lines.append(f"{pad}return {i}")
+
+        emit(0, "    ")
+        return "\n".join(lines) + "\n"
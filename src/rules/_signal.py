@@ -0,0 +1,145 @@
+# ========================= rules/_signal.py ==========================
+"""共享信号图：同一数据流上所有 Unit 的窗口 / 聚合去重。
+
+* 窗口按 ``(metric, 窗口配置)`` 规范化，每个不同的缓冲区只存一份、每条样本只写一次
+* 聚合按 ``(窗口, agg)`` 规范化（见 ``Window.reader``），每条样本至多计算一次
+* 求值步长不同的窗口（sliding / hopping / tumbling）各自独立；全部为 hopping
+  窗口时 ``push`` 报告本条样本是否到达任一窗口的求值边界，树据此跳过求值
+* 可被一棵 RuleTree 独占，也可由 RuleForest 在多棵树之间共享
+* 热更新（``RuleTree.reload``）时由 ``successor`` 派生新图：新配置仍在使用的
+  窗口连同缓冲区与流式状态原样接管，其余窗口随旧图丢弃
+* 设置 ``runner`` 后批量写入按代价模型分块并行（见 ``_parallel``）
+"""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Set, Tuple
+
+from ..utils._lazy import lazy_import
+from ._window import Backend, Window, WindowBatch
+
+if TYPE_CHECKING:
+    from ._parallel import Runner
+    from ._unit import Unit
+
+np = lazy_import("numpy")
+
+__all__ = ["SignalGraph"]
+
+WindowKey = Tuple[str, str, int, int, int]
+
+
+class SignalGraph:
+    """按 (metric, 窗口配置) 去重的窗口集合，负责统一写入。
+
+    Parameters
+    ----------
+    pps : int
+        每秒数据点数，决定时间窗口容量。
+    backend : {"deque", "ring"}
+        窗口存储后端。
+    """
+
+    def __init__(self, *, pps: int, backend: Backend = "deque") -> None:
+        self.pps = pps
+        self.backend: Backend = backend
+        self._windows: Dict[WindowKey, Window] = {}
+        self._feeds: List[Tuple[str, Window]] = []     # 写入顺序（metric, window）
+        self._spare: Dict[WindowKey, Window] = {}      # 可接管的旧图窗口（仅热更新期间）
+        self.carried = 0                               # 从旧图接管的窗口数
+        self._gated = False                            # 全部窗口均为 hopping（见 ``push``）
+        self.runner: Optional[Runner] = None           # 批量写入的并行执行器（见 ``_parallel``）
+
+    # ---------------- 构造期 ----------------
+    @staticmethod
+    def key(metric: str, cfg: Window.Config) -> WindowKey:
+        """窗口规范化键：只保留对该窗口类型生效的尺寸字段，外加求值步长与分桶宽度。"""
+        return (metric, cfg.type, cfg.sec if cfg.type == "time" else cfg.size, cfg.stride(),
+                cfg.resolution or 0)
+
+    def window(self, metric: str, cfg: Window.Config) -> Window:
+        """返回 ``metric`` 上配置为 ``cfg`` 的共享窗口（不存在则创建）。"""
+        k = self.key(metric, cfg)
+        win = self._windows.get(k)
+        if win is None:
+            win = self._spare.pop(k, None)
+            if win is not None:
+                self.carried += 1
+            else:
+                win = Window.from_cfg(cfg, self.pps, backend=self.backend)
+            self._windows[k] = win
+            self._feeds.append((metric, win))
+            self._gated = all(w._hop for _, w in self._feeds)
+        return win
+
+    def successor(self) -> "SignalGraph":
+        """同 pps / backend 的新图，``window()`` 优先接管本图中键相同的窗口。"""
+        nxt = SignalGraph(pps=self.pps, backend=self.backend)
+        nxt._spare = dict(self._windows)
+        nxt.runner = self.runner
+        return nxt
+
+    def settle(self, units: List["Unit"]) -> None:
+        """构造结束：接管来的窗口只保留 ``units`` 仍在使用的聚合读取器 / 流式状态。"""
+        if not self.carried:
+            self._spare = {}
+            return
+        used: Dict[int, Set[str]] = {id(w): set() for _, w in self._feeds}
+        for u in units:
+            used[id(u._win)].add(u._info.agg)
+        for _, win in self._feeds:
+            win.retain(used[id(win)])
+        self._spare = {}
+
+    # ---------------- 运行期 ----------------
+    def push(self, sample: Mapping[str, Any]) -> bool:
+        """把一条样本写入每个不同的窗口（缺失指标记为 NaN，``ts`` 供时间窗口淘汰）。
+
+        返回是否需要重新求值：存在滑动窗口时恒为 ``True``；全部为 hopping
+        窗口时只在至少一个窗口到达求值边界时为 ``True``（其余样本上所有
+        窗口的就绪状态与聚合值都不变）。
+        """
+        get = sample.get
+        nan = math.nan
+        ts = get("ts")
+        if self._gated:
+            fired = False
+            for metric, win in self._feeds:
+                if win.push(get(metric, nan), ts):
+                    fired = True
+            return fired
+        for metric, win in self._feeds:
+            win.push(get(metric, nan), ts)
+        return True
+
+    def push_batch(self, columns: Mapping[str, np.ndarray], ts: np.ndarray) -> Dict[int, WindowBatch]:
+        """批量写入 ``len(ts)`` 条列式样本，返回 ``id(window) -> WindowBatch``。"""
+        n = ts.size
+        work: List[Tuple[Window, np.ndarray]] = []
+        missing = None
+        for metric, win in self._feeds:
+            col = columns.get(metric)
+            if col is None:
+                if missing is None:
+                    missing = np.full(n, math.nan)
+                col = missing
+            work.append((win, col))
+        if self.runner is not None:
+            out = self.runner.push_batch(work, ts)
+            if out is not None:
+                return out
+        return {id(win): win.push_batch(col, ts) for win, col in work}
+
+    def reset(self) -> None:
+        for _, win in self._feeds:
+            win.reset()
+
+    # ---------------- 查询 ----------------
+    @property
+    def metrics(self) -> List[str]:
+        return sorted({m for m, _ in self._feeds})
+
+    def __len__(self) -> int:
+        """不同窗口（缓冲区）的数量。"""
+        return len(self._feeds)
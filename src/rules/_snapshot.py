@@ -0,0 +1,124 @@
+# ========================= rules/_snapshot.py ========================
+"""窗口状态的二进制快照格式（小端序）。
+
+::
+
+    header   <8s H H 32s I>   magic, version, 保留, 配置哈希(sha256), 窗口数
+    table    <q q q> × 窗口数   点数 n, 时间戳个数 m（计数窗口为 0）, t0（无则 -1）
+    data     float64[n] + int64[m]，按窗口顺序依次排列（8 字节对齐）
+
+* 配置哈希 = sha256(规范化配置 JSON + pps)，恢复时不一致直接拒绝
+* 只保存原始缓冲区：流式聚合状态是缓冲区的函数，恢复时一次性重建
+* 读取端只依赖 buffer 协议，可直接作用于 ``mmap``，无需先把文件读入内存
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import struct
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from ..utils._lazy import lazy_import
+from ._signal import SignalGraph
+
+if TYPE_CHECKING:
+    from ._dto import RuleDTO
+    from ._window import Window
+
+np = lazy_import("numpy")
+
+__all__ = ["config_hash", "dump", "load", "load_file"]
+
+_MAGIC = b"RULESNAP"
+_VERSION = 1
+_HEADER = struct.Struct("<8sHH32sI")
+_ENTRY = struct.Struct("<qqq")
+
+
+def config_hash(cfg: RuleDTO, pps: int) -> bytes:
+    """配置 + pps 的 sha256 摘要（字段顺序无关）。"""
+    blob = cfg.model_dump_json(exclude_none=False).encode()
+    return hashlib.sha256(blob + b"|pps=" + str(pps).encode()).digest()
+
+
+def dump(graph: SignalGraph, key: bytes) -> bytes:
+    """序列化 ``graph`` 中全部窗口的内容。"""
+    states = [win.state() for _, win in graph._feeds]
+    parts: List[bytes] = [_HEADER.pack(_MAGIC, _VERSION, 0, key, len(states))]
+    for vals, ts, t0 in states:
+        parts.append(_ENTRY.pack(vals.size, 0 if ts is None else ts.size, -1 if t0 is None else t0))
+    for vals, ts, _ in states:
+        parts.append(vals.astype("<f8", copy=False).tobytes())
+        if ts is not None:
+            parts.append(ts.astype("<i8", copy=False).tobytes())
+    return b"".join(parts)
+
+
+def load(graph: SignalGraph, data: memoryview | bytes, key: bytes) -> None:
+    """把 ``dump`` 的结果恢复进结构相同的 ``graph``（校验通过后才修改任何窗口）。
+
+    先只读头部与条目表校验，再逐窗口检查数据内容（视图在检查函数返回时即释放）：
+    校验失败时不存在指向 ``data`` 的视图，``mmap`` 可以正常关闭，异常原样抛出。
+    """
+    with memoryview(data) as buf:
+        entries = _entries(graph, buf, key)
+        for i, ((_, win), entry) in enumerate(zip(graph._feeds, entries)):
+            err = _data_error(win, buf, *entry)
+            if err is not None:
+                raise ValueError(f"snapshot window {i} {err}")
+        for (_, win), (off, npts, nts, t0) in zip(graph._feeds, entries):
+            _restore(win, buf, off, npts, nts, t0)
+
+
+def _entries(graph: SignalGraph, buf: memoryview, key: bytes) -> List[Tuple[int, int, int, Optional[int]]]:
+    """校验头部与条目表，返回每个窗口的 ``(数据偏移, 点数, 时间戳个数, t0)``。"""
+    if buf.nbytes < _HEADER.size:
+        raise ValueError("snapshot is truncated")
+    magic, version, _, digest, n = _HEADER.unpack_from(buf, 0)
+    if magic != _MAGIC:
+        raise ValueError("not a rule tree snapshot")
+    if version != _VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    if digest != key:
+        raise ValueError("snapshot was taken from a different config / pps")
+    if n != len(graph._feeds):
+        raise ValueError(f"snapshot holds {n} windows, tree has {len(graph._feeds)}")
+
+    off = _HEADER.size + n * _ENTRY.size
+    if buf.nbytes < off:
+        raise ValueError("snapshot is truncated")
+    out: List[Tuple[int, int, int, Optional[int]]] = []
+    for i in range(n):
+        npts, nts, t0 = _ENTRY.unpack_from(buf, _HEADER.size + i * _ENTRY.size)
+        win = graph._feeds[i][1]
+        err = win.state_error(npts, nts, t0)
+        if err is not None:
+            raise ValueError(f"snapshot window {i} {err}")
+        if off + 8 * (npts + nts) > buf.nbytes:
+            raise ValueError("snapshot is truncated")
+        out.append((off, npts, nts, None if t0 < 0 else t0))
+        off += 8 * (npts + nts)
+    return out
+
+
+def _views(win: Window, buf: memoryview, off: int, npts: int, nts: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    vals = np.frombuffer(buf, dtype="<f8", count=npts, offset=off)
+    ts = np.frombuffer(buf, dtype="<i8", count=nts, offset=off + 8 * npts) if win.type == "time" else None
+    return vals, ts
+
+
+def _data_error(win: Window, buf: memoryview, off: int, npts: int, nts: int, t0: Optional[int]) -> Optional[str]:
+    """检查数据内容；只返回原因、不在此抛出（异常回溯会让视图继续引用 ``data``）。"""
+    return win.data_error(*_views(win, buf, off, npts, nts))
+
+
+def _restore(win: Window, buf: memoryview, off: int, npts: int, nts: int, t0: Optional[int]) -> None:
+    win.set_state(*_views(win, buf, off, npts, nts), t0)
+
+
+def load_file(graph: SignalGraph, path: str | Path, key: bytes) -> None:
+    """内存映射方式读取快照文件并恢复（数据只在写入窗口时被拷贝一次）。"""
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        load(graph, mm, key)
@@ -0,0 +1,321 @@
+# ========================= rules/_stats.py ==========================
+"""可选的逐节点 / 逐 Unit 运行统计（``RuleTree.instrument``）。
+
+* 关闭时零开销：热路径上没有任何判断分支。开启时把树（以及树独占的
+  信号图）上的几个入口方法替换为带计数 / 计时的版本，关闭时再删除这些
+  实例属性，恢复为类方法
+* 逐样本路径按 Plan 数组做带计数的下降（与 ``Plan._descend_loop`` 同序、
+  同样短路），只有真正被求值的 Unit 才计入 checks
+* 节点在 active_path 中出现的次数不逐层累加：只按最深节点计数，
+  读取统计时再沿父链汇总
+* 聚合读取器按 (窗口, agg) 共享并按写入 tick 缓存，同一样本中首个读取
+  的 Unit 承担计算耗时，后续 Unit 只记缓存命中的耗时
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from ..utils._lazy import lazy_import
+from ._window import Window, WindowBatch
+
+if TYPE_CHECKING:
+    from ._unit import Unit
+    from .tree import RuleTree, Transition
+
+np = lazy_import("numpy")
+
+__all__ = ["NodeStats", "UnitStats", "TreeStats", "Instrumentation"]
+
+EvalHook = Callable[[Tuple[str, ...], int], None]
+TransitionHook = Callable[["Transition"], None]
+
+# 开启统计时在树 / 信号图上替换的实例属性
+_TREE_HOOKS = ("_evaluate", "_hold", "_active_batch", "_deepest_batch")
+_GRAPH_HOOKS = ("push", "push_batch")
+
+
+# ───────────────────────── 统计结果 ─────────────────────────
+@dataclass
+class UnitStats:
+    """单个 Unit 的统计。
+
+    Attributes
+    ----------
+    pushes / push_ns : int
+        写入该 Unit 窗口的样本数与耗时（含流式聚合增量更新）；窗口由多个
+        Unit 共享时各自报告同一窗口的数值。只有树独占信号图时才统计
+        （RuleForest 中的树由森林写入）。
+    checks / hits : int
+        判定次数与命中次数。
+    agg_ns : int
+        就绪判断 + 聚合读取 + 区间比较的耗时。
+    length / fill : int, float
+        读取统计时窗口内的点数，及其占名义容量（时间窗口按 pps 估算）的比例。
+    """
+
+    node_id: str
+    metric: str
+    agg: str
+    window: str
+    pushes: int = 0
+    push_ns: int = 0
+    checks: int = 0
+    hits: int = 0
+    agg_ns: int = 0
+    length: int = 0
+    fill: float = 0.0
+
+
+@dataclass
+class NodeStats:
+    """单个节点的统计。
+
+    Attributes
+    ----------
+    checks / hits : int
+        条件求值次数与通过次数（逐样本下降只求值被访问到的节点；批量
+        写入对每个节点逐行求值）。
+    active : int
+        节点出现在 active_path 中的样本数。
+    deepest : int
+        节点为最深活跃节点的样本数。
+    """
+
+    node_id: str
+    checks: int = 0
+    hits: int = 0
+    active: int = 0
+    deepest: int = 0
+
+
+@dataclass
+class TreeStats:
+    """``RuleTree.stats()`` 的返回值：整树计数 + 逐节点 / 逐 Unit 明细（先序）。"""
+
+    samples: int = 0
+    transitions: int = 0
+    eval_ns: int = 0
+    push_ns: int = 0
+    nodes: List[NodeStats] = field(default_factory=list)
+    units: List[UnitStats] = field(default_factory=list)
+
+    def hottest(self, k: int = 5) -> List[UnitStats]:
+        """按 ``push_ns + agg_ns`` 排序的最耗时的 ``k`` 个 Unit。"""
+        return sorted(self.units, key=lambda u: u.push_ns + u.agg_ns, reverse=True)[:k]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# ───────────────────────── 计数器 ─────────────────────────
+def _window_label(win: Window) -> str:
+    cfg = win._cfg
+    label = f"time:{cfg.sec}s" if cfg.type == "time" else f"count:{cfg.size}"
+    if cfg.resolution:
+        label += f"/res:{cfg.resolution}ms"
+    return f"{label}/hop:{win._hop}" if win._hop else label
+
+
+class Instrumentation:
+    """挂在一棵 RuleTree 上的计数器与带计数的执行入口。
+
+    计数器为按下标索引的 Python 列表（节点按先序，Unit 按 Plan 顺序），
+    ``install`` / ``uninstall`` 负责替换 / 恢复入口方法；卸载后计数保留。
+    """
+
+    def __init__(self, tree: "RuleTree") -> None:
+        self._tree = tree
+        self.on_eval: Optional[EvalHook] = None
+        self.on_transition: Optional[TransitionHook] = None
+        self._units: List["Unit"] = [u for nd in tree._order if not nd.is_unconditional for u in nd.units]
+        self._unit_node: List[int] = [
+            i for i, nd in enumerate(tree._order) if not nd.is_unconditional for _ in nd.units
+        ]
+        self._feeds: List[Window] = [win for _, win in tree._graph._feeds]
+        self.clear()
+
+    def clear(self) -> None:
+        n_nodes, n_units = len(self._tree._order), len(self._units)
+        self.samples = self.transitions = self.eval_ns = 0
+        self.node_checks = [0] * n_nodes
+        self.node_hits = [0] * n_nodes
+        self.deepest = [0] * n_nodes
+        self.checks = [0] * n_units
+        self.hits = [0] * n_units
+        self.agg_ns = [0] * n_units
+        self.win_pushes: Dict[int, int] = {id(w): 0 for w in self._feeds}
+        self.win_ns: Dict[int, int] = {id(w): 0 for w in self._feeds}
+
+    # ---------------- 安装 / 卸载 ----------------
+    def install(self, on_eval: Optional[EvalHook], on_transition: Optional[TransitionHook]) -> None:
+        self.on_eval, self.on_transition = on_eval, on_transition
+        tree = self._tree
+        for name in _TREE_HOOKS:
+            setattr(tree, name, getattr(self, name))
+        if tree._owns_graph:
+            for name in _GRAPH_HOOKS:
+                setattr(tree._graph, name, getattr(self, name))
+
+    @property
+    def installed(self) -> bool:
+        return "_evaluate" in self._tree.__dict__
+
+    def uninstall(self) -> None:
+        tree = self._tree
+        for name in _TREE_HOOKS:
+            tree.__dict__.pop(name, None)
+        for name in _GRAPH_HOOKS:
+            tree._graph.__dict__.pop(name, None)
+
+    # ---------------- 写入（替换 SignalGraph.push / push_batch） ----------------
+    def push(self, sample: Mapping[str, Any]) -> bool:
+        get, clock = sample.get, time.perf_counter_ns
+        nan = float("nan")
+        ts = get("ts")
+        pushes, spent = self.win_pushes, self.win_ns
+        fired = False
+        for metric, win in self._tree._graph._feeds:
+            t = clock()
+            fired |= win.push(get(metric, nan), ts)
+            spent[id(win)] += clock() - t
+            pushes[id(win)] += 1
+        return fired or not self._tree._graph._gated
+
+    def push_batch(self, columns: Mapping[str, np.ndarray], ts: np.ndarray) -> Dict[int, WindowBatch]:
+        n, clock = ts.size, time.perf_counter_ns
+        out: Dict[int, WindowBatch] = {}
+        for metric, win in self._tree._graph._feeds:
+            col = columns.get(metric)
+            t = clock()
+            out[id(win)] = win.push_batch(np.full(n, np.nan) if col is None else col, ts)
+            self.win_ns[id(win)] += clock() - t
+            self.win_pushes[id(win)] += n
+        return out
+
+    # ---------------- 逐样本求值（替换 RuleTree._evaluate） ----------------
+    def _active(self, i: int) -> bool:
+        plan, clock = self._tree._plan, time.perf_counter_ns
+        self.node_checks[i] += 1
+        for u in range(plan.unit_off[i], plan.unit_off[i + 1]):
+            self.checks[u] += 1
+            t = clock()
+            ok = plan.ready[u]() and bool(v := plan.read[u]()) and plan.cmp[u](v, plan.lo[u], plan.hi[u])
+            self.agg_ns[u] += clock() - t
+            if not ok:
+                return False
+            self.hits[u] += 1
+        self.node_hits[i] += 1
+        return True
+
+    def _descend(self) -> int:
+        plan, active = self._tree._plan, self._active
+        off, idx = plan.child_off, plan.child_idx
+        i = 0
+        while True:
+            for c in range(off[i], off[i + 1]):
+                j = idx[c]
+                if active(j):
+                    i = j
+                    break
+            else:
+                return i
+
+    def _evaluate(self, ts: Optional[int]) -> None:
+        tree = self._tree
+        t = time.perf_counter_ns()
+        leaf = self._descend()
+        tree._set_leaf(leaf, ts)
+        ns = time.perf_counter_ns() - t
+        self.eval_ns += ns
+        self.samples += 1
+        self.deepest[leaf] += 1
+        if tree._changed:
+            self.transitions += 1
+            if self.on_transition is not None:
+                self.on_transition(tree._transition)
+        if self.on_eval is not None:
+            self.on_eval(tree._plan.paths[leaf], ns)
+
+    def _hold(self, ts: Optional[int]) -> None:
+        tree = self._tree
+        if tree._leaf < 0:
+            self._evaluate(ts)
+            return
+        tree._changed = False
+        self.samples += 1
+        self.deepest[tree._leaf] += 1
+
+    # ---------------- 批量求值（替换 _active_batch / _deepest_batch） ----------------
+    def _active_batch(self, batches: Dict[int, WindowBatch], n: int) -> np.ndarray:
+        clock = time.perf_counter_ns
+        unit_off = self._tree._plan.unit_off
+        out = np.ones((len(self._tree._order), n), dtype=bool)
+        for i in range(len(self._tree._order)):
+            active = out[i]
+            for u in range(unit_off[i], unit_off[i + 1]):
+                unit = self._units[u]
+                t = clock()
+                hits = unit.check_batch(batches[id(unit._win)])
+                self.agg_ns[u] += clock() - t
+                self.checks[u] += n
+                self.hits[u] += int(np.count_nonzero(hits))
+                active &= hits
+            self.node_checks[i] += n
+            self.node_hits[i] += int(np.count_nonzero(active))
+        return out
+
+    def _deepest_batch(self, batches: Dict[int, WindowBatch], ts: np.ndarray) -> np.ndarray:
+        tree = self._tree
+        prev = tree._leaf
+        t = time.perf_counter_ns()
+        deepest = type(tree)._deepest_batch(tree, batches, ts)
+        ns = time.perf_counter_ns() - t
+        self.eval_ns += ns
+        self.samples += ts.size
+        for i, c in enumerate(np.bincount(deepest, minlength=len(self.deepest)).tolist()):
+            self.deepest[i] += c
+        change = np.flatnonzero(np.diff(deepest, prepend=prev))
+        self.transitions += change.size
+        paths = tree._plan.paths
+        if self.on_transition is not None:
+            from .tree import Transition
+
+            for k in change.tolist():
+                old = prev if k == 0 else int(deepest[k - 1])
+                self.on_transition(Transition(paths[old] if old >= 0 else (), paths[deepest[k]], int(ts[k])))
+        if self.on_eval is not None:
+            self.on_eval(paths[int(deepest[-1])], ns)
+        return deepest
+
+    # ---------------- 汇总 ----------------
+    def stats(self) -> TreeStats:
+        tree = self._tree
+        order, parents = tree._order, tree._parents
+        active = list(self.deepest)
+        for i in range(len(order) - 1, 0, -1):       # 先序：子节点下标总大于父节点
+            active[parents[i]] += active[i]
+        nodes = [
+            NodeStats(nd.node_id, self.node_checks[i], self.node_hits[i], active[i], self.deepest[i])
+            for i, nd in enumerate(order)
+        ]
+        pps = tree._pps
+        units = []
+        for u, unit in enumerate(self._units):
+            win, key = unit._win, id(unit._win)
+            units.append(UnitStats(
+                node_id=order[self._unit_node[u]].node_id,
+                metric=unit.metric,
+                agg=unit._info.agg,
+                window=_window_label(win),
+                pushes=self.win_pushes.get(key, 0),
+                push_ns=self.win_ns.get(key, 0),
+                checks=self.checks[u],
+                hits=self.hits[u],
+                agg_ns=self.agg_ns[u],
+                length=win.length(),
+                fill=win.length() / win._cfg.nominal_size(pps),
+            ))
+        return TreeStats(self.samples, self.transitions, self.eval_ns, sum(self.win_ns.values()), nodes, units)
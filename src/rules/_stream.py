@@ -0,0 +1,111 @@
+# ========================= rules/_stream.py ==========================
+"""asyncio 流式接口：微批消费样本，只产出活跃路径变化事件。
+
+* 生产者协程把 ``source`` 读入有界队列；队列满时暂停读取（背压）
+* 消费者每次取出已就绪的最多 ``batch_size`` 条样本，转为列式后交给
+  ``RuleTree.push_batch``，整块计算在 executor 中执行，不阻塞事件循环
+* 同一时刻最多一个微批在执行，树状态只被顺序修改
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple
+
+from ..utils._lazy import lazy_import
+
+if TYPE_CHECKING:
+    from ._dto import SampleDTO
+    from .tree import RuleTree
+
+np = lazy_import("numpy")
+
+__all__ = ["PathEvent", "astream"]
+
+_DONE = object()
+
+
+@dataclass(frozen=True)
+class PathEvent:
+    """一次活跃路径变化：``ts`` 时刻起路径变为 ``active_path``。"""
+
+    ts: int
+    active_path: List[str]
+    reached_leaf: bool
+
+
+@dataclass(frozen=True)
+class _Failed:
+    """生产者异常的载体（在消费者侧重新抛出）。"""
+
+    exc: BaseException
+
+
+def _to_columns(
+    rows: List[SampleDTO | Mapping[str, Any]], metrics: List[str]
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """把一批样本（dict / SampleDTO）转为 ``push_batch`` 所需的列式输入。"""
+    rows = [r if isinstance(r, Mapping) else r.model_dump() for r in rows]   # SampleDTO 不是 Mapping
+    n = len(rows)
+    try:
+        ts = np.fromiter((r["ts"] for r in rows), dtype=np.int64, count=n)
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"every sample needs an integer 'ts': {exc}") from None
+    nan = math.nan
+    cols = {m: np.fromiter((r.get(m, nan) for r in rows), dtype=np.float64, count=n) for m in metrics}
+    return cols, ts
+
+
+def _ingest(tree: "RuleTree", rows: List[Any], is_leaf: Dict[str, bool]) -> List[PathEvent]:
+    """同步执行一个微批，返回其中的路径变化事件（在 executor 中运行）。"""
+    cols, ts = _to_columns(rows, tree.metrics)
+    return [PathEvent(t, path, is_leaf[path[-1]]) for t, path in tree.push_batch(cols, ts)]
+
+
+async def astream(
+    tree: "RuleTree",
+    source: AsyncIterator[SampleDTO | Mapping[str, Any]],
+    *,
+    batch_size: int = 256,
+    max_queue: int = 1024,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[PathEvent]:
+    """见 ``RuleTree.astream``。"""
+    if batch_size < 1 or max_queue < 1:
+        raise ValueError("batch_size and max_queue must be >= 1")
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=max_queue)
+    is_leaf = {n.node_id: n.is_leaf for n in tree._order}
+
+    async def produce() -> None:
+        try:
+            async for sample in source:
+                await queue.put(sample)
+        except Exception as exc:
+            await queue.put(_Failed(exc))
+        else:
+            await queue.put(_DONE)
+
+    producer = asyncio.create_task(produce())
+    try:
+        done = False
+        while not done:
+            # 至少等待一条，然后取走所有已就绪的（至多 batch_size 条）
+            rows: List[Any] = [await queue.get()]
+            while len(rows) < batch_size and not queue.empty():
+                rows.append(queue.get_nowait())
+
+            tail = rows[-1]
+            if tail is _DONE or isinstance(tail, _Failed):
+                rows.pop()
+                done = True
+            if rows:
+                for event in await loop.run_in_executor(executor, _ingest, tree, rows, is_leaf):
+                    yield event
+            if isinstance(tail, _Failed):
+                raise tail.exc
+    finally:
+        producer.cancel()
@@ -0,0 +1,253 @@
+# ========================= rules/_template.py ========================
+"""编译模板：同一配置只校验 / 编译一次，新实例只分配窗口状态。
+
+* 模板 = 规范化后的树结构（先序节点、父子下标、逐 Unit 配置）+ 生成并编译好的
+  ``descend`` 代码对象 + 配置哈希；全部为只读数据，可在任意多个实例间共享
+* 键 = sha256(原始配置文本 + pps + codegen)：命中时连 JSON 解析与 pydantic
+  校验都跳过（pydantic 也不会被导入）；``RuleDTO`` 仅在需要时
+  （``RuleTree._cfg``）才从规范化 JSON 重建
+* 进程内缓存为有界 LRU；给出 ``cache_dir`` 时模板另存为
+  ``<键>.<解释器标签>.pkl``（代码对象用 marshal 序列化，只在同一解释器版本间复用），
+  目录应当可信——读取即反序列化
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import marshal
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from ._node import Node
+from ._plan import Plan
+from ._signal import SignalGraph
+from ._snapshot import config_hash
+from ._unit import Unit
+from ._window import Window
+
+if TYPE_CHECKING:
+    from ._dto import RuleDTO
+
+__all__ = ["TreeTemplate", "template", "clear_cache", "load_cfg"]
+
+_FORMAT = 3                 # 磁盘格式版本（并入键）
+_MAX_ENTRIES = 1024         # 进程内缓存上限
+
+UnitSpec = Tuple[Window.Config, Unit.Info]          # 窗口配置 + 只读描述（metric / agg / 区间）
+
+
+def load_cfg(raw: str | Dict[str, Any] | RuleDTO) -> str | Dict[str, Any] | RuleDTO:
+    """字符串若为已存在的文件路径则读出其内容（JSON 文本直接返回）。"""
+    if isinstance(raw, str) and not raw.lstrip().startswith("{"):
+        path = Path(raw)
+        if path.is_file():
+            return path.read_text()
+    return raw
+
+
+def _validate(raw: str | Dict[str, Any] | RuleDTO) -> RuleDTO:
+    from ._dto import RuleDTO               # pydantic 只在真正需要校验时才导入
+
+    if isinstance(raw, RuleDTO):
+        return raw
+    if isinstance(raw, str):
+        return RuleDTO.model_validate_json(raw)
+    return RuleDTO.model_validate(raw)
+
+
+def _raw_key(raw: str | Dict[str, Any] | RuleDTO, pps: int, codegen: bool) -> bytes:
+    if isinstance(raw, str):
+        blob = raw
+    elif hasattr(raw, "model_dump_json"):   # RuleDTO（不为类型判断导入 pydantic）
+        blob = raw.model_dump_json(exclude_none=False)
+    else:
+        blob = json.dumps(raw, sort_keys=True, separators=(",", ":"), default=str)
+    tail = f"|pps={pps}|codegen={int(codegen)}|v={_FORMAT}"
+    return hashlib.sha256((blob + tail).encode()).digest()
+
+
+# ---------------- 结构整理（与 Plan 的先序编号一致） ----------------
+def reorder(root: Node) -> None:
+    """每层把无条件（else）子节点稳定地排到最后。"""
+    stack: List[Tuple[Node, bool]] = [(root, False)]
+    while stack:
+        node, visited = stack.pop()
+        if not visited:
+            stack.append((node, True))
+            stack.extend((s, False) for s in node.subs)
+        else:
+            node.subs.sort(key=lambda n: n.is_unconditional)
+
+
+def index(root: Node) -> Tuple[List[Node], List[int], List[List[int]]]:
+    """先序节点表（与 ``Node.check_batch`` 一致）及父 / 子下标。"""
+    order: List[Node] = []
+    parents: List[int] = []
+    children: List[List[int]] = []
+
+    def walk(node: Node, parent: int) -> int:
+        idx = len(order)
+        order.append(node)
+        parents.append(parent)
+        children.append([])
+        for s in node.subs:
+            children[idx].append(walk(s, idx))
+        return idx
+
+    walk(root, 0)
+    return order, parents, children
+
+
+# --------------------------------------------------------------------
+#                           模  板
+# --------------------------------------------------------------------
+@dataclass
+class TreeTemplate:
+    """一份配置编译后的只读结构（按先序下标索引）。"""
+
+    config_hash: bytes
+    cfg_json: str
+    unconditional: Tuple[bool, ...]
+    parents: Tuple[int, ...]
+    children: Tuple[Tuple[int, ...], ...]
+    units: Tuple[Tuple[UnitSpec, ...], ...]
+    metrics: Tuple[str, ...]
+    plan: Plan                                  # 计划骨架（不含实例的读取器，见 ``Plan.skeleton``）
+    _cfg: Optional[RuleDTO] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def compile(cls, cfg: RuleDTO, *, pps: int, codegen: bool) -> "TreeTemplate":
+        """完整校验并编译 ``cfg``（构建一棵临时树，提取结构与生成的代码）。"""
+        root = Node.from_cfg(cfg, pps=pps, graph=SignalGraph(pps=pps))
+        reorder(root)
+        order, parents, children = index(root)
+        plan = Plan.compile(order, parents, children, codegen=codegen)
+        units = tuple(tuple((u._win._cfg, u.get_info()) for u in node.units) for node in order)
+        return cls(
+            config_hash=config_hash(cfg, pps),
+            cfg_json=cfg.model_dump_json(exclude_none=False),
+            unconditional=tuple(n.is_unconditional for n in order),
+            parents=tuple(parents),
+            children=tuple(tuple(c) for c in children),
+            units=units,
+            metrics=tuple(sorted({info.metric for spec in units for _, info in spec})),
+            plan=plan.skeleton(),
+            _cfg=cfg,
+        )
+
+    @property
+    def cfg(self) -> RuleDTO:
+        if self._cfg is None:
+            from ._dto import RuleDTO
+
+            self._cfg = RuleDTO.model_validate_json(self.cfg_json)
+        return self._cfg
+
+    def instantiate(
+        self, graph: SignalGraph
+    ) -> Tuple[Node, List[Node], Tuple[int, ...], Tuple[Tuple[int, ...], ...], Plan]:
+        """在 ``graph`` 上分配一份新的窗口 / Unit / 节点，返回 (根, 先序表, 父, 子, 计划)。
+
+        父 / 子下标为模板自身的只读元组，各实例共享。
+        """
+        node_ids = self.plan.node_ids
+        order: List[Node] = [None] * len(node_ids)          # type: ignore[list-item]
+        for i in range(len(node_ids) - 1, -1, -1):           # 先序：子节点下标总大于父节点
+            units = [Unit.bind(graph, *spec) for spec in self.units[i]]
+            subs = [order[c] for c in self.children[i]]
+            order[i] = Node.assemble(node_ids[i], self.unconditional[i], units, subs)
+        return order[0], order, self.parents, self.children, self.plan.rebind(order)
+
+    # ---------------- 磁盘格式 ----------------
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        code = self.plan.code
+        state["plan"] = replace(self.plan, code=None)
+        state["code"] = None if code is None else marshal.dumps(code)
+        state["_cfg"] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        code = state.pop("code")
+        if code is not None:
+            state["plan"] = replace(state["plan"], code=marshal.loads(code))
+        self.__dict__.update(state)
+
+
+# --------------------------------------------------------------------
+#                           缓  存
+# --------------------------------------------------------------------
+_cache: "OrderedDict[bytes, TreeTemplate]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _disk_path(cache_dir: str | Path, key: bytes) -> Path:
+    return Path(cache_dir) / f"{key.hex()}.{sys.implementation.cache_tag}.pkl"
+
+
+def _read_disk(path: Path) -> Optional[TreeTemplate]:
+    try:
+        with open(path, "rb") as fh:
+            tpl = pickle.load(fh)
+    except Exception:                          # 不存在 / 损坏 / 版本不符：视为未命中，重新编译覆盖
+        return None
+    return tpl if isinstance(tpl, TreeTemplate) else None
+
+
+def _write_disk(path: Path, tpl: TreeTemplate) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as fh:
+        pickle.dump(tpl, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)                      # 原子替换：并发进程只会读到完整文件
+
+
+def template(
+    raw: str | Dict[str, Any] | RuleDTO,
+    *,
+    pps: int,
+    codegen: bool = True,
+    cache_dir: Optional[str | Path] = None,
+) -> TreeTemplate:
+    """返回 ``raw``（JSON 文本 / 文件路径 / dict / RuleDTO）的编译模板。
+
+    依次查进程内缓存、``cache_dir``，都未命中时完整校验并编译，再写回两级缓存；
+    进程内命中但 ``cache_dir`` 中尚无该模板时同样补写磁盘。校验失败照常抛出
+    ``ValidationError`` / ``ValueError``，不会被缓存。
+    """
+    raw = load_cfg(raw)
+    key = _raw_key(raw, pps, codegen)
+    path = _disk_path(cache_dir, key) if cache_dir is not None else None
+    with _lock:
+        tpl = _cache.get(key)
+        if tpl is not None:
+            _cache.move_to_end(key)
+    if tpl is not None:
+        if path is not None and not path.exists():
+            _write_disk(path, tpl)
+        return tpl
+
+    tpl = _read_disk(path) if path is not None else None
+    if tpl is None:
+        tpl = TreeTemplate.compile(_validate(raw), pps=pps, codegen=codegen)
+        if path is not None:
+            _write_disk(path, tpl)
+
+    with _lock:
+        _cache[key] = tpl
+        if len(_cache) > _MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return tpl
+
+
+def clear_cache() -> None:
+    """清空进程内模板缓存（磁盘缓存不受影响）。"""
+    with _lock:
+        _cache.clear()
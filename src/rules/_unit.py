@@ -1,10 +1,17 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Callable, List, Optional, Tuple, Type
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple, Type
 
+from ..utils._lazy import lazy_import
 from ..utils._metrics_kit import MetricsKit
 from ..utils._cmp_kit import CmpKit
-from ._window import Window
+from ._window import Backend, Window, WindowBatch
+
+if TYPE_CHECKING:
+    from ._dto import UnitDTO
+    from ._signal import SignalGraph
+
+np = lazy_import("numpy")
 
 __all__ = ["Unit"]
 
@@ -13,9 +20,56 @@ def _always_true(*_: float) -> bool:
     return True
 
 
-@dataclass
+@dataclass(slots=True)
 class Unit:
     """滑动窗口 + 聚合 + 比较的一体化单元。"""
+
+    # ───────────────── Info: 只读描述信息 ─────────────────
+    @dataclass(slots=True)
+    class Info:
+        """Unit 描述信息（供 Node / RuleTree 展示使用）。"""
+
+        metric: str
+        agg: str
+        cmp_type: str
+        cmp_bounds: Tuple[float, float]
+        window_type: str
+        capacity: Optional[int]
+
+    @classmethod
+    def from_cfg(
+        cls,
+        cfg: UnitDTO,
+        pps: int,
+        *,
+        backend: Backend = "deque",
+        graph: Optional["SignalGraph"] = None,
+    ) -> "Unit":
+        """根据 UnitDTO + pps 构建 Unit。
+
+        给定 ``graph`` 时窗口取自共享信号图（相同 metric + 窗口配置只存一份，
+        由图统一写入）；否则新建私有窗口（``backend`` 透传给 Window）。
+        """
+        win_cfg = Window.Config(**cfg.window.model_dump())
+        if graph is not None:
+            win = graph.window(cfg.metric, win_cfg)
+        else:
+            win = Window.from_cfg(win_cfg, pps, backend=backend)
+        return cls.create(
+            win, cfg.agg, CmpKit, cfg.cmp.type, tuple(cfg.cmp.value), metric=cfg.metric,
+        )
+
+    @classmethod
+    def bind(cls, graph: "SignalGraph", win_cfg: Window.Config, info: "Unit.Info") -> "Unit":
+        """按已校验过的配置在 ``graph`` 上直接构建 Unit（跳过 ``create`` 的参数校验）。
+
+        供编译模板实例化使用：配置在首次编译时已经过 ``from_cfg`` 的完整校验，
+        ``info`` 为只读描述，可在同一配置的各实例间共享。
+        """
+        win = graph.window(info.metric, win_cfg)
+        cmp_type = info.cmp_type
+        return cls(win, win.reader(info.agg), CmpKit.get(cmp_type), info.cmp_bounds, info, CmpKit.get_vec(cmp_type))
+
     @classmethod
     def create(
         cls,
@@ -24,6 +78,8 @@ class Unit:
         cmp_kit: Type[CmpKit],
         cmp_type: str,
         cmp_bounds: Tuple[float, float] = (0.0, 0.0),
+        *,
+        metric: str = "",
     ) -> "Unit":
         """
         Parameters
@@ -38,14 +94,16 @@ class Unit:
             比较函数名
         cmp_bounds : Tuple[float, float]
             比较上下界 (lower, upper)
+        metric : str
+            该单元读取的指标名
         """
         # ---------------- 参数校验集中处理 ----------------
         errors: List[str] = []
 
-        if agg != "none" and not MetricsKit.has(agg):   
+        if agg != "none" and not MetricsKit.has(agg):
             errors.append(f"Unknown aggregation type: {agg}")
 
-        if cmp_type and not cmp_kit.has(cmp_type):     
+        if cmp_type and not cmp_kit.has(cmp_type):
             errors.append(f"Unknown comparison type: {cmp_type}")
 
         if cmp_bounds[0] > cmp_bounds[1]:
@@ -55,35 +113,52 @@ class Unit:
             raise ValueError("Invalid Unit configuration:\n" + "\n".join(errors))
 
         # ---------------- 函数解析 ----------------
-        agg_fn = None if agg == "none" else MetricsKit.get(agg)
+        # 聚合读取器挂在窗口上：优先流式增量状态，同窗口同 agg 的 Unit 共享
+        read_fn = win.reader(agg)
         cmp_fn = cmp_kit.get(cmp_type) if cmp_type else _always_true
+        cmp_vec = cmp_kit.get_vec(cmp_type) if cmp_type else None
 
-        return cls(win, agg_fn, cmp_fn, cmp_bounds)
+        info = cls.Info(metric, agg, cmp_type, cmp_bounds, win.type, win.capacity())
+        return cls(win, read_fn, cmp_fn, cmp_bounds, info, cmp_vec)
 
     # -------- 主执行逻辑 --------
-    def push_and_check(self, value: float) -> bool:
-        """写入数据并立即判断是否命中比较条件。"""
-        self._win.push(value)
-
+    def check(self) -> bool:
+        """基于窗口当前内容判断是否命中比较条件。"""
         if not self._win.is_ready():
             return False
 
-        if self._agg_fn is None:
-            raise ValueError("Aggregation function is not set. Use 'none' for no aggregation.")
-
-        vals = self._agg_fn(self._win.values())
+        vals = self._read_fn()
         if not vals:
             return False
 
         lower, upper = self._cmp_bounds
         return self._cmp_fn(vals, lower, upper)
 
+    def check_batch(self, batch: WindowBatch) -> np.ndarray:
+        """基于本单元窗口的批量视图返回逐样本判定结果（不写入）。"""
+        vals = batch.agg(self._info.agg)
+        hits = batch.ready & (vals != 0)
+        if self._cmp_vec is not None:
+            lower, upper = self._cmp_bounds
+            hits &= self._cmp_vec(vals, lower, upper)
+        return hits
+
     def reset(self) -> None:
         """清空窗口历史数据。"""
         self._win.reset()
 
+    def get_info(self) -> "Unit.Info":
+        """返回本单元的描述信息。"""
+        return self._info
+
+    @property
+    def metric(self) -> str:
+        return self._info.metric
+
     # -------- 数据字段 --------
     _win: Window
-    _agg_fn: Optional[Callable[[List[float]], float]]
+    _read_fn: Callable[[], float]
     _cmp_fn: Callable[[float, float, float], bool]
     _cmp_bounds: Tuple[float, float]
+    _info: "Unit.Info"
+    _cmp_vec: Optional[Callable[[np.ndarray, float, float], np.ndarray]] = None
@@ -1,50 +1,305 @@
 from __future__ import annotations
+import math
 from collections import deque
-from typing import Literal, List, Optional
-from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Literal, List, Optional, Set, Tuple, Type, TypeVar
+from dataclasses import dataclass, field
+
+from ..utils._lazy import lazy_import
+from ..utils._metrics_kit import MetricsKit, RangeStats, StreamAgg
+
+np = lazy_import("numpy")
 
 __all__ = ["Window"]
 
+_S = TypeVar("_S", bound=StreamAgg)
+
+Backend = Literal["deque", "ring"]
+
+TS_PER_SEC = 1000          # SampleDTO.ts 的单位：毫秒
+_TIME_INIT_CAP = 64        # 时间窗口（ring 后端）的初始容量，之后随实际采样率伸缩
+_DEFER_RATIO = 4           # hop * 该值 >= 窗口长度时，流式状态改为在求值边界上重建
+
+
+class RingBuffer:
+    """预分配 float64 环形缓冲区（镜像双写）。
+
+    每个槽位同时写入 ``i`` 与 ``i + cap`` 两处，因此从 ``head`` 起长度为
+    ``size`` 的窗口内容总是 ``_arr[head:head + size]`` 这一段**连续内存**，
+    ``view()`` 可零拷贝交给 numpy 聚合；代价是 2 倍存储与每次 2 次写入。
+
+    ``grow=True`` 时不设上限（``maxlen`` 为 ``None``）：写满时容量翻倍，
+    ``popleft`` 后占用不足 1/4 时减半，供按时间戳淘汰的时间窗口使用。
+
+    接口与 ``deque(maxlen=cap)`` 中 Window 用到的部分保持一致。
+    """
+
+    __slots__ = ("_arr", "_cap", "_min", "_head", "_size", "maxlen")
+
+    def __init__(self, maxlen: int, *, grow: bool = False) -> None:
+        self.maxlen: Optional[int] = None if grow else maxlen
+        self._cap = self._min = max(1, maxlen)
+        self._arr = np.zeros(2 * self._cap, dtype=np.float64)
+        self._head = 0
+        self._size = 0
+
+    def append(self, x: float) -> None:
+        cap = self._cap
+        if self._size == cap:
+            if self.maxlen is None:
+                self._resize(2 * cap)
+                self.append(x)
+                return
+            self._head += 1
+            if self._head == cap:
+                self._head = 0
+            pos = self._head + cap - 1
+        else:
+            pos = self._head + self._size
+            self._size += 1
+        if pos >= cap:
+            pos -= cap
+        arr = self._arr
+        arr[pos] = x
+        arr[pos + cap] = x
+
+    def popleft(self) -> float:
+        if not self._size:
+            raise IndexError("pop from an empty ring buffer")
+        x = float(self._arr[self._head])
+        self._head += 1
+        if self._head == self._cap:
+            self._head = 0
+        self._size -= 1
+        if self.maxlen is None and self._cap > self._min and 4 * self._size <= self._cap:
+            self._resize(self._cap // 2)
+        return x
+
+    def _resize(self, cap: int) -> None:
+        vals = self._arr[self._head:self._head + self._size].copy()
+        self._cap = cap
+        self._arr = np.zeros(2 * cap, dtype=np.float64)
+        self.load(vals)
+
+    def load(self, vals: np.ndarray) -> None:
+        """以 ``vals``（长度不超过容量，从旧到新）整体替换缓冲区内容。"""
+        n = vals.size
+        if n > self._cap and self.maxlen is None:
+            self._cap = 1 << (n - 1).bit_length()
+            self._arr = np.zeros(2 * self._cap, dtype=np.float64)
+        cap = self._cap
+        self._arr[:n] = vals
+        self._arr[cap:cap + n] = vals
+        self._head = 0
+        self._size = n
+
+    def view(self) -> np.ndarray:
+        """窗口内容的只读连续视图（从旧到新，零拷贝）。"""
+        v = self._arr[self._head:self._head + self._size]
+        v.flags.writeable = False
+        return v
+
+    def clear(self) -> None:
+        self._head = 0
+        self._size = 0
+        if self.maxlen is None and self._cap != self._min:
+            self._cap = self._min
+            self._arr = np.zeros(2 * self._cap, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, i: int) -> float:
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("ring buffer index out of range")
+        return float(self._arr[self._head + i])
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self._arr[self._head:self._head + self._size].tolist())
+
 
-@dataclass
+class _Reader:
+    """窗口上某个聚合的读取器：同一 tick 内只计算一次（按窗口 + agg 去重）。"""
+
+    __slots__ = ("_win", "_fn", "_tick", "_val")
+
+    def __init__(self, win: "Window", fn: Callable[[], float]) -> None:
+        self._win = win
+        self._fn = fn
+        self._tick = -1
+        self._val = math.nan
+
+    def __call__(self) -> float:
+        t = self._win._tick
+        if t != self._tick:
+            self._val = self._fn()
+            self._tick = t
+        return self._val
+
+
+class WindowBatch:
+    """一次批量写入中单个窗口的逐样本视图。
+
+    第 ``i`` 个样本写入后的窗口内容为 ``arr[starts[i]:ends[i] + 1]``；
+    ``ready`` 为逐样本的 ``is_ready()``；``agg(name)`` 按聚合名缓存结果，
+    同一窗口上的多个 Unit 共享同一次计算。
+
+    hopping 窗口给出 ``pick``：此时 ``starts`` / ``ends`` 只含求值边界上的
+    样本，第 ``i`` 个样本沿用第 ``pick[i]`` 个边界的聚合值（只在边界上计算）；
+    ``pick[i] < 0``（本批首个边界之前）取 ``held`` —— 批前锁存的聚合值。
+    """
+
+    __slots__ = ("arr", "starts", "ends", "ready", "_span", "_stats", "_cache", "_pick", "_held")
+
+    def __init__(self, arr: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                 ready: np.ndarray, span: int, pick: Optional[np.ndarray] = None,
+                 held: Optional[Dict[str, float]] = None) -> None:
+        self.arr = arr
+        self.starts = starts
+        self.ends = ends
+        self.ready = ready
+        self._span = span
+        self._stats: Optional[RangeStats] = None
+        self._cache: Dict[str, np.ndarray] = {}
+        self._pick = pick
+        self._held = held or {}
+
+    def agg(self, name: str) -> np.ndarray:
+        """逐样本聚合值（``"none"`` 为最新值）。"""
+        out = self._cache.get(name)
+        if out is not None:
+            return out
+        if name == "none":
+            out = self.arr[self.ends]
+        else:
+            sliding = MetricsKit.sliding(name)
+            if sliding is not None:
+                if self._stats is None:
+                    self._stats = RangeStats(self.arr, self._span)
+                out = sliding(self._stats, self.starts, self.ends)
+            else:
+                fn = MetricsKit.get(name)
+                out = np.array([fn(self.arr[s:e + 1]) for s, e in zip(self.starts, self.ends)])
+        if self._pick is not None:
+            pick = self._pick
+            rows = np.full(pick.size, self._held.get(name, math.nan))
+            sel = pick >= 0
+            rows[sel] = out[pick[sel]]
+            out = rows
+        self._cache[name] = out
+        return out
+
+
+@dataclass(slots=True)
 class Window:
     """滑动窗口对象（内部核心组件）。
 
     Parameters
     ----------
-    _buf : deque[float]
-        底层循环缓冲区，`maxlen` 与窗口容量一致。
+    _buf : deque[float] | RingBuffer
+        底层循环缓冲区；计数窗口 `maxlen` 与窗口容量一致，时间窗口不设上限
+        （随实际采样率伸缩）。``backend="ring"`` 时为 numpy 环形缓冲区，
+        ``values()`` 返回零拷贝视图。
     _cfg : Window.Config
         窗口配置（类型、时间/计数大小）。
+    _streams : list[StreamAgg]
+        挂载在本窗口上的流式聚合状态，随 append / evict 增量更新。
+    _tick : int
+        写入计数，聚合读取器据此判断缓存是否过期。
+    _readers : dict[str, _Reader]
+        按聚合名去重的读取器。
+    _ts : deque[int] | None
+        时间窗口中与 ``_buf`` 一一对应的时间戳（计数窗口为 ``None``）。
+    _span : int
+        时间窗口跨度（时间戳单位，即 ``sec * TS_PER_SEC``）。
+    _t0 : int | None
+        自上次 reset 以来最早的时间戳，用于判断窗口是否已覆盖完整跨度。
+    _hop : int
+        求值步长（见 ``Config.stride``）；``0`` 为逐样本滑动。
+    _phase : int
+        hopping 窗口的步长相位：计数窗口为自上次求值边界以来的样本数，
+        时间窗口为上次求值所在的时间片 ``ts // hop``（``-1`` 表示尚未求值）。
+    _ready : bool
+        hopping 窗口在上次求值边界锁存的 ``is_ready()``。
+    _defer : bool
+        流式状态不逐条更新、只在求值边界上一次性重建（步长不小于窗口
+        长度的 ``1 / _DEFER_RATIO`` 时启用，重建开销按步长均摊）。
+
+    hopping / tumbling 窗口照常逐条写入缓冲区与流式状态，但只在求值边界上
+    推进 ``_tick``、锁存就绪状态并计算全部聚合读取器；两个边界之间
+    ``is_ready()`` 与各读取器返回的都是上个边界的结果。边界定义：
+
+    * 计数窗口 —— 自 reset 起每第 ``hop`` 条样本写入之后
+    * 时间窗口 —— 每个时间片 ``[k * hop, (k + 1) * hop)`` 中首条样本写入之后
+      （时间片按 ts 绝对对齐；迟到样本只写入，不构成边界）
     """
 
     # ───────────────── Config: 内聚配置结构 ─────────────────
-    @dataclass
+    @dataclass(slots=True)
     class Config:
         """窗口配置结构体。
 
         Attributes
         ----------
         type : {"time", "count"}
-            * ``"time"``  —— 时间窗口，容量 = ``pps * sec + 1``
+            * ``"time"``  —— 时间窗口，保留 ``ts >= 最新ts - sec * TS_PER_SEC``
+              的样本；自首个样本起跨满 ``sec`` 秒后就绪
             * ``"count"`` —— 计数窗口，容量 = ``size``
         sec : int, default ``1``
             时间窗口持续秒数，仅 ``type == "time"`` 时生效。
         size : int, default ``1``
             计数窗口点数，仅 ``type == "count"`` 时生效。
+        mode : {"sliding", "hopping", "tumbling"}, default ``"sliding"``
+            求值节奏，见 ``stride``。
+        hop : int | None
+            hopping 窗口的步长（计数窗口为点数，时间窗口为毫秒）。
+        resolution : int | None
+            时间窗口的分桶宽度（毫秒）；给出时窗口只保存逐桶统计量，
+            见 ``_bucket.BucketWindow``。
         """
 
         type: Literal["time", "count"]
         sec: int = 1
         size: int = 1
+        mode: Literal["sliding", "hopping", "tumbling"] = "sliding"
+        hop: Optional[int] = None
+        resolution: Optional[int] = None
+
+        def nominal_size(self, pps: int) -> int:
+            """名义点数：时间窗口按 ``pps`` 估算为 ``pps * sec + 1``，计数窗口为 ``size``。"""
+            return max(1, pps * self.sec + 1) if self.type == "time" else self.size
+
+        def stride(self) -> int:
+            """求值步长：滑动窗口为 ``0``（逐样本），tumbling 为窗口长度，hopping 为 ``hop``。
+
+            计数窗口单位为点数，时间窗口单位为 ts（毫秒）。
+            """
+            if self.mode == "sliding":
+                return 0
+            if self.mode == "hopping":
+                assert self.hop is not None
+                return self.hop
+            return self.size if self.type == "count" else self.sec * TS_PER_SEC
 
     # ───────────────── 字段定义 ─────────────────
-    _buf: deque[float]
+    _buf: deque[float] | RingBuffer
     _cfg: Config
+    _streams: List[StreamAgg] = field(default_factory=list)
+    _evicted: int = 0                     # 距上次重建以来的淘汰次数
+    _tick: int = 0
+    _readers: Dict[str, _Reader] = field(default_factory=dict)
+    _ts: Optional[deque[int]] = None
+    _span: int = 0
+    _t0: Optional[int] = None
+    _hop: int = 0
+    _phase: int = 0
+    _ready: bool = False
+    _defer: bool = False
 
     # ───────────────── 工厂方法 ─────────────────
     @classmethod
-    def from_cfg(cls, cfg: Config, pps: int) -> "Window":
+    def from_cfg(cls, cfg: Config, pps: int, *, backend: Backend = "deque") -> "Window":
         """根据配置创建窗口。
 
         Parameters
@@ -52,15 +307,274 @@ class Window:
         cfg : Window.Config
             窗口配置对象。
         pps : int
-            每秒数据点数（points-per-second）。
+            每秒数据点数（points-per-second）。时间窗口只用它估算初始容量，
+            实际点数由时间戳决定。
+        backend : {"deque", "ring"}, default ``"deque"``
+            存储后端：``"deque"`` 为 Python 双端队列；``"ring"`` 为预分配
+            float64 环形缓冲区，聚合时不再产生列表 / 数组拷贝。
         """
-        size = (max(1, pps * cfg.sec + 1) if cfg.type == "time" else cfg.size)
-        return cls(deque(maxlen=size), cfg)
+        if backend not in ("deque", "ring"):
+            raise ValueError(f"Unknown window backend: {backend}")
+        if cfg.resolution is not None:
+            from ._bucket import BucketWindow     # 分桶窗口不保存原始样本，与后端无关
+            return BucketWindow.bucketed(cfg)
+        hop = cfg.stride()
+        if cfg.type == "time":
+            init = min(cfg.nominal_size(pps), _TIME_INIT_CAP)
+            buf = RingBuffer(init, grow=True) if backend == "ring" else deque()
+            span = cfg.sec * TS_PER_SEC
+            return cls(buf, cfg, _ts=deque(), _span=span, _hop=hop, _phase=-1,
+                       _defer=hop > 0 and hop * _DEFER_RATIO >= span)
+        size = cfg.size
+        return cls(RingBuffer(size) if backend == "ring" else deque(maxlen=size), cfg,
+                   _hop=hop, _defer=hop > 0 and hop * _DEFER_RATIO >= size)
 
     # ───────────────── 公共接口 ─────────────────
-    def push(self, value: float) -> None:
-        """向窗口写入新值（自动转换为 ``float``）。"""
-        self._buf.append(float(value))
+    def push(self, value: float, ts: Optional[int] = None) -> bool:
+        """向窗口写入新值（自动转换为 ``float``），并同步更新流式聚合状态。
+
+        时间窗口必须给出 ``ts``：先按时间戳淘汰过期样本（单调时均摊 O(1)），
+        乱序样本插入到对应位置（O(n)），早于窗口下沿的迟到样本直接丢弃。
+        计数窗口忽略 ``ts``。
+
+        返回本次写入是否为求值边界（滑动窗口恒为 ``True``）。
+        """
+        v = float(value)
+        if self._ts is not None:
+            return self._push_timed(v, ts)
+        buf = self._buf
+        streams = self._streams
+        if not streams or self._defer:
+            buf.append(v)
+        else:
+            if len(buf) == buf.maxlen:
+                old = buf[0]
+                for s in streams:
+                    s.evict(old)
+                self._evicted += 1
+            buf.append(v)
+            for s in streams:
+                s.push(v)
+
+            # 每淘汰满一整窗重建一次，抵消增量累加的浮点漂移（均摊 O(1)）
+            if self._evicted >= len(buf):
+                self._evicted = 0
+                for s in streams:
+                    s.rebuild(self.values())
+
+        if self._hop:
+            self._phase += 1
+            if self._phase < self._hop:
+                return False
+            self._phase = 0
+            self._latch()
+            return True
+        self._tick += 1
+        return True
+
+    def _push_timed(self, v: float, ts: Optional[int]) -> bool:
+        if ts is None:
+            raise ValueError("time window requires a sample ts")
+        tq = self._ts
+        assert tq is not None
+        if tq and ts < tq[-1]:
+            self._insert_late(v, ts)
+            return not self._hop
+        if self._t0 is None:
+            self._t0 = ts
+
+        buf = self._buf
+        streams = () if self._defer else self._streams
+        lo = ts - self._span
+        while tq and tq[0] < lo:
+            tq.popleft()
+            old = buf.popleft()
+            for s in streams:
+                s.evict(old)
+            self._evicted += 1
+        buf.append(v)
+        tq.append(ts)
+        for s in streams:
+            s.push(v)
+
+        if self._evicted >= len(buf):
+            self._evicted = 0
+            for s in streams:
+                s.rebuild(self.values())
+
+        if self._hop:
+            k = ts // self._hop
+            if k == self._phase:
+                return False
+            self._phase = k
+            self._latch()
+            return True
+        self._tick += 1
+        return True
+
+    def _latch(self) -> None:
+        """求值边界：推进 tick，锁存就绪状态；就绪时立即计算全部读取器。"""
+        self._tick += 1
+        self._ready = ready = self._filled()
+        if ready:
+            if self._defer and self._streams:
+                vals = np.asarray(self.values(), dtype=np.float64)
+                for s in self._streams:
+                    s.rebuild(vals)
+            t = self._tick
+            for r in self._readers.values():
+                r._val = r._fn()
+                r._tick = t
+
+    def _held(self) -> Dict[str, float]:
+        """hopping 窗口当前锁存的聚合值（未就绪时为空）。"""
+        if not self._ready:
+            return {}
+        return {a: r() for a, r in self._readers.items()}
+
+    def _insert_late(self, v: float, ts: int) -> None:
+        """乱序样本：按时间戳插入后整体重建（慢路径）。"""
+        if not self._hop:
+            self._tick += 1
+        tss = np.fromiter(self._ts, dtype=np.int64)
+        if ts < tss[-1] - self._span:
+            return                               # 已滑出窗口的迟到样本
+        i = int(np.searchsorted(tss, ts, side="right"))
+        vals = np.insert(np.asarray(self.values(), dtype=np.float64), i, v)
+        self._replace(vals, np.insert(tss, i, ts))
+        self._t0 = ts if self._t0 is None else min(self._t0, ts)
+
+    def track(self, kind: Type[_S]) -> _S:
+        """挂载（或复用已挂载的）流式聚合状态，返回该状态实例。"""
+        for s in self._streams:
+            if type(s) is kind:
+                return s  # type: ignore[return-value]
+        s = kind()
+        if len(self._buf):                       # 新建状态即空窗口状态，无需重建
+            s.rebuild(self.values())
+        self._streams.append(s)
+        return s
+
+    def reader(self, agg: str) -> Callable[[], float]:
+        """返回 ``agg`` 在本窗口上的读取器（同名共享，每次写入后至多计算一次）。
+
+        有流式实现时读取 O(1) 增量状态（结果落在舍入边界附近、或增量误差过大时
+        对 ``values()`` 全量重算），否则对 ``values()`` 全量聚合；``"none"`` 读取最新值。
+        """
+        r = self._readers.get(agg)
+        if r is not None:
+            return r
+        stream = None if agg == "none" else MetricsKit.stream(agg)
+        if agg == "none":
+            fn: Callable[[], float] = self.last
+        elif stream is not None:
+            kind, read = stream
+            state = self.track(kind)
+            agg_fn = MetricsKit.get(agg)
+
+            def fn() -> float:
+                v = read(state)
+                if v is not None:
+                    return v
+                # 舍入边界附近 / 增量误差过大：全量重算；误差源于偏移量过时则顺带重建
+                vals = self.values()
+                if state.stale():
+                    state.rebuild(vals)
+                return agg_fn(vals)
+        else:
+            agg_fn = MetricsKit.get(agg)
+            fn = lambda: agg_fn(self.values())  # noqa: E731
+        r = self._readers[agg] = _Reader(self, fn)
+        return r
+
+    def retain(self, aggs: Set[str]) -> None:
+        """只保留 ``aggs`` 的读取器及其依赖的流式状态（热更新后丢弃不再使用的聚合）。"""
+        self._readers = {a: r for a, r in self._readers.items() if a in aggs}
+        kinds = {spec[0] for spec in (MetricsKit.stream(a) for a in aggs if a != "none") if spec}
+        self._streams = [s for s in self._streams if type(s) in kinds]
+
+    def push_batch(self, values: np.ndarray, ts: Optional[np.ndarray] = None) -> WindowBatch:
+        """批量写入 ``values``，返回逐样本视图（写入后窗口状态与逐条 ``push`` 一致）。
+
+        时间窗口需给出逐样本 ``ts``；时间戳单调时整批向量化（``searchsorted``
+        求每个样本的窗口下沿），否则退化为逐条写入并拼接窗口快照。
+        hopping 窗口只在求值边界上的样本处聚合（见 ``WindowBatch``）。
+        """
+        if self._ts is not None:
+            return self._push_batch_timed(np.asarray(values, dtype=np.float64), ts)
+        cap = self._buf.maxlen or 1
+        hist = np.asarray(self.values(), dtype=np.float64)
+        arr = np.concatenate((hist, np.asarray(values, dtype=np.float64)))
+        ends = np.arange(hist.size, arr.size)
+        starts = np.maximum(ends - cap + 1, 0)
+        ready = ends - starts + 1 == cap
+        if self._hop:
+            k = self._phase + np.arange(1, ends.size + 1)
+            if ends.size:
+                self._phase = int(k[-1] % self._hop)
+            return self._hop_batch(arr, None, starts, ends, ready, cap, k % self._hop == 0)
+        self.load(arr)
+        return WindowBatch(arr, starts, ends, ready, cap)
+
+    def _push_batch_timed(self, vals: np.ndarray, ts: Optional[np.ndarray]) -> WindowBatch:
+        if ts is None:
+            raise ValueError("time window requires sample ts")
+        ts = np.asarray(ts, dtype=np.int64)
+        hist_ts = np.fromiter(self._ts, dtype=np.int64)   # type: ignore[arg-type]
+        all_ts = np.concatenate((hist_ts, ts))
+        if ts.size and np.all(all_ts[1:] >= all_ts[:-1]):
+            hist = np.asarray(self.values(), dtype=np.float64)
+            arr = np.concatenate((hist, vals))
+            ends = np.arange(hist.size, arr.size)
+            starts = np.searchsorted(all_ts, all_ts[ends] - self._span, side="left")
+            t0 = int(ts[0]) if self._t0 is None else self._t0
+            ready = all_ts[ends] - t0 >= self._span
+            span = int((ends - starts).max()) + 1
+            self._t0 = t0
+            if self._hop:
+                k = ts // self._hop
+                emit = k != np.concatenate(([self._phase], k[:-1]))
+                self._phase = int(k[-1])
+                return self._hop_batch(arr, all_ts, starts, ends, ready, span, emit)
+            self._replace(arr[starts[-1]:], all_ts[starts[-1]:])
+            return WindowBatch(arr, starts, ends, ready, span)
+
+        # 乱序（或空批）：逐条写入，只在求值边界上记录窗口快照
+        held = self._held() if self._hop else None
+        segs: List[np.ndarray] = []
+        ready_l: List[bool] = []
+        pick: List[int] = []
+        for v, t in zip(vals.tolist(), ts.tolist()):
+            if self.push(v, t):
+                segs.append(np.array(self.values(), dtype=np.float64))
+            ready_l.append(self.is_ready())
+            pick.append(len(segs) - 1)
+        lens = np.array([seg.size for seg in segs], dtype=np.int64)
+        ends = np.cumsum(lens) - 1
+        starts = ends - lens + 1
+        arr = np.concatenate(segs) if segs else np.empty(0)
+        return WindowBatch(arr, starts, ends, np.array(ready_l, dtype=bool), int(lens.max(initial=1)),
+                           None if held is None else np.array(pick, dtype=np.intp), held)
+
+    def _hop_batch(self, arr: np.ndarray, all_ts: Optional[np.ndarray], starts: np.ndarray,
+                   ends: np.ndarray, ready: np.ndarray, span: int, emit: np.ndarray) -> WindowBatch:
+        """hopping 窗口批量写入的收尾（``emit`` 为逐样本是否为求值边界）。
+
+        窗口状态与逐条写入一致：先以最后一个边界处的内容锁存聚合值，
+        再换成批末内容（不推进 tick）。返回按边界取值的 ``WindowBatch``。
+        """
+        held, was_ready = self._held(), self._ready
+        hit = np.flatnonzero(emit)
+        pick = np.cumsum(emit) - 1
+        rows_ready = np.where(pick >= 0, ready[hit][np.maximum(pick, 0)] if hit.size else False, was_ready)
+        if hit.size:
+            b = int(hit[-1])
+            lo, hi = int(starts[b]), int(ends[b]) + 1
+            self._replace(arr[lo:hi], None if all_ts is None else all_ts[lo:hi])
+            self._latch()
+        lo = int(starts[-1])
+        self._replace(arr[lo:], None if all_ts is None else all_ts[lo:])
+        return WindowBatch(arr, starts[hit], ends[hit], rows_ready, span, pick, held)
 
     # -- 便捷只读属性 ------------------------------------
     @property
@@ -69,7 +583,7 @@ class Window:
         return self._cfg.type
 
     def capacity(self) -> Optional[int]:
-        """窗口**最大容量**（点数）。``deque.maxlen`` 可能为 ``None``。"""
+        """窗口**最大容量**（点数）。时间窗口不设上限，返回 ``None``。"""
         return self._buf.maxlen
 
     def length(self) -> int:
@@ -77,13 +591,132 @@ class Window:
         return len(self._buf)
 
     def is_ready(self) -> bool:
-        """窗口是否已填满（用于判断聚合函数是否可用）。"""
+        """窗口是否已填满（用于判断聚合函数是否可用）。
+
+        时间窗口：最新时间戳距 reset 以来的首个时间戳已达 ``sec`` 秒。
+        hopping 窗口返回上个求值边界锁存的结果。
+        """
+        if self._hop:
+            return self._ready
+        return self._filled()
+
+    def _filled(self) -> bool:
+        if self._ts is not None:
+            return self._t0 is not None and self._ts[-1] - self._t0 >= self._span
         return len(self._buf) == self._buf.maxlen and bool(self._buf)
 
-    def values(self) -> List[float]:
-        """以列表形式返回窗口当前全部数据（从旧到新）。"""
-        return list(self._buf)
+    def values(self) -> List[float] | np.ndarray:
+        """返回窗口当前全部数据（从旧到新）。
+
+        ``deque`` 后端返回新列表；``ring`` 后端返回只读 ndarray 视图（零拷贝，
+        仅在下一次 ``push`` 前有效）。
+        """
+        buf = self._buf
+        return buf.view() if isinstance(buf, RingBuffer) else list(buf)
+
+    def load(self, vals: np.ndarray, ts: Optional[np.ndarray] = None) -> None:
+        """以 ``vals``（从旧到新）整体替换窗口内容，超出容量时只保留最新部分。
+
+        等价于 ``reset()`` 后逐个 ``push``，但流式聚合状态一次性重建。
+        时间窗口需给出单调的 ``ts``，只保留最新时间戳前 ``sec`` 秒内的样本。
+        hopping 窗口以载入的内容作为一个求值边界（计数窗口的步长相位归零）。
+        """
+        if self._ts is not None:
+            if ts is None:
+                raise ValueError("time window requires sample ts")
+            ts = np.asarray(ts, dtype=np.int64)
+            vals = np.asarray(vals, dtype=np.float64)
+            if not ts.size:
+                self.reset()
+                return
+            lo = int(np.searchsorted(ts, ts[-1] - self._span, side="left"))
+            self._replace(vals[lo:], ts[lo:])
+            self._t0 = int(ts[0])
+        else:
+            self._replace(np.asarray(vals, dtype=np.float64)[-self._buf.maxlen:], None)
+        self._rephase()
+
+    def _rephase(self) -> None:
+        """hopping 窗口：以当前内容为新的求值边界。"""
+        if self._hop:
+            if self._ts is None:
+                self._phase = 0
+            elif self._ts:
+                self._phase = self._ts[-1] // self._hop
+            self._latch()
+
+    def _replace(self, vals: np.ndarray, ts: Optional[np.ndarray]) -> None:
+        """整体替换缓冲区（及时间戳）内容并重建流式状态，不改动 ``_t0``。
+
+        hopping 窗口不推进 tick：锁存的聚合值保持到下一个求值边界。
+        """
+        buf = self._buf
+        if isinstance(buf, RingBuffer):
+            buf.load(vals)
+        else:
+            buf.clear()
+            buf.extend(vals.tolist())
+        if ts is not None and self._ts is not None:
+            self._ts.clear()
+            self._ts.extend(ts.tolist())
+        self._evicted = 0
+        if not self._hop:
+            self._tick += 1
+        for s in self._streams:
+            s.rebuild(self.values())
+
+    def state(self) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[int]]:
+        """导出窗口内容 ``(values, ts, t0)``（计数窗口的 ``ts`` / ``t0`` 为 ``None``）。
+
+        流式聚合状态是缓冲区内容的函数，不单独导出，恢复时重建即可。
+        """
+        vals = np.array(self.values(), dtype=np.float64)
+        if self._ts is None:
+            return vals, None, None
+        return vals, np.fromiter(self._ts, dtype=np.int64, count=len(self._ts)), self._t0
+
+    def set_state(self, vals: np.ndarray, ts: Optional[np.ndarray], t0: Optional[int]) -> None:
+        """以 ``state()`` 的导出结果恢复窗口（不回放历史，流式状态一次性重建）。
+
+        hopping 窗口以恢复的内容作为一个求值边界（同 ``load``）。
+        """
+        if (ts is None) != (self._ts is None):
+            raise ValueError("window state does not match the window type")
+        if ts is not None and ts.size != vals.size:
+            raise ValueError("window state has mismatched values / ts lengths")
+        cap = self._buf.maxlen
+        if cap is not None and vals.size > cap:
+            raise ValueError(f"window state holds {vals.size} points, capacity is {cap}")
+        self._replace(np.asarray(vals, dtype=np.float64), ts)
+        self._t0 = t0
+        self._rephase()
+
+    def state_error(self, npts: int, nts: int, t0: int) -> Optional[str]:
+        """快照条目（值个数, 时间戳个数, t0；``-1`` 表示无）与本窗口不符时返回原因。"""
+        if (nts != npts) if self._ts is not None else (nts or t0 >= 0):
+            return "does not match the window type"
+        cap = self.capacity()
+        if cap is not None and npts > cap:
+            return f"holds {npts} points, capacity is {cap}"
+        return None
+
+    def data_error(self, vals: np.ndarray, ts: Optional[np.ndarray]) -> Optional[str]:
+        """快照数据本身与本窗口不符时返回原因（``state_error`` 只看条目表；默认无需检查）。"""
+        return None
+
+    def last(self) -> float:
+        """最新写入的值（窗口为空时为 ``nan``）。"""
+        return self._buf[-1] if self._buf else float("nan")
 
     def reset(self) -> None:
-        """清空窗口数据。"""
-        self._buf.clear()
\ No newline at end of file
+        """清空窗口数据及流式聚合状态。"""
+        self._buf.clear()
+        if self._ts is not None:
+            self._ts.clear()
+        self._t0 = None
+        self._evicted = 0
+        self._tick += 1
+        self._phase = -1 if self._ts is not None else 0
+        self._ready = False
+        for s in self._streams:
+            s.reset()
@@ -0,0 +1,131 @@
+# ========================= rules/backtest.py ========================
+"""backtest ‑ 基于历史录制数据的向量化离线回放"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional
+
+from ..utils._lazy import lazy_import
+from ._window import Backend
+from .tree import RuleTree, _check_batch
+
+if TYPE_CHECKING:
+    from ._dto import RuleDTO
+
+np = lazy_import("numpy")
+
+__all__: list[str] = ["BacktestResult", "backtest", "open_recording"]
+
+SEGMENT_DTYPE = np.dtype([("start_ts", "<i8"), ("end_ts", "<i8"), ("leaf", "<i4")])
+
+
+@dataclass
+class BacktestResult:
+    """回放得到的路径分段。
+
+    ``segments`` 为结构化数组（``start_ts``, ``end_ts``, ``leaf``）：每行是
+    最深激活节点同为 ``node_ids[leaf]`` 的一段极大连续样本，从 ``start_ts``
+    处的样本到 ``end_ts`` 处的样本（两端均含）。
+    """
+
+    segments: np.ndarray
+    node_ids: List[str]
+    parents: List[int]
+
+    def path(self, leaf: int) -> List[str]:
+        """以节点 ``leaf`` 结尾的激活路径（同 ``RuleTree.active_path``）。"""
+        out = [self.node_ids[leaf]]
+        while leaf:
+            leaf = self.parents[leaf]
+            out.append(self.node_ids[leaf])
+        return out[::-1]
+
+    def save(self, path: str | Path) -> None:
+        np.savez(path, segments=self.segments, node_ids=np.array(self.node_ids),
+                 parents=np.array(self.parents, dtype=np.int64))
+
+    @classmethod
+    def load(cls, path: str | Path) -> "BacktestResult":
+        with np.load(path) as z:
+            return cls(z["segments"], z["node_ids"].tolist(), z["parents"].tolist())
+
+
+def open_recording(source: str | Path | Mapping[str, Any]) -> Mapping[str, Any]:
+    """以 ``{列名: 一维数组}`` 打开列式录制数据（必须含 ``ts``）。
+
+    支持的布局：
+
+    * ``<列名>.npy`` 文件组成的目录，内存映射；
+    * 结构化 ``.npy`` 文件（每列一个字段），内存映射；
+    * ``.npz`` 归档（成员在首次切片时读取；npz 无法内存映射）；
+    * 内存中的数组映射。
+    """
+    if isinstance(source, Mapping):
+        return source
+    path = Path(source)
+    if path.is_dir():
+        return {p.stem: np.load(p, mmap_mode="r") for p in sorted(path.glob("*.npy"))}
+    if path.suffix == ".npz":
+        return np.load(path)
+    arr = np.load(path, mmap_mode="r")
+    if arr.dtype.names is None:
+        raise ValueError(f"{path}: expected a structured array with a 'ts' field")
+    return {name: arr[name] for name in arr.dtype.names}
+
+
+def backtest(
+    cfg: str | Dict[str, Any] | RuleDTO,
+    recording: str | Path | Mapping[str, Any],
+    *,
+    pps: int,
+    chunk_size: int = 1 << 16,
+    backend: Backend = "ring",
+    out: Optional[str | Path] = None,
+) -> BacktestResult:
+    """用一棵新的 RuleTree 按块向量化回放 ``recording``。
+
+    每 ``chunk_size`` 个样本按 ``push_batch`` 语义求值（窗口、聚合与区间
+    判断在 numpy 上对整块计算），结果与逐样本 ``push`` 完全一致。只保留
+    游程编码的路径变化；给出 ``out`` 时另存为 ``.npz``。
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    tree = RuleTree(cfg, pps=pps, backend=backend)
+    cols = open_recording(recording)
+    if "ts" not in cols:
+        raise ValueError("recording has no 'ts' column")
+    ts_all = cols["ts"]
+    n = len(ts_all)
+    metrics = [m for m in tree.metrics if m in cols]
+
+    starts: List[np.ndarray] = []
+    leaves: List[np.ndarray] = []
+    ends: List[np.ndarray] = []
+    prev_leaf, last_ts = -1, -1
+    for lo in range(0, n, chunk_size):
+        hi = min(lo + chunk_size, n)
+        chunk, ts = _check_batch({m: cols[m][lo:hi] for m in metrics}, ts_all[lo:hi], metrics)
+        deepest = tree._deepest_batch(tree._graph.push_batch(chunk, ts), ts)
+
+        change = np.flatnonzero(np.diff(deepest, prepend=prev_leaf))
+        if change.size:
+            # 在每次变化的前一个样本处结束当前分段
+            before = np.where(change > 0, ts[np.maximum(change - 1, 0)], last_ts)
+            ends.append(before)
+            starts.append(ts[change])
+            leaves.append(deepest[change])
+        prev_leaf, last_ts = int(deepest[-1]), int(ts[-1])
+
+    seg = np.empty(sum(s.size for s in starts), dtype=SEGMENT_DTYPE)
+    if seg.size:
+        seg["start_ts"] = np.concatenate(starts)
+        seg["leaf"] = np.concatenate(leaves)
+        # ends[0][0] 结束的是首个样本之前（并不存在）的分段
+        seg["end_ts"] = np.append(np.concatenate(ends)[1:], last_ts)
+
+    result = BacktestResult(seg, list(tree._plan.node_ids), list(tree._parents))
+    if out is not None:
+        result.save(out)
+    return result
@@ -0,0 +1,125 @@
+# ========================= rules/forest.py ==========================
+"""RuleForest ‑ 多棵 RuleTree 共享同一数据流"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from ..utils._lazy import lazy_import
+from ._frame import frame_columns
+from ._signal import SignalGraph
+from ._window import Backend
+from .tree import RuleTree, _check_batch, _check_ts
+
+if TYPE_CHECKING:
+    from ._dto import RuleDTO, SampleDTO
+    from ._frame import FrameSchema
+
+np = lazy_import("numpy")
+_dto = lazy_import(f"{__package__}._dto")
+
+__all__: list[str] = ["RuleForest"]
+
+
+class RuleForest:
+    """同一设备数据流上求值的多棵 RuleTree。
+
+    全部树建在同一个 SignalGraph 上：任一树的任一 Unit 用到的 (metric, window)
+    只缓冲一份、每个样本只写一次，(window, agg) 每个样本至多聚合一次。一次
+    ``push`` 只校验一次样本，更新全部树。
+
+    树按名称索引；成员树是只读视图，不能单独写入或 reset。
+    """
+
+    # ---- construction --------------------------------------------------
+    def __init__(
+        self,
+        cfgs: Mapping[str, str | Dict[str, Any] | RuleDTO],
+        *,
+        pps: int,
+        backend: Backend = "deque",
+    ):
+        self._graph = SignalGraph(pps=pps, backend=backend)
+        self._trees: Dict[str, RuleTree] = {
+            name: RuleTree(cfg, pps=pps, backend=backend, graph=self._graph)
+            for name, cfg in cfgs.items()
+        }
+        self._metrics: List[str] = self._graph.metrics
+
+    # ---- public API ----------------------------------------------------
+    def push(self, sample: SampleDTO | Dict[str, float]) -> None:
+        SampleDTO = _dto.SampleDTO
+        dto = sample if isinstance(sample, SampleDTO) else SampleDTO.model_validate(sample)
+        if self._graph.push(dto.model_dump()):
+            self._evaluate(dto.ts)
+        else:
+            self._hold(dto.ts)
+
+    def push_trusted(self, sample: Mapping[str, Any], *, check_ts: bool = False) -> None:
+        """免校验版 ``push``（见 ``RuleTree.push_trusted``）。"""
+        if check_ts:
+            _check_ts(sample.get("ts"))
+        if self._graph.push(sample):
+            self._evaluate(sample.get("ts"))
+        else:
+            self._hold(sample.get("ts"))
+
+    def push_batch(
+        self, columns: Mapping[str, np.ndarray], ts: np.ndarray
+    ) -> Dict[str, List[Tuple[int, List[str]]]]:
+        """对全部树按列批量写入，按树名返回各自的路径变化（见 ``RuleTree.push_batch``）。"""
+        cols, ts = _check_batch(columns, ts, self._metrics)
+        if ts.size == 0:
+            return {name: [] for name in self._trees}
+        batches = self._graph.push_batch(cols, ts)
+        return {name: t._evaluate_batch(batches, ts) for name, t in self._trees.items()}
+
+    def push_frames(
+        self, frames: bytes | memoryview | np.ndarray, schema: Optional[FrameSchema] = None
+    ) -> Dict[str, List[Tuple[int, List[str]]]]:
+        """对全部树写入二进制记录帧（见 ``RuleTree.push_frames``）。"""
+        cols, ts = frame_columns(frames, schema, self._metrics)
+        return self.push_batch(cols, ts)
+
+    def parallel(self, workers: Optional[int] = None, *, min_cost_ns: Optional[int] = None) -> None:
+        """整个森林的线程池批量求值（见 ``RuleTree.parallel``）。"""
+        from ._parallel import MIN_COST_NS, Runner
+
+        old = self._graph.runner
+        self._graph.runner = Runner.resolve(
+            workers, min_cost_ns=MIN_COST_NS if min_cost_ns is None else min_cost_ns
+        )
+        if old is not None:
+            old.close()
+
+    def reset(self) -> None:
+        self._graph.reset()
+        for t in self._trees.values():
+            t._root.reset()
+
+    # ---- read‑only access ---------------------------------------------
+    @property
+    def metrics(self) -> List[str]:
+        return self._metrics
+
+    @property
+    def n_windows(self) -> int:
+        """整个森林持有的不同窗口缓冲区个数。"""
+        return len(self._graph)
+
+    def __getitem__(self, name: str) -> RuleTree:
+        return self._trees[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._trees)
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+    def _evaluate(self, ts: Optional[int]) -> None:
+        for t in self._trees.values():
+            t._evaluate(ts)
+
+    def _hold(self, ts: Optional[int]) -> None:
+        for t in self._trees.values():
+            t._hold(ts)
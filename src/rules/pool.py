@@ -0,0 +1,396 @@
+# ========================= rules/pool.py ============================
+"""RuleTreePool ‑ 同一规则树配置并行评估多路独立数据流"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from ..utils._lazy import lazy_import
+from ..utils._cmp_kit import CmpKit
+from ..utils._metrics_kit import _EPS, _REBASE, MetricsKit, _sqrt_err_vec
+from .tree import RuleTree, _greedy_descent
+
+if TYPE_CHECKING:
+    from ._dto import RuleDTO
+
+np = lazy_import("numpy")
+
+__all__: list[str] = ["RuleTreePool"]
+
+# 由逐流滑动矩（每次写入 O(1)）直接给出的聚合；其余聚合对本次写入各流的窗口行归约
+_MOMENT_AGGS = frozenset({"mean", "avg", "sum", "var", "std", "rms"})
+
+
+class RuleTreePool:
+    """同一份规则配置在 ``n_streams`` 路独立数据流上的批量评估。
+
+    * 配置只校验、编译一次（经由一棵原型 RuleTree，窗口去重方式与单棵树完全相同）
+    * 逐流状态按结构数组（SoA）存放：每个不同的 (指标, 窗口) 一个
+      ``(n_streams, 容量)`` 的 float64 环形缓冲区外加少量逐流标量，每路流的
+      内存约等于其原始窗口字节数
+    * ``push`` 一次接收一批流并用 numpy 统一评估，结果与每路流各自喂给一棵
+      RuleTree 一致
+
+    样本不带时间戳：``"time"`` 窗口按固定 ``pps * sec + 1`` 点评估，即假定各流
+    都按名义 ``pps`` 上报；采样不规则时请使用 RuleTree。只支持逐样本滑动的
+    原始样本窗口（hopping / tumbling 与分桶时间窗口直接拒绝）。
+    """
+
+    # ---- construction --------------------------------------------------
+    def __init__(
+        self,
+        cfg: str | Dict[str, Any] | RuleDTO,
+        *,
+        pps: int,
+        n_streams: int,
+        buffer: Optional[memoryview] = None,
+    ):
+        """``buffer``：可选的可写缓冲区（至少 ``nbytes_for(n_streams)`` 字节，如
+        ``SharedMemory.buf``），存放全部逐流状态；按原样使用、不清零，因此多个
+        pool 可以映射同一份状态。
+        """
+        if n_streams < 1:
+            raise ValueError("n_streams must be >= 1")
+        proto = RuleTree(cfg, pps=pps)
+        self._template = proto._template
+        self._pps = pps
+        self._n = n_streams
+        self._metrics: List[str] = proto.metrics
+
+        # -- 编译结构（全部流共享） --
+        feeds = proto._graph._feeds
+        if any(win._hop or win._cfg.resolution for _, win in feeds):
+            raise ValueError(
+                "RuleTreePool only supports sliding raw-sample windows; "
+                "use RuleTree for hopping / tumbling / bucketed windows"
+            )
+        feed_of = {id(win): i for i, (_, win) in enumerate(feeds)}
+        self._feed_metric: List[str] = [m for m, _ in feeds]
+        self._cap: List[int] = [win._cfg.nominal_size(pps) for _, win in feeds]
+
+        self._node_ids: List[str] = [n.node_id for n in proto._order]
+        self._is_leaf = np.array([n.is_leaf for n in proto._order], dtype=bool)
+        self._parents: Sequence[int] = proto._parents
+        self._children: Sequence[Sequence[int]] = proto._children
+        self._units: List[List[Tuple[int, str, Any, float, float]]] = []
+        moment_feeds = set()
+        for node in proto._order:
+            specs = []
+            if not node.is_unconditional:
+                for u in node.units:
+                    info = u.get_info()
+                    f = feed_of[id(u._win)]
+                    cmp_vec = CmpKit.get_vec(info.cmp_type) if info.cmp_type else None
+                    specs.append((f, info.agg, cmp_vec, *info.cmp_bounds))
+                    if info.agg in _MOMENT_AGGS:
+                        moment_feeds.add(f)
+            self._units.append(specs)
+
+        # -- 逐流状态（一整块连续内存，可由调用方提供） --
+        self._moment_feeds: List[int] = sorted(moment_feeds)
+        arrays = iter(self._carve(self._layout(n_streams), buffer))
+        self._buf = [next(arrays) for _ in self._cap]
+        self._pos = [next(arrays) for _ in self._cap]
+        self._cnt = [next(arrays) for _ in self._cap]
+        # 每个 feed 的滑动矩：[k, s1, s2, |s1|+|d| 峰值, s2 峰值] 浮点，
+        # [n, nan, 已淘汰数, 重建后加减次数] 整数（峰值与次数给出误差上界，同 RunningMoments）
+        self._mom: Dict[int, Tuple[np.ndarray, np.ndarray]] = {
+            f: (next(arrays), next(arrays)) for f in self._moment_feeds
+        }
+        self._leaf = next(arrays)
+
+    # ---- public API ----------------------------------------------------
+    def push(
+        self,
+        stream_ids: np.ndarray,
+        values: Mapping[str, np.ndarray] | np.ndarray,
+    ) -> np.ndarray:
+        """为 ``stream_ids`` 中的每路流各写入一个样本。
+
+        ``values`` 为 ``{指标: (k,) 数组}``（缺失的指标按 NaN 处理），或按
+        ``self.metrics`` 顺序排列的 ``(k, len(metrics))`` 数组。同一流 id 可以
+        重复出现，按行序依次写入。返回每行写入后最深活跃节点的下标（对应
+        ``node_ids``）。
+        """
+        ids = np.asarray(stream_ids, dtype=np.int64)
+        if ids.ndim != 1:
+            raise ValueError("stream_ids must be 1-D")
+        k = ids.size
+        if k and (ids.min() < 0 or ids.max() >= self._n):
+            raise ValueError(f"stream id out of range [0, {self._n})")
+        cols = self._columns(values, k)
+        out = np.empty(k, dtype=np.intp)
+        if k == 0:
+            return out
+
+        # 重复出现的流 id 拆成先后多轮写入
+        order = np.argsort(ids, kind="stable")
+        sid = ids[order]
+        first = np.r_[True, sid[1:] != sid[:-1]]
+        idx = np.arange(k)
+        rank = np.empty(k, dtype=np.int64)
+        rank[order] = idx - np.maximum.accumulate(np.where(first, idx, 0))
+
+        for r in range(int(rank.max()) + 1):
+            sel = np.flatnonzero(rank == r) if r or not first.all() else idx
+            out[sel] = self._push_round(ids[sel], {m: c[sel] for m, c in cols.items()})
+        return out
+
+    def reset(self, stream_ids: np.ndarray | None = None) -> None:
+        """清空 ``stream_ids``（默认全部流）的窗口与活跃节点。"""
+        rows = slice(None) if stream_ids is None else np.asarray(stream_ids, dtype=np.int64)
+        for f in range(len(self._cap)):
+            self._buf[f][rows] = 0.0
+            self._pos[f][rows] = 0
+            self._cnt[f][rows] = 0
+        for fl, it in self._mom.values():
+            fl[:, rows] = 0.0
+            it[:, rows] = 0
+        self._leaf[rows] = 0
+
+    # ---- read-only access ---------------------------------------------
+    @property
+    def metrics(self) -> List[str]:
+        return self._metrics
+
+    @property
+    def n_streams(self) -> int:
+        return self._n
+
+    @property
+    def node_ids(self) -> List[str]:
+        """按先序排列的节点 id（``leaf`` 返回的下标即指向此列表）。"""
+        return self._node_ids
+
+    @property
+    def nbytes(self) -> int:
+        """逐流状态数组占用的字节数。"""
+        return self.nbytes_for(self._n)
+
+    def nbytes_for(self, n_streams: int) -> int:
+        """本配置下 ``n_streams`` 路流所需的状态字节数。"""
+        return sum(int(np.prod(shape)) * np.dtype(dt).itemsize for shape, dt in self._layout(n_streams))
+
+    def leaf(self, stream_ids: np.ndarray | None = None) -> np.ndarray:
+        """每路流最深活跃节点的下标（默认全部流）。"""
+        return self._leaf.copy() if stream_ids is None else self._leaf[stream_ids]
+
+    def reached_leaf(self, stream_ids: np.ndarray | None = None) -> np.ndarray:
+        return self._is_leaf[self.leaf(stream_ids)]
+
+    def active_path(self, stream_id: int) -> List[str]:
+        idx = int(self._leaf[stream_id])
+        path = [self._node_ids[idx]]
+        while idx:
+            idx = self._parents[idx]
+            path.append(self._node_ids[idx])
+        return path[::-1]
+
+    # ---- internal helpers ---------------------------------------------
+    @property
+    def _cfg(self) -> RuleDTO:
+        return self._template.cfg
+
+    def _layout(self, S: int) -> List[Tuple[Tuple[int, ...], Any]]:
+        """各状态数组的 (shape, dtype)，按内存排列顺序。"""
+        out: List[Tuple[Tuple[int, ...], Any]] = [((S, c), np.float64) for c in self._cap]
+        out += [((S,), np.int64)] * (2 * len(self._cap))
+        out += [((5, S), np.float64), ((4, S), np.int64)] * len(self._moment_feeds)
+        out.append(((S,), np.intp))
+        return out
+
+    @staticmethod
+    def _carve(layout: List[Tuple[Tuple[int, ...], Any]], buffer: Optional[memoryview]) -> List[np.ndarray]:
+        if buffer is None:
+            return [np.zeros(shape, dtype=dt) for shape, dt in layout]
+        arrays, off = [], 0
+        for shape, dt in layout:
+            a = np.ndarray(shape, dtype=dt, buffer=buffer, offset=off)
+            off += a.nbytes
+            arrays.append(a)
+        return arrays
+
+    def _columns(self, values: Mapping[str, np.ndarray] | np.ndarray, k: int) -> Dict[str, np.ndarray]:
+        if isinstance(values, np.ndarray):
+            if values.shape != (k, len(self._metrics)):
+                raise ValueError(f"values has shape {values.shape}, expected ({k}, {len(self._metrics)})")
+            return {m: values[:, j].astype(np.float64) for j, m in enumerate(self._metrics)}
+        cols: Dict[str, np.ndarray] = {}
+        for m in self._metrics:
+            col = values.get(m)
+            col = np.full(k, np.nan) if col is None else np.asarray(col, dtype=np.float64)
+            if col.shape != (k,):
+                raise ValueError(f"column {m!r} has shape {col.shape}, expected ({k},)")
+            cols[m] = col
+        return cols
+
+    def _push_round(self, ids: np.ndarray, cols: Dict[str, np.ndarray]) -> np.ndarray:
+        """为（互不重复的）``ids`` 各写入一个样本并重新评估。"""
+        for f, metric in enumerate(self._feed_metric):
+            self._write(f, ids, cols[metric])
+
+        k = ids.size
+        memo: Dict[Tuple[int, str], np.ndarray] = {}
+        active: List[np.ndarray] = []
+        for specs in self._units:
+            node_on = np.ones(k, dtype=bool)
+            for f, agg, cmp_vec, lo, hi in specs:
+                vals = memo.get((f, agg))
+                if vals is None:
+                    vals = memo[(f, agg)] = self._aggregate(f, agg, ids, cols[self._feed_metric[f]])
+                hit = (self._cnt[f][ids] == self._cap[f]) & (vals != 0)
+                if cmp_vec is not None:
+                    hit &= cmp_vec(vals, lo, hi)
+                node_on &= hit
+            active.append(node_on)
+
+        deepest = _greedy_descent(self._children, active, k)
+        self._leaf[ids] = deepest
+        return deepest
+
+    def _write(self, f: int, ids: np.ndarray, x: np.ndarray) -> None:
+        cap = self._cap[f]
+        buf, pos, cnt = self._buf[f], self._pos[f], self._cnt[f]
+        p = pos[ids]
+        full = cnt[ids] == cap
+        old = buf[ids, p]
+        buf[ids, p] = x
+        pos[ids] = np.where(p + 1 == cap, 0, p + 1)
+        cnt[ids] = np.where(full, cap, cnt[ids] + 1)
+
+        mom = self._mom.get(f)
+        if mom is None:
+            return
+        fl, it = mom
+        kk, s1, s2, p1, p2 = (fl[j, ids] for j in range(5))
+        n, nan, ev, ops = (it[j, ids] for j in range(4))
+
+        # 淘汰（同 RunningMoments.evict）
+        old_nan = full & np.isnan(old)
+        old_fin = full & ~np.isnan(old)
+        nan -= old_nan
+        n -= old_fin
+        d = np.where(old_fin, old - kk, 0.0)
+        empty = n == 0
+        s1 = np.where(empty, 0.0, s1 - d)
+        s2 = np.where(empty, 0.0, s2 - d * d)
+        ops = np.where(empty, 0, ops + old_fin)
+        p1 = np.where(empty, 0.0, np.maximum(p1, np.abs(s1) + np.abs(d)))
+        p2 = np.where(empty, 0.0, np.maximum(p2, s2))
+        ev += full
+
+        # 写入（同 RunningMoments.push）
+        fin = ~np.isnan(x)
+        kk = np.where(fin & (n == 0), x, kk)
+        d = np.where(fin, x - kk, 0.0)
+        s1 += d
+        s2 += d * d
+        n += fin
+        nan += ~fin
+        ops += fin
+        p1 = np.maximum(p1, np.abs(s1) + np.abs(d))
+        p2 = np.maximum(p2, s2)
+
+        for j, a in enumerate((kk, s1, s2, p1, p2)):
+            fl[j, ids] = a
+        for j, a in enumerate((n, nan, ev, ops)):
+            it[j, ids] = a
+
+        # 每淘汰满一整窗重建一次，抵消浮点漂移
+        self._rebase(f, ids[ev >= cap])
+
+    def _rebase(self, f: int, ids: np.ndarray) -> None:
+        """按窗口内容重建已写满的 ``ids`` 各行的滑动矩（偏移量取窗口均值，同 RunningMoments.rebuild）。"""
+        if not ids.size:
+            return
+        fl, it = self._mom[f]
+        rows = self._buf[f][ids]
+        ok = ~np.isnan(rows)
+        nfin = ok.sum(axis=1)
+        z = np.where(ok, rows, 0.0)
+        kk = np.divide(z.sum(axis=1), nfin, out=np.zeros(ids.size), where=nfin > 0)
+        d = np.where(ok, rows - kk[:, None], 0.0)
+        s1, s2 = d.sum(axis=1), (d * d).sum(axis=1)
+        for j, a in enumerate((kk, s1, s2, np.abs(s1) + np.abs(d).max(axis=1), s2)):
+            fl[j, ids] = a
+        for j, a in enumerate((nfin, self._cap[f] - nfin, 0, nfin)):
+            it[j, ids] = a
+
+    def _ordered_rows(self, f: int, ids: np.ndarray) -> np.ndarray:
+        cap = self._cap[f]
+        cols = (self._pos[f][ids, None] + np.arange(cap)) % cap
+        return np.take_along_axis(self._buf[f][ids], cols, axis=1)
+
+    def _aggregate(self, f: int, agg: str, ids: np.ndarray, last: np.ndarray) -> np.ndarray:
+        """feed ``f`` 在 ``ids`` 各行上的聚合值（仅在窗口就绪后有意义）。"""
+        if agg == "none":
+            return last
+        fn = MetricsKit.get(agg)
+
+        def exact(i: int) -> float:
+            # 单行全量重算（近似值落在舍入边界附近时）
+            return fn(self._ordered_rows(f, ids[i:i + 1])[0])
+
+        def r2(x: np.ndarray, err: Optional[np.ndarray] = None) -> np.ndarray:
+            return MetricsKit._round2_vec(x, exact, err)
+
+        if agg in _MOMENT_AGGS:
+            fl, it = self._mom[f]
+            kk, s1, s2, p1, p2 = (fl[j, ids] for j in range(5))
+            n, nan, ops = it[0, ids], it[1, ids], it[3, ids]
+            bad = (nan > 0) | (n == 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                m1 = s1 / n
+                mean = kk + m1
+                var = np.maximum(s2 / n - m1 * m1, 0.0)
+                # Σd、Σd² 的误差上界（同 RunningMoments._err / _var_err）
+                e1 = _EPS * ops * p1
+                em = e1 / n
+                ev = 2.0 * _EPS * ops * p2 / n + (2.0 * np.abs(m1) + em) * em
+                if agg in ("mean", "avg"):
+                    raw, err = mean, em
+                elif agg == "sum":
+                    raw, err = n * kk + s1, e1
+                elif agg == "var":
+                    raw, err = var, ev
+                elif agg == "std":
+                    raw, err = np.sqrt(var), _sqrt_err_vec(var, ev)
+                else:
+                    r = var + mean * mean
+                    raw, err = np.sqrt(r), _sqrt_err_vec(r, ev + (2.0 * np.abs(mean) + em) * em)
+                raw, err = np.where(bad, 0.0, raw), np.where(bad, 0.0, err)
+                # 需全量重算且偏移量已过时的行顺带重建（同 RunningMoments.stale）
+                stale = (m1 * m1 > _REBASE * var) | (p2 > _REBASE * s2)
+            out = np.where(bad, np.nan, r2(raw, err))
+            redo = MetricsKit._ambiguous(raw, err) & stale & ~bad & (self._cnt[f][ids] == self._cap[f])
+            self._rebase(f, ids[redo])
+            return out
+
+        rows = self._buf[f][ids]
+        if agg in ("vmax", "max", "vmin", "min"):
+            # 同内置 max / min：最旧值为 NaN 时为 NaN，其余 NaN 忽略
+            oldest = rows[np.arange(ids.size), self._pos[f][ids]]
+            red = np.fmax if agg in ("vmax", "max") else np.fmin
+            return np.where(np.isnan(oldest), np.nan, red.reduce(rows, axis=1))
+        if agg == "ptp":
+            return MetricsKit._round2_vec(np.ptp(rows, axis=1))
+        if agg == "rel_var":
+            m = rows.mean(axis=1)
+            p = np.ptp(rows, axis=1)
+            # 均值相对量级过小时，与按序 np.mean 的符号 / 是否为 0 可能不同：逐行重算
+            small = np.abs(m) <= 1e-9 * np.abs(rows).max(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out = r2(np.where(small, 0.0, p / m))
+            for i in np.flatnonzero(small).tolist():
+                out[i] = exact(i)
+            return out
+        if agg == "slope":
+            cap = self._cap[f]
+            if cap < 2:
+                return np.zeros(ids.size)
+            y = self._ordered_rows(f, ids)
+            x = np.arange(cap) - (cap - 1) / 2.0
+            with np.errstate(invalid="ignore"):
+                k = (y - y.mean(axis=1, keepdims=True)) @ x / np.dot(x, x)
+            return np.where(np.isnan(k), np.nan, r2(np.where(np.isnan(k), 0.0, k)))
+        return np.array([fn(row) for row in self._ordered_rows(f, ids)])
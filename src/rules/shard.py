@@ -0,0 +1,227 @@
+# ========================= rules/shard.py ===========================
+"""ShardedRuleTreePool ‑ 多进程分片评估，窗口状态驻留共享内存"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Tuple
+
+from ..utils._lazy import lazy_import
+from .pool import RuleTreePool
+from .tree import RuleTree
+
+if TYPE_CHECKING:
+    from ._dto import RuleDTO
+
+np = lazy_import("numpy")
+
+__all__: list[str] = ["ShardedRuleTreePool"]
+
+
+def _worker(conn: Any, cfg: RuleDTO, pps: int, n_streams: int, shm_name: str) -> None:
+    """工作进程主循环：负责一个分片的流，状态位于共享内存 ``shm_name``。
+
+    消息为 ``("push", 分片内 id, 二维数值)``（协调进程每次 ``push`` 一条）、
+    ``("reset", ids | None)``，或 ``None`` 表示退出。每条消息恰好回复一次
+    ``("ok", 结果)`` 或 ``("err", 异常描述)``。
+    """
+    shm = SharedMemory(name=shm_name)
+    try:
+        pool = RuleTreePool(cfg, pps=pps, n_streams=n_streams, buffer=shm.buf)
+        while True:
+            msg = conn.recv()
+            if msg is None:
+                break
+            try:
+                if msg[0] == "push":
+                    conn.send(("ok", pool.push(msg[1], msg[2])))
+                else:
+                    pool.reset(msg[1])
+                    conn.send(("ok", None))
+            except Exception as exc:  # 由协调进程抛出
+                conn.send(("err", repr(exc)))
+        del pool  # 先释放指向 shm.buf 的视图再关闭
+    finally:
+        shm.close()
+        conn.close()
+
+
+class ShardedRuleTreePool:
+    """按工作进程分片的 ``RuleTreePool``。
+
+    * 流按编号切成 ``n_workers`` 个连续分片；配置只在此处解析校验一次，
+      RuleDTO 分发给各工作进程
+    * 每个分片的窗口状态位于一块 ``SharedMemory``，协调进程同样映射，
+      ``leaf`` / ``active_path`` / ``reached_leaf`` 直接读取，无需 IPC
+    * ``push`` 每次调用向每个相关工作进程发送一条消息（该分片的行组成的
+      二维数组），调用方应成批写入而非逐样本写入
+    * 任一分片出错时，仍先读完其余分片的回复再统一抛出，管道保持同步
+
+    作为上下文管理器使用，或显式调用 ``close()``。
+    """
+
+    # ---- construction --------------------------------------------------
+    def __init__(
+        self,
+        cfg: str | Dict[str, Any] | RuleDTO,
+        *,
+        pps: int,
+        n_streams: int,
+        n_workers: Optional[int] = None,
+        mp_context: Optional[str] = None,
+    ):
+        dto = RuleTree._validate_cfg(cfg)
+        n_workers = min(n_workers or mp.cpu_count(), n_streams)
+        if n_workers < 1:
+            raise ValueError("n_streams and n_workers must be >= 1")
+        self._n = n_streams
+        self._bounds = np.linspace(0, n_streams, n_workers + 1).round().astype(np.int64)
+
+        ctx = mp.get_context(mp_context)
+        self._shms: List[SharedMemory] = []
+        self._views: List[RuleTreePool] = []
+        self._conns: List[Any] = []
+        self._procs: List[Any] = []
+        probe = RuleTreePool(dto, pps=pps, n_streams=1)
+        try:
+            for w in range(n_workers):
+                size = int(self._bounds[w + 1] - self._bounds[w])
+                shm = SharedMemory(create=True, size=max(1, probe.nbytes_for(size)))
+                self._shms.append(shm)
+                # 协调进程侧视图：同一份状态，约定只读
+                self._views.append(RuleTreePool(dto, pps=pps, n_streams=size, buffer=shm.buf))
+                parent, child = ctx.Pipe()
+                proc = ctx.Process(
+                    target=_worker, args=(child, dto, pps, size, shm.name), daemon=True
+                )
+                proc.start()
+                child.close()
+                self._conns.append(parent)
+                self._procs.append(proc)
+        except BaseException:
+            self.close()
+            raise
+        self._metrics: List[str] = self._views[0].metrics
+
+    # ---- public API ----------------------------------------------------
+    def push(
+        self,
+        stream_ids: np.ndarray,
+        values: Mapping[str, np.ndarray] | np.ndarray,
+    ) -> np.ndarray:
+        """同 ``RuleTreePool.push``；各分片并行执行。"""
+        ids = np.asarray(stream_ids, dtype=np.int64)
+        if ids.ndim != 1:
+            raise ValueError("stream_ids must be 1-D")
+        if ids.size and (ids.min() < 0 or ids.max() >= self._n):
+            raise ValueError(f"stream id out of range [0, {self._n})")
+        mat = self._matrix(values, ids.size)
+        shard = np.searchsorted(self._bounds, ids, side="right") - 1
+
+        sent: List[Tuple[int, np.ndarray]] = []
+        for w, conn in enumerate(self._conns):
+            rows = np.flatnonzero(shard == w)
+            if rows.size:
+                conn.send(("push", ids[rows] - self._bounds[w], mat[rows]))
+                sent.append((w, rows))
+
+        out = np.empty(ids.size, dtype=np.intp)
+        for (_, rows), res in zip(sent, self._gather([w for w, _ in sent])):
+            out[rows] = res
+        return out
+
+    def reset(self, stream_ids: np.ndarray | None = None) -> None:
+        """同 ``RuleTreePool.reset``。"""
+        ids = None if stream_ids is None else np.asarray(stream_ids, dtype=np.int64)
+        sent = []
+        for w, conn in enumerate(self._conns):
+            if ids is None:
+                conn.send(("reset", None))
+            else:
+                lo, hi = self._bounds[w], self._bounds[w + 1]
+                local = ids[(ids >= lo) & (ids < hi)] - lo
+                if not local.size:
+                    continue
+                conn.send(("reset", local))
+            sent.append(w)
+        self._gather(sent)
+
+    def close(self) -> None:
+        """停止工作进程并释放共享内存（可重复调用）。"""
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._views.clear()
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._conns, self._procs, self._shms = [], [], []
+
+    def __enter__(self) -> "ShardedRuleTreePool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # ---- read‑only access (shared memory, no IPC) ---------------------
+    @property
+    def metrics(self) -> List[str]:
+        return self._metrics
+
+    @property
+    def n_streams(self) -> int:
+        return self._n
+
+    @property
+    def n_workers(self) -> int:
+        return len(self._procs)
+
+    @property
+    def node_ids(self) -> List[str]:
+        return self._views[0].node_ids
+
+    def leaf(self, stream_ids: np.ndarray | None = None) -> np.ndarray:
+        out = np.concatenate([v.leaf() for v in self._views])
+        return out if stream_ids is None else out[stream_ids]
+
+    def reached_leaf(self, stream_ids: np.ndarray | None = None) -> np.ndarray:
+        return self._views[0]._is_leaf[self.leaf(stream_ids)]
+
+    def active_path(self, stream_id: int) -> List[str]:
+        w = int(np.searchsorted(self._bounds, stream_id, side="right") - 1)
+        return self._views[w].active_path(stream_id - int(self._bounds[w]))
+
+    # ---- internal helpers ---------------------------------------------
+    def _matrix(self, values: Mapping[str, np.ndarray] | np.ndarray, k: int) -> np.ndarray:
+        """把 ``values`` 整理为一个 ``(k, len(metrics))`` float64 数组（一次 IPC 的载荷）。"""
+        if isinstance(values, np.ndarray):
+            if values.shape != (k, len(self._metrics)):
+                raise ValueError(f"values has shape {values.shape}, expected ({k}, {len(self._metrics)})")
+            return values.astype(np.float64, copy=False)
+        return np.stack(list(self._views[0]._columns(values, k).values()), axis=1)
+
+    def _gather(self, workers: List[int]) -> List[Any]:
+        """依次读取 ``workers`` 的回复；全部读完后再把出错的分片合并为一个异常抛出。"""
+        out: List[Any] = []
+        errors: List[str] = []
+        for w in workers:
+            try:
+                status, payload = self._conns[w].recv()
+            except (EOFError, OSError) as exc:        # 工作进程已退出
+                status, payload = "err", repr(exc)
+            if status != "ok":
+                errors.append(f"shard {w}: {payload}")
+                payload = None
+            out.append(payload)
+        if errors:
+            raise RuntimeError(f"{len(errors)} of {len(workers)} shards failed: " + "; ".join(errors))
+        return out
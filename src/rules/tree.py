@@ -3,44 +3,370 @@
 
 from __future__ import annotations
 
+import threading
 from pathlib import Path
-from typing import Dict, List, Any, cast
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Any, Mapping, NamedTuple, Optional, Sequence, Tuple
 
-from ._dto import RuleDTO, SampleDTO
-from .src.rules._internal._node import _Node
+from ..utils._lazy import lazy_import
+from ._node import Node
+from . import _snapshot, _template
+from ._frame import frame_columns
+from ._plan import Plan
+from ._signal import SignalGraph
+from ._stats import EvalHook, Instrumentation, TransitionHook, TreeStats
+from ._template import TreeTemplate
+from ._window import Backend, WindowBatch
 
-__all__: list[str] = ["RuleTree"]
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from ._dto import RuleDTO, SampleDTO
+    from ._frame import FrameSchema
+    from ._stream import PathEvent
+
+np = lazy_import("numpy")
+_dto = lazy_import(f"{__package__}._dto")     # pydantic：只在校验样本 / 配置时加载
+
+__all__: list[str] = ["RuleTree", "Transition"]
+
+
+class Transition(NamedTuple):
+    """一次激活路径变化：样本 ``ts`` 处 ``old_path`` -> ``new_path``。
+
+    路径是编译计划中共享的只读元组。变化并非由样本引起时（如 ``restore``）
+    ``ts`` 为 None。
+    """
+
+    old_path: Tuple[str, ...]
+    new_path: Tuple[str, ...]
+    ts: Optional[int]
+
+
+class _Built(NamedTuple):
+    """已编译、尚未启用的树（见 ``RuleTree._build``）。"""
+
+    template: TreeTemplate
+    graph: SignalGraph
+    root: Node
+    order: List[Node]
+    parents: Sequence[int]
+    children: Sequence[Sequence[int]]
+    plan: Plan
+
+
+def _check_ts(ts: Any) -> None:
+    if not isinstance(ts, int) or isinstance(ts, bool) or ts < 0:
+        raise ValueError(f"ts must be an int >= 0, got {ts!r}")
+
+
+def _greedy_descent(children: Sequence[Sequence[int]], active: Sequence[np.ndarray], n: int) -> np.ndarray:
+    """对 ``n`` 行向量化地遍历激活路径。
+
+    ``children`` / ``active`` 按先序节点下标索引。逐行返回每层都进入首个
+    激活子节点时到达的最深节点下标。全部在预分配的缓冲区上完成，不产生
+    逐节点的临时数组。
+    """
+    reach = np.empty((len(children), n), dtype=bool)     # 每个节点一行，由其父节点写入
+    reach[0] = True
+    rest = np.empty(n, dtype=bool)
+    miss = np.empty(n, dtype=bool)
+    deepest = np.zeros(n, dtype=np.intp)
+    for i, kids in enumerate(children):
+        np.copyto(rest, reach[i])
+        deepest[rest] = i
+        for c in kids:
+            np.logical_and(rest, active[c], out=reach[c])
+            np.logical_not(active[c], out=miss)
+            rest &= miss
+    return deepest
+
+
+def _check_batch(
+    columns: Mapping[str, np.ndarray], ts: np.ndarray, metrics: List[str]
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """校验一段列式样本，只保留 ``metrics`` 中的列（转为 float64）。"""
+    ts = np.asarray(ts)
+    if ts.ndim != 1 or (ts.size and ts.dtype.kind not in "iu"):
+        raise ValueError("ts must be a 1-D integer array")
+    if ts.size and ts.min() < 0:
+        raise ValueError("ts must be >= 0")
+    n = ts.size
+    cols: Dict[str, np.ndarray] = {}
+    for m in metrics:
+        if m in columns:
+            col = np.asarray(columns[m], dtype=np.float64)
+            if col.shape != (n,):
+                raise ValueError(f"column {m!r} has shape {col.shape}, expected ({n},)")
+            cols[m] = col
+    return cols, ts
 
 
 class RuleTree:
     """Stable Impl · 满足 SRP + 可静态类型检查"""
 
     # ---- construction --------------------------------------------------
-    def __init__(self, cfg: str | Dict[str, Any] | RuleDTO, *, pps: int):
-        self._cfg: RuleDTO = self._validate_cfg(cfg)
+    def __init__(
+        self,
+        cfg: str | Dict[str, Any] | RuleDTO,
+        *,
+        pps: int,
+        backend: Backend = "deque",
+        graph: Optional[SignalGraph] = None,
+        codegen: bool = True,
+        cache_dir: Optional[str | Path] = None,
+    ):
+        """``backend``：窗口存储后端，"deque"（默认）或 "ring"（numpy 环形缓冲区，零拷贝）。
+
+        节点树编译为扁平的 Plan（整数节点 id、Unit 元组、CSR 子节点偏移）。
+        ``codegen``（默认开启）时激活路径遍历为按本树生成、内联区间判断的
+        专用函数，否则由通用循环遍历同一组数组。
+
+        ``graph`` 仅供内部使用：与其他树共享的 SignalGraph（见 RuleForest）。
+        树内与树间相同的 (metric, window) 共享一个缓冲区，相同的 (window, agg)
+        共享一份聚合。共享图上的树由其所有者写入，不能直接 ``push``。
+
+        校验与编译按 (配置, pps, codegen) 缓存：同一配置构建的树共享一份只读
+        编译模板，只各自分配窗口。给出 ``cache_dir`` 时模板另存于磁盘，重启后
+        的进程同样跳过校验与代码生成（该目录必须可信：条目经 unpickle 读取）。
+        """
+        if graph is not None and (graph.pps != pps or graph.backend != backend):
+            raise ValueError("shared SignalGraph was built with a different pps/backend")
         self._pps = pps
-        self._root: _Node = _Node(self._cfg, pps=pps)
+        self._backend: Backend = backend
+        self._codegen = codegen
+        self._cache_dir = cache_dir
+        self._owns_graph = graph is None
+        self._lock = threading.RLock()          # push / reload / snapshot 互斥
+        if graph is None:
+            graph = SignalGraph(pps=pps, backend=backend)
+        self._install(self._build(self._compile(cfg), graph))
 
-        self._metrics: List[str] = self._collect_metrics()
         self._active_path: List[str] = []
         self._reached_leaf: bool = False
-        self._last_node_info: Dict[str, Any] = {}
-
-        self._reorder_tree()
+        self._leaf: int = -1                    # 最深激活节点下标（-1：尚未求值）
+        self._changed: bool = False
+        self._transition: Optional[Transition] = None
+        self._instr: Optional[Instrumentation] = None
 
     # factory – keep __init__ light                                        
     @classmethod
-    def from_cfg(cls, cfg: str | Dict[str, Any] | RuleDTO, *, pps: int) -> "RuleTree":
-        return cls(cfg, pps=pps)
+    def from_cfg(
+        cls, cfg: str | Dict[str, Any] | RuleDTO, *, pps: int, backend: Backend = "deque"
+    ) -> "RuleTree":
+        return cls(cfg, pps=pps, backend=backend)
 
     # ---- public API ----------------------------------------------------
     def push(self, sample: SampleDTO | Dict[str, float]) -> None:
+        self._check_owner()
+        SampleDTO = _dto.SampleDTO
         dto = sample if isinstance(sample, SampleDTO) else SampleDTO.model_validate(sample)
-        self._root.push_recursive(dto.model_dump())
-        self._update_active_path()
+        with self._lock:
+            if self._graph.push(dto.model_dump()):
+                self._evaluate(dto.ts)
+            else:
+                self._hold(dto.ts)
+
+    def push_trusted(self, sample: Mapping[str, Any], *, check_ts: bool = False) -> None:
+        """可信来源样本的快速路径：不经过 pydantic 校验。
+
+        只读取 ``self.metrics`` 中的指标（时间窗口另读 ``ts``），每个不同的
+        窗口读一次（缺失指标同 ``push`` 记为 NaN）。``check_ts=True`` 时检查
+        ``ts`` 为 >= 0 的 int，否则原样透传。不可信输入请用 ``push``。
+        """
+        self._check_owner()
+        if check_ts:
+            _check_ts(sample.get("ts"))
+        with self._lock:
+            if self._graph.push(sample):
+                self._evaluate(sample.get("ts"))
+            else:
+                self._hold(sample.get("ts"))
+
+    def push_batch(
+        self, columns: Mapping[str, np.ndarray], ts: np.ndarray
+    ) -> List[Tuple[int, List[str]]]:
+        """按列批量写入一段样本，一次向量化完成。
+
+        等价于按行依次 ``push``：窗口、聚合与区间判断在 numpy 上对整批计算。
+        只返回路径变化 —— 路径与前一个样本不同的每个样本给出
+        ``(ts, active_path)``（首个样本与调用前的 ``active_path`` 比较）。
+        ``columns`` 中缺失的指标同 ``push`` 记为 NaN。
+        """
+        self._check_owner()
+        with self._lock:
+            cols, ts = _check_batch(columns, ts, self._metrics)
+            if ts.size == 0:
+                return []
+            return self._evaluate_batch(self._graph.push_batch(cols, ts), ts)
+
+    def push_frames(
+        self, frames: bytes | memoryview | np.ndarray, schema: Optional[FrameSchema] = None
+    ) -> List[Tuple[int, List[str]]]:
+        """写入按固定布局打包的二进制记录帧；结果同 ``push_batch``。
+
+        ``frames`` 为按 ``schema`` 布局排列的整条记录组成的类 bytes 缓冲区，
+        或一维结构化数组（此时可省略 ``schema``，时间戳字段须名为 ``"ts"``）。
+        指标到记录偏移的绑定按 schema 与指标列表只做一次；每次调用只是一次
+        ``np.frombuffer`` 加跨步列视图，不产生逐样本的 dict 或 float。本树
+        不用的字段从不读取。
+        """
+        cols, ts = frame_columns(frames, schema, self._metrics)
+        return self.push_batch(cols, ts)
+
+    def astream(
+        self,
+        source: AsyncIterator[SampleDTO | Mapping[str, Any]],
+        *,
+        batch_size: int = 256,
+        max_queue: int = 1024,
+        executor: Optional[Executor] = None,
+    ) -> AsyncIterator[PathEvent]:
+        """消费异步样本源，只产出路径变化。
+
+        样本读入容量为 ``max_queue`` 的队列（队列满时暂停读取样本源），已就绪
+        的样本按至多 ``batch_size`` 条一批经 ``push_batch`` 写入。每批在
+        ``executor`` 中执行（为 None 时用事件循环的默认执行器），不阻塞事件
+        循环。激活路径与前一个样本不同的每个样本产出一个 PathEvent。流运行
+        期间不要通过其他方式写入本树。
+        """
+        self._check_owner()
+        from ._stream import astream        # asyncio 只在异步流式求值时导入
+
+        return astream(self, source, batch_size=batch_size, max_queue=max_queue, executor=executor)
+
+    def snapshot(self, path: Optional[str | Path] = None) -> bytes:
+        """把全部窗口缓冲区序列化为二进制快照。
+
+        头部带有 ``config_hash``，快照只能恢复进以相同配置与 pps 构建的树。
+        给出 ``path`` 时同时写入该文件。
+        """
+        self._check_owner()
+        with self._lock:
+            data = _snapshot.dump(self._graph, self.config_hash)
+        if path is not None:
+            Path(path).write_bytes(data)
+        return data
+
+    def restore(self, source: bytes | memoryview | str | Path) -> None:
+        """加载 ``snapshot`` 的结果（bytes，或经 mmap 读取的文件路径）。
+
+        直接填充窗口并一次性重建流式聚合，不回放历史；随后重新求值激活
+        路径，恢复后立即可用。配置不符或快照损坏时抛出 ValueError，树保持
+        不变。
+        """
+        self._check_owner()
+        with self._lock:
+            if isinstance(source, (str, Path)):
+                _snapshot.load_file(self._graph, source, self.config_hash)
+            else:
+                _snapshot.load(self._graph, source, self.config_hash)
+            self._evaluate(None)
+
+    def instrument(
+        self,
+        enabled: bool = True,
+        *,
+        on_eval: Optional[EvalHook] = None,
+        on_transition: Optional[TransitionHook] = None,
+    ) -> None:
+        """开启或关闭逐节点 / 逐 Unit 的计数与计时。
+
+        开启期间每次求值统计节点与 Unit 的判断 / 命中次数，对聚合读取与
+        （拥有自身窗口的树的）窗口写入计时，并记录最深激活节点。每次
+        push / push_batch 之后调用 ``on_eval(path, ns)``，每次激活路径变化
+        （含批内的变化）调用 ``on_transition``。
+
+        插桩替换的是本实例上的求值入口，关闭时运行的就是未插桩的代码。
+        关闭后计数保留，用 ``stats`` 读取。
+        """
+        if self._instr is None:
+            self._instr = Instrumentation(self)
+        self._instr.uninstall()
+        if enabled:
+            self._instr.install(on_eval, on_transition)
+
+    def parallel(self, workers: Optional[int] = None, *, min_cost_ns: Optional[int] = None) -> None:
+        """启用常驻线程池上的批量求值。
+
+        ``push_batch``（以及经由它的 ``push_frames`` / ``astream``）把本树的
+        窗口分成若干工作块：每块写入自己的窗口并计算 Unit 从中读取的全部
+        聚合，各块在 ``workers`` 个线程（含调用方线程）上运行，合并结果后
+        再计算激活路径。代价模型按批大小与聚合种类估算每个窗口的工作量
+        （numpy 计算释放 GIL；逐行的 Python 循环只在 free-threaded 构建上
+        才能重叠）；低于 ``min_cost_ns`` 或可并行工作太少的批次仍走单线程
+        路径。两种路径结果完全一致。
+
+        ``workers=None`` 取 CPU 个数，``0`` 或 ``1`` 关闭线程池。逐样本
+        ``push`` 从不并行；插桩的树按顺序写入窗口，使逐窗口计时仍有意义。
+        该设置在 ``reload`` 后保留。
+        """
+        self._check_owner()
+        from ._parallel import MIN_COST_NS, Runner     # 线程池只在启用并行时导入
+
+        runner = Runner.resolve(workers, min_cost_ns=MIN_COST_NS if min_cost_ns is None else min_cost_ns)
+        with self._lock:
+            old, self._graph.runner = self._graph.runner, runner
+        if old is not None:
+            old.close()
+
+    def stats(self, *, reset: bool = False) -> TreeStats:
+        """``instrument`` 开启期间收集的计数（从未开启时全为 0）。
+
+        ``reset=True`` 时读取后清零。
+        """
+        if self._instr is None:
+            self._instr = Instrumentation(self)
+        out = self._instr.stats()
+        if reset:
+            self._instr.clear()
+        return out
+
+    def reload(self, cfg: str | Dict[str, Any] | RuleDTO) -> int:
+        """原地切换到新配置，保留已预热的窗口。
+
+        新配置仍在使用的每个 (metric, window) 保留其缓冲区、时间戳与流式聚合
+        状态，无论周围改了什么（阈值、聚合、树形、节点 id）；只有新出现的
+        窗口从空开始。保留窗口上新增的聚合按窗口现有内容计算，有两种情况与
+        一直运行新配置的树不同：hopping 窗口上先按当前内容而非上个求值边界
+        的内容求值；分桶窗口上的分位数在热更新前的桶全部滑出之前读数为 NaN。
+        新树在旁构建、在树锁内换入，并发的 ``push`` 只会看到旧树或新树，不会
+        看到混合状态；新配置无效时树保持不变。
+
+        换入后在保留的窗口上重新求值激活路径（变化经 ``changed`` /
+        ``last_transition`` 报告，``ts=None``）。插桩计数重新开始。返回接管的
+        窗口个数。
+        """
+        self._check_owner()
+        tpl = self._compile(cfg)
+        with self._lock:
+            old_path = tuple(self._active_path)
+            built = self._build(tpl, self._graph.successor())
+            kept = built.graph.carried
+            instr, hooks = self._instr, None
+            if instr is not None and instr.installed:
+                hooks = (instr.on_eval, instr.on_transition)
+                instr.uninstall()
+
+            self._install(built)
+            self._instr = None
+            if hooks is not None:
+                self.instrument(True, on_eval=hooks[0], on_transition=hooks[1])
+
+            idx = self._plan.descend()
+            new_path = self._plan.paths[idx]
+            self._changed = new_path != old_path
+            if self._changed:
+                self._transition = Transition(old_path, new_path, None)
+            self._leaf = idx
+            self._active_path[:] = new_path
+            self._reached_leaf = self._plan.is_leaf[idx]
+        return kept
 
     def reset(self) -> None:
-        self._root.reset()
+        self._check_owner()
+        with self._lock:
+            self._graph.reset()
+            self._root.reset()
 
     # ---- read‑only props ----------------------------------------------
     @property
@@ -49,53 +375,131 @@ class RuleTree:
 
     @property
     def active_path(self) -> List[str]:
+        """从根到最深激活节点的节点 id。
+
+        hopping / tumbling 窗口上的 Unit 只在窗口的求值边界上聚合、比较，
+        结果保持到下一个边界，因此两个边界之间的路径反映的是这些 Unit 各自
+        上个边界的结果（滑动窗口上的 Unit 仍逐样本求值）。全部窗口都是
+        hopping 时，未到达任何边界的样本完全不求值：路径不变，``changed``
+        为 False。批量写入遵循同样的逐样本语义。
+        """
         return self._active_path
 
     @property
     def reached_leaf(self) -> bool:
         return self._reached_leaf
 
+    @property
+    def changed(self) -> bool:
+        """最近一次 push / push_batch 是否改变了激活路径。"""
+        return self._changed
+
+    @property
+    def last_transition(self) -> Optional[Transition]:
+        """最近一次激活路径变化（首次变化之前为 None）。"""
+        return self._transition
+
+    @property
+    def config_hash(self) -> bytes:
+        """规范化配置与 pps 的 sha256（快照以此为键）。"""
+        return self._template.config_hash
+
     @property
     def last_node_info(self) -> Dict[str, Any]:
-        return self._last_node_info
+        """最深激活节点的信息；Unit 结果在访问时读取。"""
+        if self._leaf < 0:
+            return {}
+        node = self._order[self._leaf]
+        return {
+            "node_id": node.node_id,
+            "is_leaf": node.is_leaf,
+            "units": node.units_info,
+            "results": node.units_results,
+        }
+
+    # ---- evaluation (windows already fed) -----------------------------
+    def _check_owner(self) -> None:
+        if not self._owns_graph:
+            raise RuntimeError("this tree shares its SignalGraph; feed it through its RuleForest")
+
+    def _evaluate(self, ts: Optional[int]) -> None:
+        # Unit 惰性求值：只判断遍历到达的节点
+        self._set_leaf(self._plan.descend(), ts)
+
+    def _hold(self, ts: Optional[int]) -> None:
+        # 没有 hopping 窗口到达求值边界：路径不变（首个样本仍需建立路径）
+        if self._leaf < 0:
+            self._evaluate(ts)
+        else:
+            self._changed = False
+
+    def _deepest_batch(self, batches: Dict[int, WindowBatch], ts: np.ndarray) -> np.ndarray:
+        """逐行的最深激活节点下标；树的状态随最后一行更新。"""
+        n = ts.size
+        deepest = _greedy_descent(self._children, self._active_batch(batches, n), n)
+        last = int(deepest[-1])
+        if last != self._leaf:
+            # 路径变化发生在 ``last`` 最后一段连续出现的起点
+            other = np.flatnonzero(deepest != last)
+            self._set_leaf(last, int(ts[other[-1] + 1 if other.size else 0]))
+        else:
+            self._changed = False
+        return deepest
+
+    def _active_batch(self, batches: Dict[int, WindowBatch], n: int) -> np.ndarray:
+        """``n`` 行上的逐节点激活结果：按先序排列的 ``(节点数, n)`` bool 矩阵。"""
+        active = np.ones((len(self._order), n), dtype=bool)
+        self._root.check_batch(batches, active)
+        return active
+
+    def _evaluate_batch(
+        self, batches: Dict[int, WindowBatch], ts: np.ndarray
+    ) -> List[Tuple[int, List[str]]]:
+        prev = tuple(self._active_path)
+        deepest = self._deepest_batch(batches, ts)
+
+        paths = self._plan.paths
+        change = np.flatnonzero(deepest[1:] != deepest[:-1]) + 1
+        out: List[Tuple[int, List[str]]] = []
+        if paths[deepest[0]] != prev:
+            out.append((int(ts[0]), list(paths[deepest[0]])))
+        out.extend((int(ts[i]), list(paths[deepest[i]])) for i in change)
+        return out
 
     # ---- internal helpers ---------------------------------------------
+    def _build(self, tpl: TreeTemplate, graph: SignalGraph) -> "_Built":
+        """在 ``graph`` 上实例化 ``tpl``，不改动 ``self``。"""
+        root, order, parents, children, plan = tpl.instantiate(graph)
+        graph.settle([u for node in order for u in node.units])
+        return _Built(tpl, graph, root, order, parents, children, plan)
+
+    def _install(self, built: "_Built") -> None:
+        """启用 ``built``（只是属性替换）。"""
+        self._template, self._graph, self._root = built.template, built.graph, built.root
+        self._order, self._parents, self._children = built.order, built.parents, built.children
+        self._plan = built.plan
+        self._metrics: List[str] = list(built.template.metrics)
+
+    def _compile(self, cfg: str | Dict[str, Any] | RuleDTO) -> TreeTemplate:
+        return _template.template(cfg, pps=self._pps, codegen=self._codegen, cache_dir=self._cache_dir)
+
+    @property
+    def _cfg(self) -> RuleDTO:
+        return self._template.cfg
+
     @staticmethod
     def _validate_cfg(raw: str | Dict[str, Any] | RuleDTO) -> RuleDTO:
-        if isinstance(raw, RuleDTO):
-            return raw
-        if isinstance(raw, str):
-            # try file path else JSON string
-            path = Path(raw)
-            content = path.read_text() if path.is_file() else raw
-            return RuleDTO.model_validate_json(content)
-        return RuleDTO.model_validate(raw)
-
-    def _collect_metrics(self) -> List[str]:
-        mets: set[str] = set()
-
-        def walk(node: _Node) -> None:
-            if not node.is_always_true:
-                mets.update(u.metric for u in node.units)
-            for s in node.subs:
-                walk(s)
-
-        walk(self._root)
-        return sorted(mets)
-
-    def _reorder_tree(self) -> None:
-        stack: List[tuple[_Node, bool]] = [(self._root, False)]
-        while stack:
-            node, visited = stack.pop()
-            if not visited:
-                stack.append((node, True))
-                stack.extend((s, False) for s in node.subs)
-            else:
-                node.subs.sort(key=lambda n: n.is_always_true)
-
-    def _update_active_path(self) -> None:
-        self._active_path.clear()
-        self._reached_leaf = False
-        self._last_node_info = {}
+        """解析配置（JSON 文本、JSON 文件路径、dict 或 RuleDTO），不经缓存。"""
+        return _template._validate(_template.load_cfg(raw))
 
-        stack: List[tuple[_Node, List[str]]] = [(self._root, [self._root
+    def _set_leaf(self, idx: int, ts: Optional[int]) -> None:
+        """把激活路径移到节点 ``idx``；只有真正变化时才修改状态。"""
+        if idx == self._leaf:
+            self._changed = False
+            return
+        paths = self._plan.paths
+        self._transition = Transition(paths[self._leaf] if self._leaf >= 0 else (), paths[idx], ts)
+        self._changed = True
+        self._leaf = idx
+        self._active_path[:] = paths[idx]
+        self._reached_leaf = self._plan.is_leaf[idx]
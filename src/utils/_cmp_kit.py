@@ -1,7 +1,10 @@
+from __future__ import annotations
 from typing import Callable, Dict
-from loguru import logger
+from ._lazy import lazy_import
 
 
+np = lazy_import("numpy")
+
 __all__ = ["CmpKit"]
 
 
@@ -11,6 +14,7 @@ class CmpKit:
     --------------------------------------------
     1. 提供对不同区间类型（如 "[]", "[)", "(]" 等）的静态比较函数
     2. 通过 `get / all` 方法，暴露「字符串 → 函数」映射
+    3. 通过 `get_vec` 暴露对 ndarray 逐元素判断的向量化版本
     """
 
     # ──────────────── ① 比较函数定义 ────────────────
@@ -51,6 +55,8 @@ class CmpKit:
         若不支持该类型，则返回恒为 False 的占位函数，并记录错误日志。
         """
         if cmp_type not in cls._CMP_MAP:
+            from loguru import logger     # 仅错误路径需要，避免导入期加载
+
             logger.error(f"Unsupported comparison type: {cmp_type}")
             return lambda x, a, b: False
         return cls._CMP_MAP[cmp_type]
@@ -67,4 +73,45 @@ class CmpKit:
         """返回比较函数映射表的浅拷贝"""
         return cls._CMP_MAP.copy()
 
+    # ──────────────── ④ 向量化版本（ndarray → bool ndarray） ────────────────
+    @staticmethod
+    def closed_vec(x: np.ndarray, a: float, b: float) -> np.ndarray:
+        """闭区间 [a, b]"""
+        return (a <= x) & (x <= b)
+
+    @staticmethod
+    def left_closed_vec(x: np.ndarray, a: float, b: float) -> np.ndarray:
+        """左闭右开区间 [a, b)"""
+        return (a <= x) & (x < b)
+
+    @staticmethod
+    def right_closed_vec(x: np.ndarray, a: float, b: float) -> np.ndarray:
+        """左开右闭区间 (a, b]"""
+        return (a < x) & (x <= b)
+
+    @staticmethod
+    def open_vec(x: np.ndarray, a: float, b: float) -> np.ndarray:
+        """开区间 (a, b)"""
+        return (a < x) & (x < b)
+
+    _CMP_VEC_MAP: Dict[str, Callable[[np.ndarray, float, float], np.ndarray]] = {
+        "[]": closed_vec.__func__,         # type: ignore
+        "[)": left_closed_vec.__func__,   # type: ignore
+        "(]": right_closed_vec.__func__,  # type: ignore
+        "()": open_vec.__func__,          # type: ignore
+    }
+
+    @classmethod
+    def get_vec(cls, cmp_type: str) -> Callable[[np.ndarray, float, float], np.ndarray]:
+        """
+        获取指定区间类型的向量化比较函数（语义与 `get` 一致）。
+        若不支持该类型，则返回恒为 False 的占位函数，并记录错误日志。
+        """
+        if cmp_type not in cls._CMP_VEC_MAP:
+            from loguru import logger     # 仅错误路径需要，避免导入期加载
+
+            logger.error(f"Unsupported comparison type: {cmp_type}")
+            return lambda x, a, b: np.zeros(np.shape(x), dtype=bool)
+        return cls._CMP_VEC_MAP[cmp_type]
+
 
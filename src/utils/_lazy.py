@@ -0,0 +1,33 @@
+from __future__ import annotations
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+
+__all__ = ["lazy_import"]
+
+_lock = threading.Lock()
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    延迟导入模块
+    --------------------------------------------
+    1. 立即返回模块对象并登记到 ``sys.modules``，真正的导入推迟到首次访问属性时
+    2. 加载完成后模块恢复为普通 ``ModuleType``，之后的属性访问没有额外开销
+    3. 已导入（或已登记为延迟）的模块原样返回；找不到模块时照常抛出 ``ModuleNotFoundError``
+    """
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        spec = importlib.util.find_spec(name)
+        if spec is None or spec.loader is None:
+            raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
@@ -1,7 +1,14 @@
 from __future__ import annotations
-from typing import Callable, Dict, List
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
 import math
-import numpy as np
+import re
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
 
 __all__ = ["MetricsKit"]
 
@@ -10,7 +17,10 @@ class MetricsKit:
     """
     统一聚合函数工具类
     1. 提供常见统计量（平均值、极值、方差等）
-    2. 通过 `get / all / has` 暴露「字符串 → 函数」映射
+    2. 通过 `get / all / has` 暴露「字符串 → 函数」映射（入参可为 list 或 1-D ndarray）
+    3. 通过 `stream` 暴露可增量维护的流式聚合器（O(1) / 样本）
+    4. 分位数 ``p50 / p90 / p95 / p99 / median`` 由对数分桶草图近似（见 ``QuantileSketch``），
+       任意分位与精度可写为 ``"p<百分位>[~<相对误差>]"``，如 ``"p99.9~0.001"``
     """
 
     _NAN = float("nan")  # 空数据兜底
@@ -18,38 +28,42 @@ class MetricsKit:
     # ────────── ① 聚合函数定义：全部改为 float ──────────
     @staticmethod
     def mean(vals: List[float]) -> float:
-        return round(float(np.mean(vals)), 2) if vals else MetricsKit._NAN
+        return round(float(np.mean(vals)), 2) if len(vals) else MetricsKit._NAN
+
+    @staticmethod
+    def vsum(vals: List[float]) -> float:
+        return round(float(np.sum(vals)), 2) if len(vals) else MetricsKit._NAN
 
     @staticmethod
     def vmax(vals: List[float]) -> float:
-        return max(vals) if vals else MetricsKit._NAN
+        return max(vals) if len(vals) else MetricsKit._NAN
 
     @staticmethod
     def vmin(vals: List[float]) -> float:
-        return min(vals) if vals else MetricsKit._NAN
+        return min(vals) if len(vals) else MetricsKit._NAN
 
     @staticmethod
     def rms(vals: List[float]) -> float:
-        return round(float(np.sqrt(np.mean(np.square(vals)))), 2) if vals else MetricsKit._NAN
+        return round(float(np.sqrt(np.mean(np.square(vals)))), 2) if len(vals) else MetricsKit._NAN
 
     @staticmethod
     def ptp(vals: List[float]) -> float:
-        return round(float(np.ptp(vals)), 2) if vals else MetricsKit._NAN
+        return round(float(np.ptp(vals)), 2) if len(vals) else MetricsKit._NAN
 
     @staticmethod
     def rel_var(vals: List[float]) -> float:
-        if not vals:
+        if not len(vals):
             return MetricsKit._NAN
         m = np.mean(vals)
         return 0.0 if math.isclose(m, 0.0) else round(float(np.ptp(vals) / m), 2)
 
     @staticmethod
     def std(vals: List[float]) -> float:
-        return round(float(np.std(vals)), 2) if vals else MetricsKit._NAN
+        return round(float(np.std(vals)), 2) if len(vals) else MetricsKit._NAN
 
     @staticmethod
     def var(vals: List[float]) -> float:
-        return round(float(np.var(vals)), 2) if vals else MetricsKit._NAN
+        return round(float(np.var(vals)), 2) if len(vals) else MetricsKit._NAN
 
     @staticmethod
     def slope(vals: List[float]) -> float:
@@ -63,6 +77,7 @@ class MetricsKit:
     # ────────── ② 字符串 → 函数映射 ──────────
     _AGG_MAP: Dict[str, Callable[[List[float]], float]] = {
         "mean": mean.__func__, "avg": mean.__func__, # type: ignore
+        "sum": vsum.__func__, # type: ignore
         "vmax": vmax.__func__, "max": vmax.__func__, # type: ignore
         "vmin": vmin.__func__, "min": vmin.__func__, # type: ignore
         "rms": rms.__func__, # type: ignore
@@ -77,12 +92,866 @@ class MetricsKit:
     @classmethod
     def get(cls, agg: str) -> Callable[[List[float]], float]:
         """根据名称获取聚合函数；若不存在返回恒 `nan` 占位函数"""
-        return cls._AGG_MAP.get(agg, lambda _vals: MetricsKit._NAN)
+        fn = cls._AGG_MAP.get(agg)
+        if fn is None:
+            spec = cls.quantile_spec(agg)
+            fn = _quantile_fn(*spec) if spec else (lambda _vals: MetricsKit._NAN)
+        return fn
 
     @classmethod
     def has(cls, agg: str) -> bool:
-        return agg in cls._AGG_MAP
+        return agg in cls._AGG_MAP or cls.quantile_spec(agg) is not None
+
+    @staticmethod
+    def quantile_spec(agg: str) -> Optional[Tuple[float, float]]:
+        """解析分位数聚合名，返回 ``(分位 q ∈ [0, 1], 相对误差 alpha)``；不是分位数时返回 ``None``。"""
+        m = _QUANTILE_RE.match(agg)
+        if m is None:
+            return None
+        pct, alpha = m.group(1), m.group(2)
+        q = 0.5 if pct is None else float(pct) / 100.0
+        a = _SKETCH_ALPHA if alpha is None else float(alpha)
+        return (q, a) if 0.0 < a < 1.0 else None
 
     @classmethod
     def all(cls) -> Dict[str, Callable[[List[float]], float]]:
         return cls._AGG_MAP.copy()
+
+    @classmethod
+    def sliding(cls, agg: str) -> Optional[Callable[["RangeStats", np.ndarray, np.ndarray], np.ndarray]]:
+        """
+        获取聚合名对应的向量化区间实现；不支持时返回 ``None``。
+
+        返回函数签名 ``fn(stats, starts, ends) -> ndarray``：对 ``stats`` 所包装数组的
+        每个闭区间 ``[starts[i], ends[i]]`` 计算聚合值，结果与 ``get(agg)`` 作用于
+        对应切片一致（NaN 传播、2 位小数舍入规则相同）。
+
+        分位数不是真正的向量化实现：``RangeStats.quantile`` 在 Python 中逐行
+        滑动草图（每行 O(log 桶数)），批量写入时代价与逐样本 ``push`` 同量级。
+        """
+        fn = _SLIDING_MAP.get(agg)
+        if fn is None:
+            spec = MetricsKit.quantile_spec(agg)
+            if spec is not None:
+                q, kind = spec[0], QuantileSketch.configure(spec[1])
+                fn = lambda st, s, e: st.quantile(s, e, q, kind)  # noqa: E731
+        return fn
+
+    @staticmethod
+    def _settle(x: float, err: float = 0.0) -> Optional[float]:
+        """
+        对近似值 ``x``（流式 / 分块求和所得）做 ``round(x, 2)``。
+
+        ``x`` 落在舍入边界附近（见 ``_ambiguous``）时返回 ``None``：近似误差可能
+        改变舍入方向，须由调用方用原始函数对窗口数据重新计算。``err`` 为 ``x``
+        的绝对误差上界（增量求和在大幅电平跳变后的抵消误差），歧义带随之加宽；
+        误差上界超过半个舍入单位时总是返回 ``None``。结果为 0 时符号可能与
+        全量计算不同（``0.0 == -0.0``，不影响比较）。
+        """
+        if not err <= _AMBIG_TRUST:
+            return None
+        if math.isfinite(x):
+            y = abs(x) * 100.0
+            if abs(y - math.floor(y) - 0.5) <= _AMBIG_ABS + _AMBIG_REL * y + 100.0 * err or y >= _AMBIG_BIG:
+                return None
+        return round(x, 2)
+
+    @staticmethod
+    def _ambiguous(x: np.ndarray, err: Optional[np.ndarray] = None) -> np.ndarray:
+        """``_settle`` 返回 ``None`` 的条件（逐元素）。"""
+        y = np.abs(x) * 100.0
+        tol = _AMBIG_ABS + _AMBIG_REL * y
+        if err is not None:
+            tol = tol + 100.0 * err
+        with np.errstate(invalid="ignore"):
+            near = np.abs(y - np.floor(y) - 0.5) <= tol
+            if err is not None:
+                near |= ~(err <= _AMBIG_TRUST)
+        return near | (np.isfinite(y) & (y >= _AMBIG_BIG))
+
+    @staticmethod
+    def _round2_vec(x: np.ndarray, exact: Optional[Callable[[int], float]] = None,
+                    err: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        ``round(x, 2)`` 的向量化版本（结果逐位相同）。
+
+        远离舍入边界的元素走 ``np.round``；其余元素（``_ambiguous``，``err`` 为
+        逐元素误差上界）逐个处理：给出 ``exact`` 时取 ``exact(i)``（对第 i 行
+        原始数据重算），否则对 ``x[i]`` 本身做 ``round``。
+        """
+        x = np.asarray(x, dtype=np.float64)
+        amb = MetricsKit._ambiguous(x, err)
+        out = np.round(np.where(amb, 0.0, x), 2)
+        for i in np.flatnonzero(amb).tolist():
+            out[i] = exact(i) if exact is not None else round(float(x[i]), 2)
+        return out
+
+    @classmethod
+    def stream(cls, agg: str) -> Optional[Tuple[Type["StreamAgg"], Callable[["StreamAgg"], float]]]:
+        """
+        获取聚合名对应的流式实现 ``(状态类, 读取函数)``；不支持时返回 ``None``。
+
+        状态类由窗口持有并在 append / evict 时增量更新，同一窗口上的多个
+        聚合（如 mean 与 std）共享同一状态实例；读取函数输出与 ``get(agg)``
+        在同一窗口数据上一致。增量结果落在舍入边界附近时读取函数返回 ``None``
+        （见 ``_settle``），调用方须改用 ``get(agg)`` 对窗口数据全量计算。
+        """
+        out = _STREAM_MAP.get(agg)
+        if out is None:
+            spec = cls.quantile_spec(agg)
+            if spec is not None:
+                q = spec[0]
+                out = (QuantileSketch.configure(spec[1]), lambda st: st.quantile(q))  # type: ignore[attr-defined]
+        return out
+
+
+# --------------------------------------------------------------------
+#                       流 式 聚 合 状 态
+# --------------------------------------------------------------------
+# 舍入歧义带：y = |x|·100 距 ``k + 0.5`` 不超过 ``_AMBIG_ABS + _AMBIG_REL·y`` 时，
+# 增量 / 分块求和的末位误差可能使 round(x, 2) 与全量计算不同；y 超过
+# ``_AMBIG_BIG`` 时 ``np.round`` 的 x·100 已不精确
+_AMBIG_ABS = 1e-6
+_AMBIG_REL = 1e-11
+_AMBIG_BIG = 1e12
+_AMBIG_TRUST = 1e-3            # 误差上界超过该值时不再尝试判定舍入方向
+# 增量和的误差界：每次加 / 减引入不超过 ``_EPS`` × 当时被加数量级的舍入误差，
+# 历史上的最大量级须保留（电平跳变后 Σd² 虽回落，其中的误差并不随之消失）
+_EPS = 2.0 ** -52
+_REBASE = 1e4                  # 抵消超过约 4 位有效数字时重建流式状态
+
+
+class StreamAgg:
+    """流式聚合状态基类：由 Window 在每次写入 / 淘汰时驱动。"""
+
+    __slots__ = ()
+
+    def push(self, x: float) -> None:
+        """新值进入窗口（最新端）。"""
+        raise NotImplementedError
+
+    def evict(self, x: float) -> None:
+        """最旧值离开窗口（必须与写入顺序一致）。"""
+        raise NotImplementedError
+
+    def rebuild(self, vals: Iterable[float]) -> None:
+        """按窗口当前内容重建状态（用于初始化 / 抵消浮点累计误差）。"""
+        self.reset()
+        for x in vals:
+            self.push(x)
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+    def stale(self) -> bool:
+        """增量误差是否已大到值得重建（读取函数返回 ``None`` 后由窗口查询）。"""
+        return False
+
+
+class RunningMoments(StreamAgg):
+    """滑动和 / 平方和（以首值为偏移量，降低大偏置下的抵消误差）。
+
+    NaN 单独计数：窗口内存在 NaN 时所有读数为 NaN，与 numpy 行为一致。
+
+    偏移量只在 ``rebuild`` 时移到窗口均值；其间数据大幅跳变（如 0 ↔ 1e9 电平
+    切换）时 Σd、Σd² 的抵消误差可远超结果本身。为此记录自上次重建以来的
+    加减次数与被加数的最大量级，读取时据此给出误差上界（见 ``_settle``）；
+    误差可能改变舍入结果时读取函数返回 ``None``，由窗口全量重算并重建状态。
+    """
+
+    __slots__ = ("_n", "_nan", "_k", "_s1", "_s2", "_ops", "_p1", "_p2")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def push(self, x: float) -> None:
+        if x != x:
+            self._nan += 1
+            return
+        if self._n == 0:
+            self._k = x
+        d = x - self._k
+        self._n += 1
+        self._s1 = s1 = self._s1 + d
+        self._s2 = s2 = self._s2 + d * d
+        self._track(s1, s2, d)
+
+    def evict(self, x: float) -> None:
+        if x != x:
+            self._nan -= 1
+            return
+        d = x - self._k
+        self._n -= 1
+        if self._n == 0:
+            self._s1 = self._s2 = 0.0
+            self._ops = 0
+            self._p1 = self._p2 = 0.0
+            return
+        self._s1 = s1 = self._s1 - d
+        self._s2 = s2 = self._s2 - d * d
+        self._track(s1, s2, d)
+
+    def _track(self, s1: float, s2: float, d: float) -> None:
+        """记录一次加减：次数与 |Σd| + |d|、Σd² 的历史最大值（误差上界用）。"""
+        self._ops += 1
+        a = abs(s1) + abs(d)
+        if a > self._p1:
+            self._p1 = a
+        if s2 > self._p2:
+            self._p2 = s2
+
+    def rebuild(self, vals: Iterable[float]) -> None:
+        arr = vals if isinstance(vals, np.ndarray) else np.fromiter(vals, dtype=float)
+        ok = arr[~np.isnan(arr)]
+        self._nan = int(arr.size - ok.size)
+        self._n = int(ok.size)
+        self._k = float(np.mean(ok)) if ok.size else 0.0
+        d = ok - self._k
+        self._s1 = float(np.sum(d))
+        self._s2 = float(np.dot(d, d))
+        self._ops = self._n
+        self._p1 = abs(self._s1) + (float(np.max(np.abs(d))) if ok.size else 0.0)
+        self._p2 = self._s2
+
+    def reset(self) -> None:
+        self._n = 0
+        self._nan = 0
+        self._k = 0.0
+        self._s1 = 0.0
+        self._s2 = 0.0
+        self._ops = 0
+        self._p1 = 0.0
+        self._p2 = 0.0
+
+    # -- 原始量 --------------------------------------------------------
+    def _raw_mean(self) -> float:
+        return self._k + self._s1 / self._n
+
+    def _raw_var(self) -> float:
+        m1 = self._s1 / self._n
+        return max(self._s2 / self._n - m1 * m1, 0.0)
+
+    def _err(self) -> Tuple[float, float]:
+        """Σd 与 Σd² 的绝对误差上界。"""
+        e = _EPS * self._ops
+        return e * self._p1, 2.0 * e * self._p2
+
+    def _var_err(self) -> Tuple[float, float, float]:
+        """(方差, 其误差上界, 均值误差上界)。"""
+        n = self._n
+        e1, e2 = self._err()
+        em = e1 / n
+        return self._raw_var(), e2 / n + (2.0 * abs(self._s1 / n) + em) * em, em
+
+    def _empty(self) -> bool:
+        return self._nan > 0 or self._n == 0
+
+    def stale(self) -> bool:
+        # 偏移量远离当前均值，或 Σd² 曾远大于当前值：重定偏移量可收回精度
+        if self._n == 0:
+            return False
+        m1 = self._s1 / self._n
+        return m1 * m1 > _REBASE * self._raw_var() or self._p2 > _REBASE * self._s2
+
+    # -- 读取函数（与 MetricsKit 同名函数对齐；None 见 MetricsKit._settle） --
+    def mean(self) -> Optional[float]:
+        if self._empty():
+            return MetricsKit._NAN
+        return MetricsKit._settle(self._raw_mean(), self._err()[0] / self._n)
+
+    def vsum(self) -> Optional[float]:
+        if self._empty():
+            return MetricsKit._NAN
+        return MetricsKit._settle(self._n * self._k + self._s1, self._err()[0])
+
+    def var(self) -> Optional[float]:
+        if self._empty():
+            return MetricsKit._NAN
+        v, ev, _ = self._var_err()
+        return MetricsKit._settle(v, ev)
+
+    def std(self) -> Optional[float]:
+        if self._empty():
+            return MetricsKit._NAN
+        v, ev, _ = self._var_err()
+        return MetricsKit._settle(math.sqrt(v), _sqrt_err(v, ev))
+
+    def rms(self) -> Optional[float]:
+        if self._empty():
+            return MetricsKit._NAN
+        m = self._raw_mean()
+        v, ev, em = self._var_err()
+        r = v + m * m
+        return MetricsKit._settle(math.sqrt(r), _sqrt_err(r, ev + (2.0 * abs(m) + em) * em))
+
+
+def _sqrt_err(a: float, e: float) -> float:
+    """``a`` 的绝对误差不超过 ``e`` 时 ``sqrt(a)`` 的误差上界。"""
+    return e / max(math.sqrt(a), math.sqrt(e)) if e > 0.0 else 0.0
+
+
+def _sqrt_err_vec(a: np.ndarray, e: np.ndarray) -> np.ndarray:
+    """``_sqrt_err`` 的逐元素版本。"""
+    with np.errstate(invalid="ignore"):
+        den = np.maximum(np.sqrt(a), np.sqrt(e))
+        return np.divide(e, den, out=np.zeros_like(e), where=e > 0.0)
+
+
+class RunningExtremes(StreamAgg):
+    """单调双端队列维护滑动最大 / 最小值，均摊 O(1)。
+
+    读数与内置 ``max`` / ``min`` 一致：最旧的值为 NaN 时为 NaN，否则忽略 NaN；
+    相等的值保留最早的一个。
+    """
+
+    __slots__ = ("_hi", "_lo", "_head", "_tail", "_nans")
+
+    def __init__(self) -> None:
+        self._hi: deque[Tuple[int, float]] = deque()
+        self._lo: deque[Tuple[int, float]] = deque()
+        self._nans: deque[int] = deque()             # 窗口内 NaN 的序号
+        self.reset()
+
+    def push(self, x: float) -> None:
+        seq = self._head
+        self._head += 1
+        if x != x:
+            self._nans.append(seq)
+            return
+        hi, lo = self._hi, self._lo
+        while hi and hi[-1][1] < x:
+            hi.pop()
+        hi.append((seq, x))
+        while lo and lo[-1][1] > x:
+            lo.pop()
+        lo.append((seq, x))
+
+    def evict(self, x: float) -> None:
+        seq = self._tail
+        self._tail += 1
+        if x != x:
+            self._nans.popleft()
+            return
+        if self._hi and self._hi[0][0] == seq:
+            self._hi.popleft()
+        if self._lo and self._lo[0][0] == seq:
+            self._lo.popleft()
+
+    def rebuild(self, vals: Iterable[float]) -> None:
+        # 单调队列中保留的恰为「不小于 / 不大于其后全部有限值」的元素
+        x = vals if isinstance(vals, np.ndarray) else np.fromiter(vals, dtype=float)
+        fin = ~np.isnan(x)
+        after_hi = np.maximum.accumulate(np.where(fin, x, -np.inf)[::-1])[::-1]
+        after_lo = np.minimum.accumulate(np.where(fin, x, np.inf)[::-1])[::-1]
+        after_hi = np.append(after_hi[1:], -np.inf)
+        after_lo = np.append(after_lo[1:], np.inf)
+        keep_hi = np.flatnonzero(fin & (x >= after_hi))
+        keep_lo = np.flatnonzero(fin & (x <= after_lo))
+        self._hi = deque(zip(keep_hi.tolist(), x[keep_hi].tolist()))
+        self._lo = deque(zip(keep_lo.tolist(), x[keep_lo].tolist()))
+        self._nans = deque(np.flatnonzero(~fin).tolist())
+        self._head = int(x.size)
+        self._tail = 0
+
+    def reset(self) -> None:
+        self._hi.clear()
+        self._lo.clear()
+        self._nans.clear()
+        self._head = 0
+        self._tail = 0
+
+    def _oldest_nan(self) -> bool:
+        return not self._hi or bool(self._nans) and self._nans[0] == self._tail
+
+    def vmax(self) -> float:
+        return MetricsKit._NAN if self._oldest_nan() else self._hi[0][1]
+
+    def vmin(self) -> float:
+        return MetricsKit._NAN if self._oldest_nan() else self._lo[0][1]
+
+    def ptp(self) -> float:
+        if self._nans or not self._hi:
+            return MetricsKit._NAN
+        return round(self._hi[0][1] - self._lo[0][1], 2)
+
+
+class RunningSlope(StreamAgg):
+    """滑动最小二乘斜率：维护 Σy 与 Σi·y（i 为窗口内下标）。"""
+
+    __slots__ = ("_n", "_nan", "_k", "_sy", "_siy")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def push(self, x: float) -> None:
+        if x != x:
+            self._nan += 1
+        elif self._n == 0:
+            self._k = x
+        d = 0.0 if x != x else x - self._k
+        self._siy += self._n * d
+        self._sy += d
+        self._n += 1
+
+    def evict(self, x: float) -> None:
+        if x != x:
+            self._nan -= 1
+        d = 0.0 if x != x else x - self._k
+        # 剩余元素下标整体左移一位
+        self._sy -= d
+        self._siy -= self._sy
+        self._n -= 1
+
+    def rebuild(self, vals: Iterable[float]) -> None:
+        y = vals if isinstance(vals, np.ndarray) else np.fromiter(vals, dtype=float)
+        fin = ~np.isnan(y)
+        self._n = int(y.size)
+        self._nan = int(y.size - np.count_nonzero(fin))
+        self._k = float(y[fin][0]) if self._nan < self._n else 0.0
+        d = np.where(fin, y - self._k, 0.0)
+        self._sy = float(np.sum(d))
+        self._siy = float(np.dot(np.arange(y.size, dtype=float), d))
+
+    def reset(self) -> None:
+        self._n = 0
+        self._nan = 0
+        self._k = 0.0
+        self._sy = 0.0
+        self._siy = 0.0
+
+    def slope(self) -> Optional[float]:
+        n = self._n
+        if n < 2:
+            return 0.0
+        if self._nan > 0:
+            return MetricsKit._NAN
+        sx = n * (n - 1) / 2.0
+        sxx = (n - 1) * n * (2 * n - 1) / 6.0
+        k = (n * self._siy - sx * self._sy) / (n * sxx - sx * sx)
+        return MetricsKit._settle(k)
+
+# 分位数草图：精度 / 量程参数
+_SKETCH_ALPHA = 0.01         # 默认相对误差
+_SKETCH_MIN = 1e-6           # |x| 不超过该值计入零桶
+_SKETCH_MAX = 1e9            # |x| 超过该值并入最外侧桶（量程外不保证精度）
+_QUANTILE_RE = re.compile(r"^(?:p(100|\d{1,2}(?:\.\d+)?)|median)(?:~(0?\.\d+))?$")
+
+
+class QuantileSketch(StreamAgg):
+    """对数分桶分位数草图（DDSketch 式），支持滑动淘汰。
+
+    * ``|x|`` 落在 ``(E[j], E[j+1]]``（``E[j] = _SKETCH_MIN · γ^j``，``γ = (1+α)/(1-α)``）
+      的值计入第 j 桶，以 ``2·E[j]·E[j+1] / (E[j]+E[j+1])`` 代表，相对误差不超过 α；
+      正、负值各一组桶，中间为零桶，按位置排列即按值有序
+    * 桶计数可增可减：淘汰即把对应桶计数减一，结果与「只对窗口内数据建草图」
+      完全一致，不随滑动累计误差；同一批数据的离线版本（``MetricsKit.get``）
+      与向量化版本（``RangeStats.quantile``）结果逐位相同
+    * 计数存放在定长 Fenwick 树中，写入 / 淘汰 / 查询均为 O(log 桶数)；
+      内存只取决于 α（α = 1% 时约 3.5k 个计数），与窗口长度无关
+    * 分位 q 取第 ``floor(q · (n-1))`` 个顺序统计量所在桶，窗口含 NaN 时为 NaN
+
+    不同精度对应不同子类（``configure``），同一窗口上同精度的各分位共享一个状态。
+    """
+
+    __slots__ = ("_tree", "_n", "_nan")
+
+    ALPHA: float = _SKETCH_ALPHA
+    _B: int = 0                                   # 每个符号的桶数
+    _EDGES: List[float] = []
+    _EDGES_NP: Optional[np.ndarray] = None       # 同 _EDGES（向量化查找用，首次使用时生成）
+    _VALUES: List[float] = []                     # 位置 → 代表值（升序）
+    _TOP: int = 1                                 # Fenwick 下降的最高位
+
+    def __init__(self) -> None:
+        self._tree: array = array("i")
+        self.reset()
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def configure(alpha: float) -> Type["QuantileSketch"]:
+        """返回相对误差为 ``alpha`` 的草图类（按精度缓存）。"""
+        gamma = (1.0 + alpha) / (1.0 - alpha)
+        b = math.ceil(math.log(_SKETCH_MAX / _SKETCH_MIN) / math.log(gamma))
+        edges = [_SKETCH_MIN * gamma ** j for j in range(b + 1)]     # 纯 Python：建表不加载 numpy
+        reps = [2.0 * lo * hi / (lo + hi) for lo, hi in zip(edges, edges[1:])]
+        values = [-r for r in reversed(reps)] + [0.0] + reps
+        return type(f"QuantileSketch_{alpha:g}", (QuantileSketch,), {
+            "__slots__": (),
+            "ALPHA": alpha,
+            "_B": b,
+            "_EDGES": edges,
+            "_EDGES_NP": None,
+            "_VALUES": values,
+            "_TOP": 1 << (len(values).bit_length() - 1),
+        })
+
+    # -- 值 → 位置 ------------------------------------------------------
+    @classmethod
+    def _pos(cls, x: float) -> int:
+        j = bisect_left(cls._EDGES, x if x >= 0 else -x) - 1
+        if j < 0:
+            return cls._B
+        if j >= cls._B:
+            j = cls._B - 1
+        return cls._B + 1 + j if x > 0 else cls._B - 1 - j
+
+    @classmethod
+    def _positions(cls, x: np.ndarray) -> np.ndarray:
+        """``_pos`` 的向量化版本（``x`` 不含 NaN）。"""
+        if cls._EDGES_NP is None:
+            cls._EDGES_NP = np.asarray(cls._EDGES, dtype=np.float64)
+        j = np.minimum(np.searchsorted(cls._EDGES_NP, np.abs(x), side="left") - 1, cls._B - 1)
+        return np.where(j < 0, cls._B, np.where(x > 0, cls._B + 1 + j, cls._B - 1 - j))
+
+    # -- Fenwick 树 ----------------------------------------------------
+    def _add(self, p: int, d: int) -> None:
+        t = self._tree
+        i, n = p + 1, len(t)
+        while i < n:
+            t[i] += d
+            i += i & -i
+
+    def _select(self, k: int) -> int:
+        """第 k 个（0 起）样本所在的位置。"""
+        t = self._tree
+        n, pos, step = len(t), 0, self._TOP
+        while step:
+            nxt = pos + step
+            if nxt < n and t[nxt] <= k:
+                pos = nxt
+                k -= t[nxt]
+            step >>= 1
+        return pos
+
+    # -- StreamAgg 接口 --------------------------------------------------
+    def push(self, x: float) -> None:
+        if x != x:
+            self._nan += 1
+            return
+        self._n += 1
+        self._add(self._pos(x), 1)
+
+    def evict(self, x: float) -> None:
+        if x != x:
+            self._nan -= 1
+            return
+        self._n -= 1
+        self._add(self._pos(x), -1)
+
+    def rebuild(self, vals: Iterable[float]) -> None:
+        x = vals if isinstance(vals, np.ndarray) else np.fromiter(vals, dtype=float)
+        ok = x[~np.isnan(x)]
+        size = len(self._VALUES)
+        cum = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self._positions(ok), minlength=size), out=cum[1:])
+        idx = np.arange(1, size + 1)
+        tree = array("i", [0])
+        tree.frombytes((cum[idx] - cum[idx - (idx & -idx)]).astype(np.int32).tobytes())
+        self._tree = tree
+        self._n = int(ok.size)
+        self._nan = int(x.size - ok.size)
+
+    def reset(self) -> None:
+        self._tree = array("i", bytes(4 * (len(self._VALUES) + 1)))
+        self._n = 0
+        self._nan = 0
+
+    def quantile(self, q: float) -> float:
+        if self._nan > 0 or self._n == 0:
+            return MetricsKit._NAN
+        return round(self._VALUES[self._select(_rank(q, self._n))], 2)
+
+
+def _rank(q: float, n: int) -> int:
+    """分位 q 对应的顺序统计量下标（吸收 q·(n-1) 的末位误差）。"""
+    return int(q * (n - 1) + 1e-9)
+
+
+def _quantile_fn(q: float, alpha: float) -> Callable[[List[float]], float]:
+    """草图分位数的离线版本：与流式 ``QuantileSketch.quantile`` 在同一窗口上结果一致。"""
+    def fn(vals: List[float]) -> float:
+        kind = QuantileSketch.configure(alpha)          # 首次调用时才建表（按精度缓存）
+        x = np.asarray(vals, dtype=np.float64)
+        if not x.size or np.isnan(x).any():
+            return MetricsKit._NAN
+        k = _rank(q, x.size)
+        p = np.partition(kind._positions(x), k)[k]
+        return round(kind._VALUES[int(p)], 2)
+
+    return fn
+
+
+MetricsKit._AGG_MAP.update({
+    "median": _quantile_fn(0.5, _SKETCH_ALPHA), "p50": _quantile_fn(0.5, _SKETCH_ALPHA),
+    "p90": _quantile_fn(0.9, _SKETCH_ALPHA),
+    "p95": _quantile_fn(0.95, _SKETCH_ALPHA),
+    "p99": _quantile_fn(0.99, _SKETCH_ALPHA),
+})
+
+
+_STREAM_MAP: Dict[str, Tuple[Type[StreamAgg], Callable[[StreamAgg], float]]] = {
+    "mean": (RunningMoments, RunningMoments.mean), "avg": (RunningMoments, RunningMoments.mean), # type: ignore
+    "sum": (RunningMoments, RunningMoments.vsum), # type: ignore
+    "var": (RunningMoments, RunningMoments.var), # type: ignore
+    "std": (RunningMoments, RunningMoments.std), # type: ignore
+    "rms": (RunningMoments, RunningMoments.rms), # type: ignore
+    "vmax": (RunningExtremes, RunningExtremes.vmax), "max": (RunningExtremes, RunningExtremes.vmax), # type: ignore
+    "vmin": (RunningExtremes, RunningExtremes.vmin), "min": (RunningExtremes, RunningExtremes.vmin), # type: ignore
+    "ptp": (RunningExtremes, RunningExtremes.ptp), # type: ignore
+    "slope": (RunningSlope, RunningSlope.slope), # type: ignore
+}
+
+
+# --------------------------------------------------------------------
+#                       向 量 化 区 间 统 计
+# --------------------------------------------------------------------
+class RangeStats:
+    """对 1-D 数组做一次预处理，之后可向量化查询任意闭区间 ``[s, e]`` 的聚合值。
+
+    * 和 / 平方和 / Σi·y：按 ``span`` 分块做块内前缀和（每块以块均值为偏移），
+      区间长度不超过 ``span`` 时至多跨 2 块，误差与流式实现同量级；块内
+      电平跳变时前缀和的抵消误差按块内最大量级估计上界，并入舍入歧义判定
+    * 最大 / 最小值：稀疏表（按需构建），结果精确
+    * NaN：以整数前缀计数，区间内出现 NaN 时结果为 NaN（max / min 同内置函数）
+    * 舍入：近似值落在 2 位小数舍入边界附近的行由原始函数对切片重算
+      （见 ``MetricsKit._round2_vec``），结果与 ``MetricsKit.get`` 相同
+
+    Parameters
+    ----------
+    x : ndarray
+        原始数据（从旧到新）。
+    span : int
+        将要查询的最大区间长度。
+    """
+
+    def __init__(self, x: np.ndarray, span: int) -> None:
+        x = np.asarray(x, dtype=np.float64)
+        n = x.size
+        blk = max(1, min(int(span), n))
+        nb = max(1, -(-n // blk))
+
+        nan = np.isnan(x)
+        self._nan_c = np.concatenate(([0], np.cumsum(nan)))
+        ok = np.zeros(nb * blk, dtype=bool)
+        ok[:n] = ~nan
+        z = np.zeros(nb * blk)
+        z[:n] = np.where(nan, 0.0, x)
+
+        ok2 = ok.reshape(nb, blk)
+        z2 = z.reshape(nb, blk)
+        cnt = ok2.sum(axis=1)
+        k = np.divide(z2.sum(axis=1), cnt, out=np.zeros(nb), where=cnt > 0)
+        d = np.where(ok2, z2 - k[:, None], 0.0)
+
+        self._x = x
+        self._blk = blk
+        self._k = k
+        self._p1 = np.cumsum(d, axis=1).ravel()
+        self._p2 = np.cumsum(d * d, axis=1).ravel()
+        self._pi = np.cumsum(d * np.arange(blk), axis=1).ravel()
+        # 块内前缀和的绝对误差上界（每次累加的舍入误差不超过 _EPS × 最大量级）
+        c1 = self._p1.reshape(nb, blk)
+        self._e1 = _EPS * blk * (np.abs(c1).max(axis=1) + np.abs(d).max(axis=1))
+        self._e2 = 2.0 * _EPS * blk * self._p2.reshape(nb, blk)[:, -1]
+        self._hi: Optional[List[np.ndarray]] = None
+        self._lo: Optional[List[np.ndarray]] = None
+
+    # -- 区间分段 ------------------------------------------------------
+    def _seg(self, p: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """块内闭区间 [a, b] 的前缀和差（a、b 同块；a > b 时为 0）。"""
+        prev = np.where(a % self._blk == 0, 0.0, p[np.maximum(a - 1, 0)])
+        return np.where(a <= b, p[np.maximum(b, 0)] - prev, 0.0)
+
+    def _moments(self, s: np.ndarray, e: np.ndarray):
+        """返回 (n, k0, Σd, Σd², Σ(j-s)·d, Σd 误差上界, Σd² 误差上界)，d 以区间首块均值 k0 为偏移。"""
+        blk = self._blk
+        bs, be = s // blk, e // blk
+        cross = be != bs
+        e1 = np.where(cross, bs * blk + blk - 1, e)
+        a2 = np.where(cross, be * blk, e + 1)           # 无第二段时令 a2 > e
+        n2 = e - a2 + 1
+
+        k0 = self._k[bs]
+        dk = self._k[be] - k0
+
+        s1a = self._seg(self._p1, s, e1)
+        s1b = self._seg(self._p1, a2, e)
+        s2a = self._seg(self._p2, s, e1)
+        s2b = self._seg(self._p2, a2, e)
+        sia = self._seg(self._pi, s, e1)
+        sib = self._seg(self._pi, a2, e)
+
+        sy = s1a + s1b + n2 * dk
+        syy = s2a + s2b + 2.0 * dk * s1b + n2 * dk * dk
+
+        # Σ(j - s)·d'：块内局部下标 l = j - 块首，故 (j - s) = l + (块首 - s)
+        siy_a = sia + (bs * blk - s) * s1a
+        l2b = np.where(n2 > 0, e % blk, -1)
+        siy_b = sib + dk * (l2b * (l2b + 1)) / 2.0 + (be * blk - s) * (s1b + n2 * dk)
+        siy = siy_a + siy_b
+
+        # 两段前缀和差各含两端的误差；跨块修正项另计一次舍入
+        e1 = 2.0 * (self._e1[bs] + self._e1[be]) + 2.0 * _EPS * (np.abs(s1a) + np.abs(s1b) + np.abs(n2 * dk))
+        e2 = 2.0 * (self._e2[bs] + self._e2[be]) + 3.0 * _EPS * (s2a + s2b + np.abs(2.0 * dk * s1b) + n2 * dk * dk)
+
+        n = (e - s + 1).astype(np.float64)
+        return n, k0, sy, syy, siy, e1, e2
+
+    def _has_nan(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        return self._nan_c[e + 1] - self._nan_c[s] > 0
+
+    def _raw_mean_var(self, s: np.ndarray, e: np.ndarray):
+        """返回 (均值, 方差, 均值误差上界, 方差误差上界)。"""
+        n, k0, sy, syy, _, e1, e2 = self._moments(s, e)
+        m1 = sy / n
+        em = e1 / n
+        return k0 + m1, np.maximum(syy / n - m1 * m1, 0.0), em, e2 / n + (2.0 * np.abs(m1) + em) * em
+
+    # -- 稀疏表 --------------------------------------------------------
+    def _table(self, fn: Callable[..., np.ndarray], fill: float) -> List[np.ndarray]:
+        lv = [np.where(np.isnan(self._x), fill, self._x)]
+        w = 1
+        while 2 * w <= self._blk:
+            prev = lv[-1]
+            lv.append(fn(prev[:-w], prev[w:]))
+            w *= 2
+        return lv
+
+    def _range(self, lv: List[np.ndarray], fn: Callable[..., np.ndarray],
+               s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        length = e - s + 1
+        lg = np.floor(np.log2(length)).astype(np.intp)
+        out = np.empty(s.size)
+        for j in np.unique(lg):
+            sel = lg == j
+            tab = lv[j]
+            out[sel] = fn(tab[s[sel]], tab[e[sel] - (1 << j) + 1])
+        return out
+
+    def _max(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        if self._hi is None:
+            self._hi = self._table(np.maximum, -np.inf)
+        return self._range(self._hi, np.maximum, s, e)
+
+    def _min(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        if self._lo is None:
+            self._lo = self._table(np.minimum, np.inf)
+        return self._range(self._lo, np.minimum, s, e)
+
+    # -- 聚合（与 MetricsKit 同名函数对齐） ------------------------------
+    def _nanify(self, out: np.ndarray, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        return np.where(self._has_nan(s, e), np.nan, out)
+
+    def _exact(self, agg: str, s: np.ndarray, e: np.ndarray) -> Callable[[int], float]:
+        """第 i 个区间上的原始聚合函数（供舍入歧义行重算）。"""
+        fn, x = MetricsKit.get(agg), self._x
+        return lambda i: fn(x[s[i]:e[i] + 1])
+
+    def _round2(self, raw: np.ndarray, agg: str, s: np.ndarray, e: np.ndarray,
+                err: Optional[np.ndarray] = None) -> np.ndarray:
+        return self._nanify(MetricsKit._round2_vec(raw, self._exact(agg, s, e), err), s, e)
+
+    def _first_nan(self, out: np.ndarray, s: np.ndarray) -> np.ndarray:
+        """对齐内置 max / min：区间首值为 NaN 时为 NaN，其余 NaN 忽略。"""
+        return np.where(np.isnan(self._x[s]), np.nan, out)
+
+    def mean(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        m, _, em, _ = self._raw_mean_var(s, e)
+        return self._round2(m, "mean", s, e, em)
+
+    def vsum(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        n, k0, sy, _, _, e1, _ = self._moments(s, e)
+        return self._round2(n * k0 + sy, "sum", s, e, e1)
+
+    def var(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        _, v, _, ev = self._raw_mean_var(s, e)
+        return self._round2(v, "var", s, e, ev)
+
+    def std(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        _, v, _, ev = self._raw_mean_var(s, e)
+        return self._round2(np.sqrt(v), "std", s, e, _sqrt_err_vec(v, ev))
+
+    def rms(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        m, v, em, ev = self._raw_mean_var(s, e)
+        r = v + m * m
+        return self._round2(np.sqrt(r), "rms", s, e, _sqrt_err_vec(r, ev + (2.0 * np.abs(m) + em) * em))
+
+    def vmax(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        return self._first_nan(self._max(s, e), s)
+
+    def vmin(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        return self._first_nan(self._min(s, e), s)
+
+    def ptp(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        return self._nanify(MetricsKit._round2_vec(self._max(s, e) - self._min(s, e)), s, e)
+
+    def rel_var(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        m, _, em, _ = self._raw_mean_var(s, e)
+        hi, lo = self._max(s, e), self._min(s, e)
+        # 均值相对量级过小（或不超过其误差上界）时近似误差会放大比值、也可能
+        # 改变「均值为 0」的判定：逐行重算
+        small = np.abs(m) <= np.maximum(1e-9 * (np.abs(hi) + np.abs(lo)), 2.0 * em)
+        exact = self._exact("rel_var", s, e)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            am = np.where(small, 1.0, np.abs(m))
+            err = (hi - lo) * em / (am * (am - np.where(small, 0.0, em)))
+            out = MetricsKit._round2_vec(np.where(small, 0.0, (hi - lo) / m), exact, err)
+        for i in np.flatnonzero(small & ~self._has_nan(s, e)).tolist():
+            out[i] = exact(i)
+        return self._nanify(out, s, e)
+
+    def quantile(self, s: np.ndarray, e: np.ndarray, q: float,
+                 kind: Type[QuantileSketch]) -> np.ndarray:
+        """草图分位数：按区间顺序增量维护一个草图（区间端点须单调不减）。
+
+        注意：与本类其余聚合不同，这里逐行在 Python 中更新 / 查询 Fenwick 树
+        （每行 O(log 桶数)，约数微秒），只省去了逐样本 ``push`` 的调度开销。
+        """
+        x = self._x
+        fin = ~np.isnan(x)
+        pos = np.full(x.size, -1, dtype=np.int64)
+        pos[fin] = kind._positions(x[fin])
+        pos_l = pos.tolist()
+        sk = kind()
+        values = kind._VALUES
+        out = np.full(s.size, np.nan)
+        cs, ce, n = 0, -1, 0
+        for i, (a, b) in enumerate(zip(s.tolist(), e.tolist())):
+            if a > ce:                                  # 与上一区间不相交：重新开始
+                sk.reset()
+                cs, ce, n = a, a - 1, 0
+            for j in range(cs, a):
+                if pos_l[j] >= 0:
+                    sk._add(pos_l[j], -1)
+                    n -= 1
+            for j in range(ce + 1, b + 1):
+                if pos_l[j] >= 0:
+                    sk._add(pos_l[j], 1)
+                    n += 1
+            cs, ce = a, b
+            if n:
+                out[i] = values[sk._select(_rank(q, n))]
+        return self._nanify(MetricsKit._round2_vec(out), s, e)
+
+    def slope(self, s: np.ndarray, e: np.ndarray) -> np.ndarray:
+        n, _, sy, _, siy, _, _ = self._moments(s, e)
+        sx = n * (n - 1) / 2.0
+        sxx = (n - 1) * n * (2 * n - 1) / 6.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k = (n * siy - sx * sy) / (n * sxx - sx * sx)
+        out = self._round2(np.where(n < 2, 0.0, k), "slope", s, e)
+        return np.where(n < 2, 0.0, out)
+
+
+_SLIDING_MAP: Dict[str, Callable[[RangeStats, np.ndarray, np.ndarray], np.ndarray]] = {
+    "mean": RangeStats.mean, "avg": RangeStats.mean,
+    "sum": RangeStats.vsum,
+    "var": RangeStats.var,
+    "std": RangeStats.std,
+    "rms": RangeStats.rms,
+    "vmax": RangeStats.vmax, "max": RangeStats.vmax,
+    "vmin": RangeStats.vmin, "min": RangeStats.vmin,
+    "ptp": RangeStats.ptp,
+    "rel_var": RangeStats.rel_var,
+    "slope": RangeStats.slope,
+}
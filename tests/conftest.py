@@ -0,0 +1,66 @@
+"""随机规则树与样本流（各测试共用）。"""
+
+import random
+
+METRICS = ("speed", "angle", "temp")
+AGGS = ("avg", "sum", "min", "max", "rms", "ptp", "rel_var", "std", "var", "slope", "p90", "median", "none")
+BUCKET_AGGS = ("avg", "sum", "min", "max", "rms", "ptp", "std", "var", "p90", "median", "none")
+
+
+def random_window(rnd: random.Random) -> dict:
+    r = rnd.random()
+    if r < 0.35:
+        return {"type": "count", "size": rnd.randint(1, 8)}
+    if r < 0.45:
+        size = rnd.randint(2, 8)
+        return {"type": "count", "size": size, "mode": "hopping", "hop": rnd.randint(1, size)}
+    if r < 0.5:
+        return {"type": "count", "size": rnd.randint(2, 6), "mode": "tumbling"}
+    if r < 0.6:
+        return {"type": "time", "sec": rnd.randint(2, 4), "resolution": rnd.choice([250, 500, 1000])}
+    if r < 0.7:
+        return {"type": "time", "sec": 2, "mode": "hopping", "hop": rnd.choice([300, 1000])}
+    return {"type": "time", "sec": rnd.randint(1, 2)}
+
+
+def random_cfg(seed: int, depth: int = 3, fan: int = 3) -> dict:
+    """随机规则树：计数 / 时间 / hopping / 分桶窗口与全部聚合混合。"""
+    rnd = random.Random(seed)
+    count = [0]
+
+    def unit() -> dict:
+        win = random_window(rnd)
+        aggs = BUCKET_AGGS if "resolution" in win else AGGS
+        lo = rnd.uniform(-5, 5)
+        return {"metric": rnd.choice(METRICS), "window": win, "agg": rnd.choice(aggs),
+                "cmp": {"type": rnd.choice(["()", "[]", "[)", "(]"]), "value": [lo, lo + rnd.uniform(0, 10)]}}
+
+    def node(d: int) -> dict:
+        count[0] += 1
+        out = {"id": f"n{count[0]}", "units": [unit() for _ in range(rnd.randint(1, 2))]}
+        if d < depth:
+            out["sub"] = [node(d + 1) for _ in range(fan)]
+            if rnd.random() < 0.5:
+                count[0] += 1
+                out["sub"].append({"id": f"else{count[0]}", "units": "else"})
+        return out
+
+    return {"id": "root", "units": "root", "sub": [node(1) for _ in range(fan)]}
+
+
+def random_samples(n: int, seed: int, late: bool = True) -> list:
+    """ts 大体递增（含重复、跳变与少量迟到样本），值带 3 位小数、偶有缺失与 NaN。"""
+    rnd = random.Random(seed)
+    out, t = [], 0
+    for _ in range(n):
+        t += rnd.choice([0, 50, 100, 100, 100, 250, 1500])
+        ts = t - rnd.randint(1, 1500) if late and t > 1500 and rnd.random() < 0.03 else t
+        s = {"ts": ts}
+        for m in METRICS:
+            r = rnd.random()
+            if r < 0.96:
+                s[m] = round(rnd.gauss(0, 3), 3)
+            elif r < 0.98:
+                s[m] = float("nan")
+        out.append(s)
+    return out
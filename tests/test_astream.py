@@ -0,0 +1,64 @@
+"""RuleTree.astream：微批流式求值与逐条 push 的差分测试。"""
+
+import asyncio
+
+import pytest
+
+from src.rules import RuleTree
+
+from conftest import random_cfg, random_samples
+
+
+def _transitions(tree, samples):
+    out, prev = [], list(tree.active_path)
+    for s in samples:
+        tree.push(s)
+        path = list(tree.active_path)
+        if path != prev:
+            out.append((s["ts"], path, tree.reached_leaf))
+        prev = path
+    return out
+
+
+async def _source(samples, fail_at=None):
+    for i, s in enumerate(samples):
+        if i == fail_at:
+            raise RuntimeError("source broke")
+        if i % 7 == 0:
+            await asyncio.sleep(0)                    # 让消费者在任意位置切出微批
+        yield s
+
+
+async def _collect(tree, source, **kw):
+    return [(e.ts, e.active_path, e.reached_leaf) async for e in tree.astream(source, **kw)]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("batch_size", [4, 256])
+def test_astream_matches_push(seed, batch_size):
+    cfg, samples = random_cfg(seed), random_samples(400, seed)
+    expected = _transitions(RuleTree(cfg, pps=10), samples)
+    tree = RuleTree(cfg, pps=10)
+    got = asyncio.run(_collect(tree, _source(samples), batch_size=batch_size, max_queue=16))
+    assert got == expected
+
+
+def test_astream_reraises_source_errors_after_earlier_events():
+    cfg, samples = random_cfg(0), random_samples(400, 0)
+    expected = _transitions(RuleTree(cfg, pps=10), samples[:300])
+    tree = RuleTree(cfg, pps=10)
+    got = []
+
+    async def run():
+        async for e in tree.astream(_source(samples, fail_at=300), batch_size=8):
+            got.append((e.ts, e.active_path, e.reached_leaf))
+
+    with pytest.raises(RuntimeError, match="source broke"):
+        asyncio.run(run())
+    assert got == expected
+
+
+def test_astream_rejects_bad_sizes():
+    tree = RuleTree(random_cfg(0), pps=10)
+    with pytest.raises(ValueError, match="must be >= 1"):
+        asyncio.run(_collect(tree, _source([]), batch_size=0))
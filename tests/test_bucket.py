@@ -0,0 +1,88 @@
+"""分桶窗口：读取值与对在窗各桶原始样本的全量聚合一致。"""
+
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from src.rules import RuleTree
+from src.rules._window import Window
+from src.utils._metrics_kit import MetricsKit
+
+EXACT = ("max", "min", "ptp", "none")                  # 直接取自样本 / 极值
+MOMENTS = ("mean", "sum", "var", "std", "rms", "rel_var")  # 由逐桶 Σ / Σ² 合成，允许末位舍入差
+NAN = float("nan")
+
+
+def _cfg(window, agg="avg"):
+    return {"id": "root", "units": "root", "sub": [
+        {"id": "a", "units": [{"metric": "x", "window": window, "agg": agg,
+                               "cmp": {"type": "()", "value": [0, 1]}}]},
+    ]}
+
+
+@pytest.mark.parametrize("window, agg, message", [
+    ({"type": "count", "size": 3, "resolution": 100}, "avg", "only applies to sliding time windows"),
+    ({"type": "time", "sec": 2, "mode": "hopping", "hop": 500, "resolution": 100}, "avg",
+     "only applies to sliding time windows"),
+    ({"type": "time", "sec": 1, "resolution": 5000}, "avg", "exceeds the window length"),
+    ({"type": "time", "sec": 10, "resolution": 1000}, "slope", "not available on a bucketed window"),
+])
+def test_invalid_bucket_config(window, agg, message):
+    with pytest.raises(ValidationError, match=message):
+        RuleTree(_cfg(window, agg), pps=10)
+
+
+def _stream(seed, n):
+    """ts 大体递增、约 5% 迟到样本；NaN 较多，常落在窗口最旧端。"""
+    rnd = random.Random(seed)
+    out, t = [], 0
+    for _ in range(n):
+        t += rnd.choice([0, 50, 100, 100, 250, 1500])
+        ts = t - rnd.randint(1, 1200) if t > 1200 and rnd.random() < 0.05 else t
+        v = NAN if rnd.random() < 0.05 else round(rnd.gauss(0, 3), 3)
+        out.append((v, ts))
+    return out
+
+
+def _expected(win, pushed):
+    """在窗各桶的样本（按 ts 稳定排序，同原始窗口的插入位置）上的全量聚合。"""
+    res = win._res
+    return [v for v, t in sorted(pushed, key=lambda p: p[1]) if win._first <= t // res <= win._cur]
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_bucket_readers_match_in_window_samples(seed):
+    rnd = random.Random(seed)
+    cfg = Window.Config(type="time", sec=rnd.randint(1, 3), resolution=rnd.choice([100, 250, 1000]))
+    win = Window.from_cfg(cfg, 10)
+    readers = {a: win.reader(a) for a in EXACT + MOMENTS}
+    pushed = []
+    for i, (v, ts) in enumerate(_stream(seed, 800)):
+        if i == 400:                                     # 中途经快照换到新窗口，结果不受影响
+            other = Window.from_cfg(cfg, 10)
+            readers = {a: other.reader(a) for a in readers}
+            other.set_state(*win.state())
+            win = other
+        win.push(v, ts)
+        if ts // win._res >= win._first:                 # 所属桶已滑出的迟到样本被丢弃
+            pushed.append((v, ts))
+        vals = _expected(win, pushed)
+        for a in EXACT:
+            want = vals[-1] if a == "none" else MetricsKit.get(a)(vals)
+            assert (want != want and readers[a]() != readers[a]()) or readers[a]() == want, (a, ts)
+        for a in MOMENTS:
+            got, want = readers[a](), MetricsKit.get(a)(vals)
+            assert (got != got and want != want) or abs(got - want) <= 0.0100001, (a, ts)
+
+
+def test_max_min_are_nan_only_when_the_oldest_sample_is():
+    win = Window.from_cfg(Window.Config(type="time", sec=1, resolution=100), 10)
+    vmax, vmin = win.reader("max"), win.reader("min")
+    win.push(1.0, 20)
+    win.push(NAN, 50)
+    assert (vmax(), vmin()) == (1.0, 1.0)
+    win.push(NAN, 10)                                    # 迟到的 NaN 成为最旧样本
+    assert vmax() != vmax() and vmin() != vmin()
+    win.push(3.0, 1150)                                  # 最旧的桶滑出
+    assert (vmax(), vmin()) == (3.0, 3.0)
@@ -0,0 +1,42 @@
+"""编译计划：生成代码的 ``descend`` 与通用执行循环逐样本一致。"""
+
+import math
+
+import pytest
+
+from src.rules import RuleTree
+
+from conftest import random_cfg, random_samples
+
+
+def _with_extreme_bounds(cfg):
+    # 把部分区间端点换成 ±inf / 极小值 / 负零，覆盖生成源码中的常量字面量处理
+    special = [-math.inf, math.inf, 1e-300, -0.0, 2.5e-7]
+    k = [0]
+
+    def walk(node):
+        if isinstance(node.get("units"), list):
+            for u in node["units"]:
+                lo, hi = u["cmp"]["value"]
+                pick = special[k[0] % len(special)]
+                u["cmp"]["value"] = [min(lo, pick), hi] if k[0] % 2 else [lo, max(hi, pick)]
+                k[0] += 1
+        for sub in node.get("sub", []):
+            walk(sub)
+
+    walk(cfg)
+    return cfg
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_generated_descend_matches_generic_loop(seed):
+    cfg = random_cfg(seed) if seed % 2 else _with_extreme_bounds(random_cfg(seed))
+    samples = random_samples(300, seed)
+    gen, loop = RuleTree(cfg, pps=10), RuleTree(cfg, pps=10, codegen=False)
+    plan = gen._plan
+    assert plan.code is not None and loop._plan.code is None
+    for s in samples:
+        gen.push(s)
+        loop.push(s)
+        assert plan.descend() == plan._descend_loop()
+        assert gen.active_path == loop.active_path
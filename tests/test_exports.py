@@ -0,0 +1,26 @@
+"""包级惰性导出（PEP 562）。"""
+
+import subprocess
+import sys
+
+import pytest
+
+import src.rules
+
+
+def _run(code):
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+
+def test_import_loads_no_heavy_dependencies():
+    out = _run("import sys, src.rules; print(sorted({'numpy', 'pydantic', 'loguru'} & set(sys.modules)))")
+    assert out.strip() == "[]"
+
+
+@pytest.mark.parametrize("first", ["BacktestResult", "backtest"])
+def test_exports_are_not_shadowed_by_their_modules(first):
+    # 导入 backtest 子模块会把包属性 ``backtest`` 设为该模块：无论先访问哪个名字都应得到函数
+    names = [first] + [n for n in src.rules.__all__ if n != first]
+    out = _run(f"import types, src.rules as r; print([n for n in {names!r} "
+               f"if isinstance(getattr(r, n), types.ModuleType)])")
+    assert out.strip() == "[]"
@@ -0,0 +1,38 @@
+"""RuleForest：共享信号图的多棵树与各自独立的 RuleTree 一致。"""
+
+import numpy as np
+import pytest
+
+from src.rules import RuleForest, RuleTree
+
+from conftest import METRICS, random_cfg, random_samples
+
+
+def _cfgs(seed):
+    # 同种子的配置重复出现：窗口与聚合在树间必然有重叠
+    return {"a": random_cfg(seed), "b": random_cfg(seed + 100), "c": random_cfg(seed)}
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("backend", ["deque", "ring"])
+def test_forest_matches_independent_trees(seed, backend):
+    cfgs, samples = _cfgs(seed), random_samples(250, seed)
+    forest = RuleForest(cfgs, pps=10, backend=backend)
+    trees = {name: RuleTree(cfg, pps=10, backend=backend) for name, cfg in cfgs.items()}
+    for s in samples:
+        forest.push(s)
+        for name, tree in trees.items():
+            tree.push(s)
+            assert forest[name].active_path == tree.active_path, (name, s["ts"])
+    assert forest.n_windows < sum(len(t._graph) for t in trees.values())
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_forest_push_batch_matches_trees(seed):
+    cfgs, samples = _cfgs(seed), random_samples(250, seed)
+    cols = {m: np.array([s.get(m, np.nan) for s in samples]) for m in METRICS}
+    ts = np.array([s["ts"] for s in samples], dtype=np.int64)
+    out = RuleForest(cfgs, pps=10).push_batch(cols, ts)
+    for name, cfg in cfgs.items():
+        tree = RuleTree(cfg, pps=10)
+        assert out[name] == tree.push_batch(cols, ts)
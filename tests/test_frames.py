@@ -0,0 +1,48 @@
+"""push_frames：打包二进制帧与逐条 push 的差分测试及布局报错。"""
+
+import numpy as np
+import pytest
+
+from src.rules import FrameSchema, RuleTree
+
+from conftest import METRICS, random_cfg, random_samples
+from test_push_batch import _batched, _transitions
+
+
+def _cfg():
+    return {"id": "root", "units": "root", "sub": [
+        {"id": "a", "units": [{"metric": "x", "window": {"type": "count", "size": 3}, "agg": "avg",
+                               "cmp": {"type": "()", "value": [0, 1]}}]},
+    ]}
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_push_frames_matches_push(seed):
+    cfg, samples = random_cfg(seed), random_samples(400, seed)
+    schema = FrameSchema([("ts", "<i8"), ("speed", ">f4"), ("angle", "<f8"), ("pad", "u1"), ("temp", "<f8")])
+
+    def frames(chunk):
+        rec = np.zeros(len(chunk), dtype=schema.dtype)
+        for m in ("ts", *METRICS):
+            rec[m] = [s.get(m, np.nan) for s in chunk]
+        return rec.tobytes()
+
+    # speed 按 float32 传输：参考树同样写入 float32 精度的值
+    samples = [{**s, "speed": float(np.float32(s["speed"]))} if "speed" in s else s for s in samples]
+    expected = _transitions(RuleTree(cfg, pps=10), samples)
+    tree = RuleTree(cfg, pps=10)
+    assert _batched(tree, samples, seed, lambda chunk: tree.push_frames(frames(chunk), schema)) == expected
+
+
+def test_push_frames_rejects_bad_layouts():
+    tree = RuleTree(_cfg(), pps=10)
+    schema = FrameSchema([("ts", "<i8"), ("x", "<f8")])
+    with pytest.raises(ValueError, match="need a FrameSchema"):
+        tree.push_frames(b"\0" * 16)
+    with pytest.raises(ValueError, match="whole number of 16-byte records"):
+        tree.push_frames(b"\0" * 20, schema)
+    with pytest.raises(ValueError, match="must be an integer"):
+        FrameSchema([("ts", "<f8"), ("x", "<f8")])
+    with pytest.raises(ValueError, match="no 'time' field"):
+        FrameSchema([("ts", "<i8")], ts="time")
+    assert tree.active_path == []                    # 出错的写入不改变任何状态
@@ -0,0 +1,107 @@
+"""hopping / tumbling 窗口：求值边界上锁存的聚合值与对边界时窗口内容的全量聚合一致。"""
+
+import bisect
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from src.rules import RuleTree
+from src.rules._window import Window
+from src.utils._metrics_kit import MetricsKit
+
+AGGS = ("mean", "sum", "max", "min", "std", "ptp", "slope", "p90")
+NAN = float("nan")
+
+
+def _same(a, b):
+    return (a != a and b != b) or a == b
+
+
+def _cfg(window, agg="avg"):
+    return {"id": "root", "units": "root", "sub": [
+        {"id": "a", "units": [{"metric": "x", "window": window, "agg": agg,
+                               "cmp": {"type": "()", "value": [0, 1]}}]},
+    ]}
+
+
+@pytest.mark.parametrize("window, message", [
+    ({"type": "count", "size": 3, "mode": "hopping"}, "requires hop"),
+    ({"type": "count", "size": 3, "mode": "hopping", "hop": 4}, "exceeds the window length"),
+    ({"type": "time", "sec": 1, "mode": "hopping", "hop": 1500}, "exceeds the window length"),
+    ({"type": "count", "size": 3, "hop": 1}, "only applies to hopping windows"),
+])
+def test_invalid_hop_config(window, message):
+    with pytest.raises(ValidationError, match=message):
+        RuleTree(_cfg(window), pps=10)
+
+
+def _value(rnd):
+    return NAN if rnd.random() < 0.02 else round(rnd.gauss(0, 3), 3)
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("backend", ["deque", "ring"])
+def test_count_hopping_latches_the_boundary_contents(seed, backend):
+    rnd = random.Random(seed)
+    size = rnd.randint(2, 9)
+    hop = rnd.randint(1, size)
+    win = Window.from_cfg(Window.Config(type="count", size=size, mode="hopping", hop=hop), 10, backend=backend)
+    readers = {a: win.reader(a) for a in AGGS}
+    seen, held = [], None
+    for i in range(1, 300):
+        seen.append(_value(rnd))
+        assert win.push(seen[-1]) == (i % hop == 0)
+        if i % hop == 0:
+            held = {a: MetricsKit.get(a)(seen[-size:]) for a in AGGS} if len(seen) >= size else None
+        assert win.is_ready() == (held is not None)
+        if held is not None:
+            for a, r in readers.items():
+                assert _same(r(), held[a]), (a, i)
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("backend", ["deque", "ring"])
+def test_time_hopping_latches_the_boundary_contents(seed, backend):
+    rnd = random.Random(seed)
+    sec, hop = rnd.randint(1, 3), rnd.choice([100, 300, 1000])
+    span = sec * 1000
+    win = Window.from_cfg(Window.Config(type="time", sec=sec, mode="hopping", hop=hop), 10, backend=backend)
+    readers = {a: win.reader(a) for a in AGGS}
+    kept, held, t, phase = [], None, 0, -1       # kept：已接受的 (ts, 值)，按 ts 稳定排序
+    for _ in range(400):
+        t += rnd.choice([0, 50, 100, 100, 250, 700])
+        late = kept and rnd.random() < 0.05
+        ts = t - rnd.randint(1, span) if late else t
+        v = _value(rnd)
+        fired = win.push(v, ts)
+        if kept and ts < kept[-1][0]:
+            assert not fired                     # 迟到样本不触发求值
+            if ts >= kept[-1][0] - span:
+                kept.insert(bisect.bisect_right([k for k, _ in kept], ts), (ts, v))
+            continue
+        kept.append((ts, v))
+        assert fired == (ts // hop != phase)
+        if fired:
+            phase = ts // hop
+            t0 = min(k for k, _ in kept)
+            vals = [x for k, x in kept if k >= ts - span]
+            held = {a: MetricsKit.get(a)(vals) for a in AGGS} if ts - t0 >= span else None
+        assert win.is_ready() == (held is not None)
+        if held is not None:
+            for a, r in readers.items():
+                assert _same(r(), held[a]), (a, ts)
+
+
+@pytest.mark.parametrize("size", [1, 4, 7])
+def test_tumbling_is_hopping_by_the_window_length(size):
+    rnd = random.Random(size)
+    samples = [{"ts": i * 100, "x": _value(rnd)} for i in range(200)]
+    trees = [RuleTree(_cfg(w, "p90"), pps=10) for w in (
+        {"type": "count", "size": size, "mode": "tumbling"},
+        {"type": "count", "size": size, "mode": "hopping", "hop": size},
+    )]
+    for s in samples:
+        for tree in trees:
+            tree.push(s)
+        assert trees[0].active_path == trees[1].active_path
@@ -0,0 +1,102 @@
+"""MetricsKit：流式 / 向量化实现与全量函数逐值一致。"""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from src.rules._window import Window
+from src.utils._metrics_kit import MetricsKit, RangeStats
+
+AGGS = ("mean", "sum", "max", "min", "rms", "ptp", "rel_var", "std", "var", "slope", "p90")
+NAN = float("nan")
+
+
+def _same(a, b):
+    return (a != a and b != b) or a == b
+
+
+def test_builtin_rounding_and_extremes():
+    assert MetricsKit.mean([1.005]) == 1.0                      # 内置 round：1.005 的二进制值略小于 1.005
+    assert MetricsKit.mean([-3.13, 1.84]) == -0.64
+    assert MetricsKit.get("max")([1.0, NAN, 3.0]) == 3.0          # 内置 max：NaN 只在首位时传播
+    assert math.isnan(MetricsKit.get("max")([NAN, 1.0]))
+    assert MetricsKit.get("min")([2.0, NAN, 1.0]) == 1.0
+    assert MetricsKit.slope([1.0]) == 0.0
+    assert math.isnan(MetricsKit.mean([]))
+
+
+def _values(rnd, kind, n):
+    def one():
+        if rnd.random() < 0.03:
+            return NAN
+        if kind == "ties":                                       # 3 位小数：均值常落在 x.xx5 上
+            return round(rnd.uniform(-5, 5), 3)
+        if kind == "offset":
+            return 1e6 + round(rnd.uniform(0, 1), 3)
+        return rnd.gauss(0, 10)
+    return [one() for _ in range(n)]
+
+
+@pytest.mark.parametrize("kind", ["ties", "offset", "gauss"])
+@pytest.mark.parametrize("backend", ["deque", "ring"])
+def test_streaming_readers_match_full_aggregation(kind, backend):
+    rnd = random.Random(f"{kind}-{backend}")
+    for _ in range(20):
+        cap = rnd.randint(1, 30)
+        win = Window.from_cfg(Window.Config(type="count", size=cap), 1, backend=backend)
+        readers = {a: win.reader(a) for a in AGGS}
+        xs = _values(rnd, kind, 150)
+        for i, x in enumerate(xs):
+            win.push(x)
+            vals = xs[max(0, i - cap + 1):i + 1]
+            for a in AGGS:
+                assert _same(readers[a](), MetricsKit.get(a)(vals)), (a, vals)
+
+
+def step_signal(level, n=400, seed=0):
+    """每 37 个样本在 0 与 ``level`` 之间切换的电平，叠加 gauss(0, 0.01) 噪声。"""
+    rnd = random.Random(seed)
+    return [(level if (i // 37) % 2 else 0.0) + rnd.gauss(0, 0.01) for i in range(n)]
+
+
+@pytest.mark.parametrize("level", [1e6, 1e9])
+@pytest.mark.parametrize("backend", ["deque", "ring"])
+def test_streaming_readers_survive_level_shifts(level, backend):
+    # 偏移量过时后 Σd² 与 n·m1² 大量抵消：须识别误差上界并全量重算
+    xs = step_signal(level)
+    win = Window.from_cfg(Window.Config(type="count", size=10), 1, backend=backend)
+    readers = {a: win.reader(a) for a in AGGS}
+    for i, x in enumerate(xs):
+        win.push(x)
+        vals = xs[max(0, i - 9):i + 1]
+        for a in AGGS:
+            assert _same(readers[a](), MetricsKit.get(a)(vals)), (a, i)
+
+
+@pytest.mark.parametrize("kind", ["ties", "offset", "gauss"])
+def test_range_stats_match_full_aggregation(kind):
+    rnd = random.Random(kind)
+    for _ in range(10):
+        cap = rnd.randint(1, 40)
+        xs = _values(rnd, kind, 300)
+        stats = RangeStats(np.array(xs), cap)
+        e = np.arange(len(xs))
+        s = np.maximum(e - cap + 1, 0)
+        for a in AGGS:
+            got = MetricsKit.sliding(a)(stats, s, e)
+            for i in range(len(xs)):
+                assert _same(got[i], MetricsKit.get(a)(xs[s[i]:e[i] + 1])), (a, i)
+
+
+@pytest.mark.parametrize("level", [1e6, 1e9])
+def test_range_stats_survive_level_shifts(level):
+    xs = step_signal(level)
+    stats = RangeStats(np.array(xs), 10)
+    e = np.arange(len(xs))
+    s = np.maximum(e - 9, 0)
+    for a in AGGS:
+        got = MetricsKit.sliding(a)(stats, s, e)
+        for i in range(len(xs)):
+            assert _same(got[i], MetricsKit.get(a)(xs[s[i]:e[i] + 1])), (a, i)
@@ -0,0 +1,33 @@
+"""RuleTree.parallel：线程池批量求值与逐条 push 的差分测试。"""
+
+import pytest
+
+from src.rules import RuleTree
+
+from conftest import random_cfg, random_samples
+from test_push_batch import _batched, _transitions
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("workers", [2, 4])
+def test_parallel_push_batch_matches_push(seed, workers):
+    cfg, samples = random_cfg(seed), random_samples(600, seed)
+    ref = RuleTree(cfg, pps=10)
+    expected = _transitions(ref, samples)
+    tree = RuleTree(cfg, pps=10)
+    tree.parallel(workers, min_cost_ns=0)            # 每个批次都走线程池
+    try:
+        assert _batched(tree, samples, seed) == expected
+        assert tree.snapshot() == ref.snapshot()
+    finally:
+        tree.parallel(0)
+
+
+def test_parallel_rejects_negative_workers():
+    cfg = {"id": "root", "units": "root", "sub": [
+        {"id": "a", "units": [{"metric": "x", "window": {"type": "count", "size": 3}, "agg": "avg",
+                               "cmp": {"type": "()", "value": [0, 1]}}]},
+    ]}
+    tree = RuleTree(cfg, pps=10)
+    with pytest.raises(ValueError, match="workers must be >= 0"):
+        tree.parallel(-1)
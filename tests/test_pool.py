@@ -0,0 +1,89 @@
+"""RuleTreePool：逐流结果与各自独立的 RuleTree 一致。"""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.rules import RuleTree
+from src.rules.pool import RuleTreePool
+
+from conftest import METRICS
+
+AGGS = ("avg", "sum", "min", "max", "rms", "ptp", "rel_var", "std", "var", "slope", "p90", "none")
+
+
+def _cfg(seed):
+    rnd = random.Random(seed)
+    count = [0]
+
+    def node(d):
+        count[0] += 1
+        units = []
+        for _ in range(rnd.randint(1, 2)):
+            win = ({"type": "count", "size": rnd.randint(1, 8)} if rnd.random() < 0.7
+                   else {"type": "time", "sec": rnd.randint(1, 2)})
+            lo = rnd.uniform(-5, 5)
+            units.append({"metric": rnd.choice(METRICS), "window": win, "agg": rnd.choice(AGGS),
+                          "cmp": {"type": rnd.choice(["()", "[]"]), "value": [lo, lo + rnd.uniform(0, 10)]}})
+        out = {"id": f"n{count[0]}", "units": units}
+        if d < 3:
+            out["sub"] = [node(d + 1) for _ in range(3)]
+        return out
+
+    return {"id": "root", "units": "root", "sub": [node(1) for _ in range(3)]}
+
+
+def _check(cfg, xs, pps=2):
+    """xs: (样本数, 流数, 指标数)；逐样本比较 pool 与各流独立 RuleTree 的最深活跃节点。"""
+    n_streams = xs.shape[1]
+    pool = RuleTreePool(cfg, pps=pps, n_streams=n_streams)
+    trees = [RuleTree(cfg, pps=pps) for _ in range(n_streams)]
+    ids = np.arange(n_streams)
+    for i, row in enumerate(xs):
+        out = pool.push(ids, row)
+        for s, tree in enumerate(trees):
+            tree.push({"ts": i * 1000 // pps, **{m: float(row[s, j]) for j, m in enumerate(pool.metrics)}})
+            assert pool.node_ids[out[s]] == tree.active_path[-1], (i, s)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_pool_matches_independent_trees(seed):
+    cfg = _cfg(seed)
+    n_metrics = len(RuleTreePool(cfg, pps=2, n_streams=1).metrics)
+    rng = np.random.default_rng(seed)
+    xs = np.round(rng.normal(0, 3, size=(100, 4, n_metrics)), 3)
+    xs[rng.random(xs.shape) < 0.02] = np.nan
+    _check(cfg, xs)
+
+
+@pytest.mark.parametrize("level", [1e6, 1e9])
+def test_pool_survives_level_shifts(level):
+    # 每 37 个样本在 0 与 level 间切换（各流相位不同）：滑动矩的偏移量随之过时
+    win = {"type": "count", "size": 10}
+    units = [("std", [0, 1]), ("rms", [0, 1]), ("var", [0, 0.001]), ("avg", [0, 1])]
+    cfg = {"id": "root", "units": "root", "sub": [
+        {"id": f"n{j}", "units": [{"metric": "x", "window": win, "agg": a, "cmp": {"type": "[]", "value": v}}]}
+        for j, (a, v) in enumerate(units)]}
+    rng = np.random.default_rng(0)
+    i, s = np.arange(400)[:, None], np.arange(3)[None, :]
+    xs = np.where((i + 11 * s) // 37 % 2, level, 0.0) + rng.normal(0, 0.01, size=(400, 3))
+    _check(cfg, xs[:, :, None], pps=10)
+
+
+def test_pool_rejects_unsupported_settings():
+    def cfg(window):
+        return {"id": "root", "units": "root", "sub": [
+            {"id": "a", "units": [{"metric": "x", "window": window, "agg": "avg",
+                                   "cmp": {"type": "()", "value": [0, 1]}}]},
+        ]}
+
+    with pytest.raises(ValueError, match="only supports sliding raw-sample windows"):
+        RuleTreePool(cfg({"type": "count", "size": 4, "mode": "tumbling"}), pps=10, n_streams=2)
+    with pytest.raises(ValueError, match="n_streams must be >= 1"):
+        RuleTreePool(cfg({"type": "count", "size": 3}), pps=10, n_streams=0)
+    pool = RuleTreePool(cfg({"type": "count", "size": 3}), pps=10, n_streams=2)
+    with pytest.raises(ValueError, match="out of range"):
+        pool.push(np.array([2]), np.zeros((1, 1)))
+    with pytest.raises(ValueError, match="expected"):
+        pool.push(np.array([0, 1]), np.zeros((2, 2)))
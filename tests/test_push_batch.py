@@ -0,0 +1,92 @@
+"""push_batch 与逐条 push 的差分测试。"""
+
+import random
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from src.rules import RuleTree
+
+from conftest import METRICS, random_cfg, random_samples
+
+
+def _columns(samples):
+    cols = {m: np.array([s.get(m, np.nan) for s in samples]) for m in METRICS}
+    return cols, np.array([s["ts"] for s in samples], dtype=np.int64)
+
+
+def _transitions(tree, samples):
+    out, prev = [], list(tree.active_path)
+    for s in samples:
+        tree.push(s)
+        path = list(tree.active_path)
+        if path != prev:
+            out.append((s["ts"], path))
+        prev = path
+    return out
+
+
+def _chunks(samples, seed):
+    rnd, i = random.Random(seed), 0
+    while i < len(samples):
+        n = rnd.choice([1, 3, 17, 64, 200])
+        yield samples[i:i + n]
+        i += n
+
+
+def _batched(tree, samples, seed, push=None):
+    push = push or (lambda chunk: tree.push_batch(*_columns(chunk)))
+    out = []
+    for chunk in _chunks(samples, seed):
+        out += [(ts, list(path)) for ts, path in push(chunk)]
+    return out
+
+
+@pytest.mark.parametrize("seed", range(12))
+@pytest.mark.parametrize("backend", ["deque", "ring"])
+def test_push_batch_matches_push(seed, backend):
+    cfg, samples = random_cfg(seed), random_samples(600, seed)
+    ref = RuleTree(cfg, pps=10, backend=backend)
+    expected = _transitions(ref, samples)
+    tree = RuleTree(cfg, pps=10, backend=backend)
+    assert _batched(tree, samples, seed) == expected
+    assert tree.active_path == ref.active_path
+    assert tree.snapshot() == ref.snapshot()
+
+
+@pytest.mark.parametrize("level", [1e6, 1e9])
+@pytest.mark.parametrize("backend", ["deque", "ring"])
+def test_push_batch_matches_push_on_level_shifts(level, backend):
+    # 每 37 个样本在 0 与 level 间切换（叠加小噪声）：分块前缀和在块内大量抵消
+    rnd = random.Random(0)
+    samples = [{"ts": 100 * i, **{m: (level if (i // 37) % 2 else 0.0) + rnd.gauss(0, 0.01) for m in METRICS}}
+               for i in range(400)]
+    win = {"type": "count", "size": 10}
+    units = [("speed", "std", [0, 1]), ("angle", "rms", [0, 1]), ("temp", "var", [0, 0.001])]
+    cfg = {"id": "root", "units": "root", "sub": [
+        {"id": f"n{j}", "units": [{"metric": m, "window": win, "agg": a, "cmp": {"type": "[]", "value": v}}]}
+        for j, (m, a, v) in enumerate(units)]}
+    ref = RuleTree(cfg, pps=10, backend=backend)
+    expected = _transitions(ref, samples)
+    assert len(expected) > 20
+    tree = RuleTree(cfg, pps=10, backend=backend)
+    assert _batched(tree, samples, 0) == expected
+    assert tree.active_path == ref.active_path
+
+
+def test_push_batch_rejects_malformed_columns():
+    cfg = {"id": "root", "units": "root", "sub": [
+        {"id": "a", "units": [{"metric": "x", "window": {"type": "count", "size": 3}, "agg": "avg",
+                               "cmp": {"type": "()", "value": [0, 1]}}]},
+    ]}
+    tree = RuleTree(cfg, pps=10)
+    with pytest.raises(ValueError, match="1-D integer array"):
+        tree.push_batch({"x": np.zeros(2)}, np.array([0.0, 1.0]))
+    with pytest.raises(ValueError, match=">= 0"):
+        tree.push_batch({"x": np.zeros(2)}, np.array([-1, 0]))
+    with pytest.raises(ValueError, match=r"expected \(2,\)"):
+        tree.push_batch({"x": np.zeros(3)}, np.array([0, 1]))
+    with pytest.raises(ValidationError, match="greater than or equal to 0"):
+        tree.push({"ts": -5, "x": 1.0})
+    assert tree.active_path == []                    # 出错的写入不改变任何状态
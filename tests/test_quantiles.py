@@ -0,0 +1,119 @@
+"""分位数：分桶窗口的逐桶草图与窗口内原始样本上的离线草图逐值一致。"""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.rules._bucket import _FIELDS
+from src.rules._window import Window
+from src.utils._metrics_kit import MetricsKit
+
+QUANTILES = ("p90", "median", "p99~0.001")
+NAN = float("nan")
+
+
+def _same(a, b):
+    return (a != a and b != b) or a == b
+
+
+def _bucketed(sec=2, res=250):
+    return Window.from_cfg(Window.Config(type="time", sec=sec, resolution=res), 10)
+
+
+def _stream(seed, n, nan=0.01):
+    """ts 大体递增、约 5% 迟到样本；值为带 3 位小数的高斯值，偶有 NaN。"""
+    rnd = random.Random(seed)
+    out, t = [], 0
+    for _ in range(n):
+        t += rnd.choice([0, 50, 100, 100, 250, 1500])
+        ts = t - rnd.randint(1, 1200) if t > 1200 and rnd.random() < 0.05 else t
+        v = NAN if rnd.random() < nan else round(rnd.gauss(0, 3), 3)
+        out.append((v, ts))
+    return out
+
+
+def _in_window(win, pushed):
+    res = win._res
+    return [v for v, t in pushed if win._first <= t // res <= win._cur]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_bucket_quantiles_match_in_window_samples(seed):
+    win = _bucketed(res=random.Random(seed).choice([100, 250, 1000]))
+    readers = {q: win.reader(q) for q in QUANTILES}
+    pushed = []
+    for v, ts in _stream(seed, 600):
+        win.push(v, ts)
+        pushed.append((v, ts))
+        vals = _in_window(win, pushed)
+        for q, r in readers.items():
+            assert _same(r(), MetricsKit.get(q)(vals)), (q, ts)
+
+
+def test_sketch_mounted_late_reads_nan_until_its_buckets_fill():
+    win = _bucketed()
+    stream = _stream(7, 400, nan=0.0)
+    pushed = []
+    for v, ts in stream[:100]:
+        win.push(v, ts)
+        pushed.append((v, ts))
+    p90 = win.reader("p90")
+    start = win._cur + 1
+    for v, ts in stream[100:]:
+        win.push(v, ts)
+        pushed.append((v, ts))
+        want = MetricsKit.get("p90")(_in_window(win, pushed)) if win._first >= start else NAN
+        assert _same(p90(), want)
+    assert win._first >= start
+
+
+def test_snapshot_round_trip_keeps_the_sketches():
+    stream = _stream(11, 500)
+    a = _bucketed()
+    ra = {q: a.reader(q) for q in QUANTILES}
+    for v, ts in stream[:250]:
+        a.push(v, ts)
+    vals, ts, t0 = a.state()
+
+    b = _bucketed()
+    rb = {q: b.reader(q) for q in QUANTILES}
+    b.set_state(vals, ts, t0)
+    again = b.state()
+    assert np.array_equal(again[0], vals, equal_nan=True) and np.array_equal(again[1], ts)
+    for v, t in stream[250:]:
+        a.push(v, t)
+        b.push(v, t)
+        for q in QUANTILES:
+            assert _same(ra[q](), rb[q]()), q
+
+
+def test_malformed_sketch_state_is_rejected():
+    win = _bucketed()
+    win.reader("p90")
+    for v, ts in _stream(3, 50, nan=0.0):
+        win.push(v, ts)
+    vals, ts, t0 = win.state()
+    base = 2 + _FIELDS * (ts.size - 1)
+    bad = vals.copy()
+    bad[base + 1] += 1                           # 首个桶的项数与其后数据不符
+    assert win.data_error(bad, ts) == "has a malformed quantile sketch"
+    with pytest.raises(ValueError, match="does not match the window type"):
+        _bucketed().set_state(vals, ts, t0)      # 没有草图的窗口不接受带草图的状态
+    other = _bucketed()
+    other.reader("p90")
+    other.push(42.0, 0)
+    with pytest.raises(ValueError, match="malformed quantile sketch"):
+        other.set_state(bad, ts, t0)
+    assert other.last() == 42.0                  # 校验失败时窗口未被修改
+    assert win.data_error(vals, ts) is None
+
+
+def test_retain_drops_unused_sketches():
+    win = _bucketed()
+    win.reader("p90")
+    win.reader("p99~0.001")
+    win.retain(["p90", "avg"])
+    assert len(win._sketches) == 1
+    win.retain(["avg"])
+    assert not win._sketches
@@ -0,0 +1,81 @@
+"""RuleTree.reload：保留的窗口与一直用新配置运行的树逐样本一致。"""
+
+import copy
+import random
+
+import pytest
+
+from src.rules import RuleTree
+
+from conftest import AGGS, random_cfg, random_samples
+
+
+def _mutate(cfg, seed):
+    """改阈值、节点 id 与滑动窗口上的聚合，窗口集合不变。
+
+    hopping 窗口上新增的聚合按热更新时的内容计算、分桶窗口上新增的分位数要等
+    挂载前的桶淘汰后才有值（见 ``RuleTree.reload``），与一直运行的树本就不同。
+    """
+    rnd = random.Random(seed)
+    out = copy.deepcopy(cfg)
+
+    def walk(node):
+        if node["id"] != "root":
+            node["id"] += "_v2"
+        if isinstance(node.get("units"), list):
+            for u in node["units"]:
+                lo = rnd.uniform(-5, 5)
+                u["cmp"]["value"] = [lo, lo + rnd.uniform(0, 10)]
+                if "resolution" not in u["window"] and u["window"].get("mode", "sliding") == "sliding":
+                    u["agg"] = rnd.choice(AGGS)
+        for sub in node.get("sub", []):
+            walk(sub)
+
+    walk(out)
+    return out
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("backend", ["deque", "ring"])
+def test_reload_continues_like_a_tree_built_with_the_new_config(seed, backend):
+    cfg, samples = random_cfg(seed), random_samples(500, seed)
+    new = _mutate(cfg, seed)
+    tree = RuleTree(cfg, pps=10, backend=backend)
+    fresh = RuleTree(new, pps=10, backend=backend)
+    for s in samples[:250]:
+        tree.push(s)
+        fresh.push(s)
+    assert tree.reload(new) == len(fresh._graph._feeds)   # 窗口集合不变：全部接管
+    assert tree.active_path == fresh.active_path
+    for s in samples[250:]:
+        tree.push(s)
+        fresh.push(s)
+        assert tree.active_path == fresh.active_path
+
+
+def test_new_windows_start_empty_and_bad_configs_change_nothing():
+    cfg = {"id": "root", "units": "root", "sub": [
+        {"id": "a", "units": [{"metric": "x", "window": {"type": "count", "size": 3}, "agg": "max",
+                               "cmp": {"type": "[]", "value": [5, 10]}}]},
+    ]}
+    tree = RuleTree(cfg, pps=10)
+    for i in range(5):
+        tree.push({"ts": i * 100, "x": 7.0})
+    assert tree.active_path == ["root", "a"]
+
+    bad = copy.deepcopy(cfg)
+    bad["sub"][0]["units"][0]["agg"] = "median_of_means"
+    with pytest.raises(ValueError, match="unknown aggregation"):
+        tree.reload(bad)
+    assert tree.active_path == ["root", "a"]
+
+    grown = copy.deepcopy(cfg)
+    grown["sub"][0]["units"].append({"metric": "x", "window": {"type": "count", "size": 4}, "agg": "min",
+                                     "cmp": {"type": "[]", "value": [5, 10]}})
+    assert tree.reload(grown) == 1
+    assert tree.active_path == ["root"]          # 新窗口为空：单元不成立
+    tree.push({"ts": 500, "x": 7.0})
+    assert tree.active_path == ["root"]
+    for i in range(6, 9):
+        tree.push({"ts": i * 100, "x": 7.0})
+    assert tree.active_path == ["root", "a"]
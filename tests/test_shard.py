@@ -0,0 +1,54 @@
+"""ShardedRuleTreePool：分片出错时的回复处理。"""
+
+import numpy as np
+import pytest
+
+from src.rules import RuleTree
+from src.rules.pool import RuleTreePool
+from src.rules.shard import ShardedRuleTreePool
+
+CFG = {"id": "root", "units": "root", "sub": [
+    {"id": "hot", "units": [{"metric": "x", "window": {"type": "count", "size": 2}, "agg": "mean",
+                             "cmp": {"type": "[]", "value": [5, 100]}}]},
+]}
+
+
+def test_failed_shard_does_not_desync_the_others(monkeypatch):
+    push = RuleTreePool.push
+
+    def flaky(self, ids, values):
+        if self.n_streams == 2 and np.isnan(values).any():   # 只让第一个分片（2 路流）出错
+            raise ValueError("boom")
+        return push(self, ids, values)
+
+    monkeypatch.setattr(RuleTreePool, "push", flaky)      # fork 出的工作进程继承该补丁
+    with ShardedRuleTreePool(CFG, pps=1, n_streams=5, n_workers=2, mp_context="fork") as pool:
+        ids = np.arange(5)
+        bad = np.array([[np.nan], [1.0], [1.0], [1.0], [1.0]])
+        with pytest.raises(RuntimeError, match=r"1 of 2 shards failed: shard 0: ValueError\('boom'\)"):
+            pool.push(ids, bad)
+        # 第二个分片的回复已在上一次调用中读走：之后的结果仍与单棵树一致
+        out = pool.push(ids, np.full((5, 1), 9.0))
+        tree = RuleTree(CFG, pps=1)
+        tree.push({"ts": 0, "x": 1.0})
+        tree.push({"ts": 1, "x": 9.0})
+        assert [pool.node_ids[i] for i in out[2:]] == [tree.active_path[-1]] * 3
+        pool.reset()
+        assert (pool.leaf() == 0).all()
+
+
+def test_sharded_pool_matches_single_pool():
+    cfg = {"id": "root", "units": "root", "sub": [
+        {"id": "lo", "units": [{"metric": "x", "window": {"type": "count", "size": 4}, "agg": "std",
+                                "cmp": {"type": "[]", "value": [0, 1]}}]},
+        {"id": "hi", "units": [{"metric": "x", "window": {"type": "count", "size": 3}, "agg": "max",
+                                "cmp": {"type": "()", "value": [2, 100]}}]},
+    ]}
+    rng = np.random.default_rng(0)
+    xs = np.round(rng.normal(0, 2, size=(60, 7, 1)), 3)
+    ids = np.arange(7)
+    ref = RuleTreePool(cfg, pps=1, n_streams=7)
+    with ShardedRuleTreePool(cfg, pps=1, n_streams=7, n_workers=3) as pool:
+        for row in xs:
+            assert (pool.push(ids, row) == ref.push(ids, row)).all()
+        assert [pool.active_path(i) for i in ids] == [ref.active_path(i) for i in ids]
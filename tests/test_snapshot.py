@@ -0,0 +1,71 @@
+"""RuleTree.snapshot / restore：往返一致与损坏快照的报错。"""
+
+import pytest
+
+from src.rules import RuleTree
+
+from conftest import random_cfg, random_samples
+
+
+def _cfg():
+    unit = lambda metric, window, agg: {  # noqa: E731
+        "metric": metric, "window": window, "agg": agg, "cmp": {"type": "()", "value": [0, 10]},
+    }
+    return {"id": "root", "units": "root", "sub": [
+        {"id": "a", "units": [unit("x", {"type": "count", "size": 4}, "mean"),
+                              unit("y", {"type": "time", "sec": 1}, "max")]},
+    ]}
+
+
+def _warm_tree():
+    tree = RuleTree(_cfg(), pps=10)
+    for i in range(20):
+        tree.push({"ts": i * 100, "x": float(i % 7), "y": float(i % 5)})
+    return tree
+
+
+def test_truncated_file_raises_value_error(tmp_path):
+    blob = _warm_tree().snapshot()
+    path = tmp_path / "tree.snap"
+    path.write_bytes(blob[:-16])
+    tree = RuleTree(_cfg(), pps=10)
+    with pytest.raises(ValueError, match="truncated"):
+        tree.restore(path)
+    path.write_bytes(blob)                      # 失败后文件映射已释放，可再次读取
+    tree.restore(path)
+    assert tree.snapshot() == blob
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("backend", ["deque", "ring"])
+def test_round_trip_continues_like_the_original(seed, backend, tmp_path):
+    cfg, samples = random_cfg(seed), random_samples(500, seed)
+    tree = RuleTree(cfg, pps=10, backend=backend)
+    for s in samples[:300]:
+        tree.push(s)
+    blob = tree.snapshot(tmp_path / "tree.snap")
+
+    restored = RuleTree(cfg, pps=10, backend=backend)
+    restored.restore(tmp_path / "tree.snap")
+    assert restored.snapshot() == blob
+    assert restored.active_path == tree.active_path
+    for s in samples[300:]:
+        tree.push(s)
+        restored.push(s)
+        assert restored.active_path == tree.active_path
+    assert restored.snapshot() == tree.snapshot()
+
+
+def test_rejects_foreign_or_corrupt_snapshots():
+    blob = _warm_tree().snapshot()
+    other = RuleTree(_cfg(), pps=20)
+    with pytest.raises(ValueError, match="different config"):
+        other.restore(blob)
+    tree = RuleTree(_cfg(), pps=10)
+    with pytest.raises(ValueError, match="not a rule tree snapshot"):
+        tree.restore(b"X" + blob[1:])
+    with pytest.raises(ValueError, match="truncated"):
+        tree.restore(blob[:10])
+    with pytest.raises(ValueError, match="truncated"):
+        tree.restore(blob[:-8])
+    assert tree.snapshot() == RuleTree(_cfg(), pps=10).snapshot()     # 失败时不修改任何窗口
@@ -0,0 +1,68 @@
+"""RuleTree.instrument / stats：计数与逐条求值的结果一致，且不改变求值结果。"""
+
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.rules import RuleTree
+
+from conftest import METRICS, random_cfg, random_samples
+
+
+def _expected_counts(cfg, samples):
+    tree = RuleTree(cfg, pps=10)
+    deepest, active, transitions, prev = Counter(), Counter(), 0, list(tree.active_path)
+    for s in samples:
+        tree.push(s)
+        path = list(tree.active_path)
+        if path:
+            deepest[path[-1]] += 1
+        active.update(path)
+        transitions += path != prev
+        prev = path
+    return deepest, active, transitions, prev
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("batched", [False, True])
+def test_stats_match_an_uninstrumented_replay(seed, batched):
+    cfg, samples = random_cfg(seed), random_samples(400, seed)
+    deepest, active, transitions, last = _expected_counts(cfg, samples)
+
+    tree = RuleTree(cfg, pps=10)
+    evals, changes = [], []
+    tree.instrument(on_eval=lambda path, ns: evals.append(path), on_transition=changes.append)
+    if batched:
+        cols = {m: np.array([s.get(m, np.nan) for s in samples]) for m in METRICS}
+        tree.push_batch(cols, np.array([s["ts"] for s in samples], dtype=np.int64))
+    else:
+        for s in samples:
+            tree.push(s)
+    assert list(tree.active_path) == last                     # 计数不改变求值结果
+
+    st = tree.stats()
+    assert st.samples == len(samples)
+    assert st.transitions == transitions == len(changes)
+    assert len(evals) == (1 if batched else len(samples))
+    assert {n.node_id: n.deepest for n in st.nodes if n.deepest} == dict(deepest)
+    assert {n.node_id: n.active for n in st.nodes if n.active} == dict(active)
+    for n in st.nodes:
+        assert 0 <= n.hits <= n.checks
+    for u in st.units:
+        assert 0 <= u.hits <= u.checks
+
+
+def test_disable_keeps_counters_and_reset_clears_them():
+    cfg, samples = random_cfg(1), random_samples(200, 1)
+    tree = RuleTree(cfg, pps=10)
+    tree.instrument()
+    for s in samples[:100]:
+        tree.push(s)
+    tree.instrument(False)
+    for s in samples[100:]:
+        tree.push(s)
+    assert tree.stats().samples == 100
+    assert tree.stats(reset=True).samples == 100
+    assert tree.stats().samples == 0
+    assert "_evaluate" not in vars(tree)                      # 关闭后恢复为类方法
@@ -0,0 +1,66 @@
+"""编译模板的进程内 / 磁盘两级缓存。"""
+
+import pytest
+
+from src.rules import RuleTree
+from src.rules import _template
+
+from conftest import random_cfg, random_samples
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    _template.clear_cache()
+    yield
+    _template.clear_cache()
+
+
+def _paths(tree, samples):
+    out = []
+    for s in samples:
+        tree.push(s)
+        out.append(list(tree.active_path))
+    return out
+
+
+def test_memory_hit_still_fills_the_disk_cache(tmp_path):
+    cfg = random_cfg(0)
+    RuleTree(cfg, pps=10)                                   # 先只进进程内缓存
+    assert not list(tmp_path.iterdir())
+    RuleTree(cfg, pps=10, cache_dir=tmp_path)               # 进程内命中：仍须补写磁盘
+    assert len(list(tmp_path.glob("*.pkl"))) == 1
+
+
+def test_disk_hit_skips_compilation(tmp_path, monkeypatch):
+    cfg, samples = random_cfg(1), random_samples(300, 1)
+    expected = _paths(RuleTree(cfg, pps=10, cache_dir=tmp_path), samples)   # 先写磁盘
+    assert len(list(tmp_path.glob("*.pkl"))) == 1
+
+    _template.clear_cache()                                 # 模拟重启的进程
+
+    def boom(*args, **kwargs):
+        raise AssertionError("template was recompiled")
+
+    monkeypatch.setattr(_template.TreeTemplate, "compile", boom)
+    assert _paths(RuleTree(cfg, pps=10, cache_dir=tmp_path), samples) == expected
+
+
+@pytest.mark.parametrize("codegen", [True, False])
+def test_cached_template_matches_fresh_compile(tmp_path, codegen):
+    cfg, samples = random_cfg(2), random_samples(300, 2)
+    RuleTree(cfg, pps=10, codegen=codegen, cache_dir=tmp_path)
+    _template.clear_cache()
+    from_disk = RuleTree(cfg, pps=10, codegen=codegen, cache_dir=tmp_path)
+    _template.clear_cache()
+    fresh = RuleTree(cfg, pps=10, codegen=codegen)
+    assert _paths(from_disk, samples) == _paths(fresh, samples)
+
+
+def test_corrupt_disk_entry_is_recompiled(tmp_path):
+    cfg = random_cfg(3)
+    RuleTree(cfg, pps=10, cache_dir=tmp_path)
+    (path,) = tmp_path.glob("*.pkl")
+    path.write_bytes(b"not a pickle")
+    _template.clear_cache()
+    RuleTree(cfg, pps=10, cache_dir=tmp_path)
+    assert isinstance(_template._read_disk(path), _template.TreeTemplate)